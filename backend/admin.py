@@ -3,6 +3,15 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 import logging
 from database import Session, User, Project, HackathonPost
+from counters import reconcile_counters
+from deletion import remove_project, remove_hackathon
+from bulk_import import import_records, parse_records, IMPORTERS, MAX_ROWS
+from analytics import refresh_rollups, query_series, query_funnel, since_days, GRANULARITIES, FUNNELS
+from typing_indicators import typing_coalescer
+from ratelimit import limiter
+from token_state import revocations
+from chat import disconnect_user
+from sqlalchemy import func
 from functools import wraps
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
@@ -12,19 +21,23 @@ def admin_required(fn):
     @wraps(fn)
     @jwt_required()
     def wrapper(*args, **kwargs):
+        current_user_id = get_jwt_identity()
+
+        # Checked against the database rather than the adm claim, so a demotion applies
+        # at once instead of when the user's token expires
         session = Session()
         try:
-            current_user_id = get_jwt_identity()
-            user = session.query(User).filter_by(username=current_user_id).first()
-
-            if not user or not user.is_admin:
-                logger.warning(f"Unauthorized admin access attempt by: {current_user_id}")
-                return jsonify({"error": "Admin access required"}), 403
-
-            return fn(*args, **kwargs)
+            user = session.query(User.is_admin).filter_by(username=current_user_id).first()
+            is_admin = bool(user and user.is_admin)
         finally:
             session.close()
 
+        if not is_admin:
+            logger.warning(f"Unauthorized admin access attempt by: {current_user_id}")
+            return jsonify({"error": "Admin access required"}), 403
+
+        return fn(*args, **kwargs)
+
     return wrapper
 
 @admin_bp.route('/projects', methods=['GET'])
@@ -48,7 +61,7 @@ def get_all_projects():
                     "email": project.owner.email
                 },
                 "created_at": project.created_at.isoformat(),
-                "application_count": len(project.applications)
+                "application_count": project.application_count
             })
 
         return jsonify(projects_data), 200
@@ -72,7 +85,7 @@ def delete_project(project_id):
         project_name = project.name
         owner_username = project.owner.username
 
-        session.delete(project)
+        remove_project(session, project)
         session.commit()
 
         logger.info(f"Admin deleted project: {project_name} (ID: {project_id}) by {owner_username}")
@@ -107,7 +120,7 @@ def get_all_hackathons():
                     "email": hackathon.owner.email
                 },
                 "created_at": hackathon.created_at.isoformat(),
-                "application_count": len(hackathon.applications)
+                "application_count": hackathon.application_count
             })
 
         return jsonify(hackathons_data), 200
@@ -131,7 +144,7 @@ def delete_hackathon(hackathon_id):
         hackathon_title = hackathon.title
         owner_username = hackathon.owner.username
 
-        session.delete(hackathon)
+        remove_hackathon(session, hackathon)
         session.commit()
 
         logger.info(f"Admin deleted hackathon: {hackathon_title} (ID: {hackathon_id}) by {owner_username}")
@@ -150,6 +163,9 @@ def get_all_users():
     session = Session()
     try:
         users = session.query(User).order_by(User.created_at.desc()).all()
+        # One grouped count per table instead of loading every user's projects and posts
+        project_counts = dict(session.query(Project.owner_id, func.count(Project.id)).group_by(Project.owner_id))
+        hackathon_counts = dict(session.query(HackathonPost.owner_id, func.count(HackathonPost.id)).group_by(HackathonPost.owner_id))
 
         users_data = []
         for user in users:
@@ -161,8 +177,8 @@ def get_all_users():
                 "is_active": user.is_active,
                 "is_admin": user.is_admin,
                 "created_at": user.created_at.isoformat(),
-                "project_count": len(user.projects),
-                "hackathon_count": len(user.hackathon_posts)
+                "project_count": project_counts.get(user.id, 0),
+                "hackathon_count": hackathon_counts.get(user.id, 0)
             })
 
         return jsonify(users_data), 200
@@ -184,8 +200,16 @@ def toggle_user_active(user_id):
             return jsonify({"error": "User not found"}), 404
 
         user.is_active = not user.is_active
+        if not user.is_active:
+            # Outstanding tokens stay invalid even after a later reactivation
+            user.token_version = (user.token_version or 0) + 1
         session.commit()
 
+        revocations.set_active(user.id, user.is_active)
+        if not user.is_active:
+            revocations.revoke_user(user.id, user.token_version)
+            disconnect_user(user.id)
+
         status = "activated" if user.is_active else "deactivated"
         logger.info(f"Admin {status} user: {user.username} (ID: {user_id})")
 
@@ -233,3 +257,146 @@ def get_stats():
         return jsonify({"error": "Failed to fetch stats"}), 500
     finally:
         session.close()
+
+@admin_bp.route('/analytics/actions', methods=['GET'])
+@admin_required
+def get_action_analytics():
+    session = Session()
+    try:
+        granularity = request.args.get('granularity', 'day')
+        days = min(request.args.get('days', 30, type=int), 365)
+        action_type = request.args.get('action_type', '').strip() or None
+        user_id = request.args.get('user_id', type=int)
+
+        if granularity not in GRANULARITIES:
+            return jsonify({"error": "Invalid granularity"}), 400
+
+        rows = query_series(session, granularity, since_days(days), action_type=action_type, user_id=user_id)
+
+        series_data = []
+        for row in rows:
+            series_data.append({
+                "bucket_start": row.bucket_start.isoformat(),
+                "action_type": row.action_type,
+                "count": row.count
+            })
+
+        return jsonify({
+            "granularity": granularity,
+            "days": days,
+            "user_id": user_id,
+            "series": series_data
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Failed to fetch action analytics: {str(e)}")
+        return jsonify({"error": "Failed to fetch analytics"}), 500
+    finally:
+        session.close()
+
+@admin_bp.route('/analytics/funnel', methods=['GET'])
+@admin_required
+def get_funnel_analytics():
+    session = Session()
+    try:
+        name = request.args.get('funnel', 'projects')
+        days = min(request.args.get('days', 30, type=int), 365)
+
+        if name not in FUNNELS:
+            return jsonify({"error": "Unknown funnel"}), 400
+
+        return jsonify({
+            "funnel": name,
+            "days": days,
+            "stages": query_funnel(session, name, since_days(days))
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Failed to fetch funnel analytics: {str(e)}")
+        return jsonify({"error": "Failed to fetch analytics"}), 500
+    finally:
+        session.close()
+
+@admin_bp.route('/analytics/refresh', methods=['POST'])
+@admin_required
+def refresh_analytics():
+    try:
+        processed = refresh_rollups()
+        return jsonify({"message": "Analytics refreshed", "processed": processed}), 200
+
+    except Exception as e:
+        logger.error(f"Failed to refresh analytics: {str(e)}")
+        return jsonify({"error": "Failed to refresh analytics"}), 500
+
+@admin_bp.route('/counters/reconcile', methods=['POST'])
+@admin_required
+def reconcile_counter_columns():
+    try:
+        repair = request.args.get('repair', 'false').lower() == 'true'
+        drift = reconcile_counters(repair=repair)
+
+        return jsonify({
+            "repaired": repair,
+            "drift_count": len(drift),
+            "drift": drift
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Failed to reconcile counters: {str(e)}")
+        return jsonify({"error": "Failed to reconcile counters"}), 500
+
+@admin_bp.route('/realtime/typing', methods=['GET'])
+@admin_required
+def typing_metrics():
+    """Typing events received from clients versus broadcast to rooms (this process)"""
+    return jsonify(typing_coalescer.snapshot()), 200
+
+@admin_bp.route('/realtime/rate-limits', methods=['GET'])
+@admin_required
+def rate_limit_metrics():
+    """Allowed and limited checks per event, with each event's configured bucket"""
+    return jsonify(limiter.snapshot()), 200
+
+@admin_bp.route('/import/<kind>', methods=['POST'])
+@admin_required
+def bulk_import(kind):
+    session = Session()
+    try:
+        if kind not in IMPORTERS:
+            return jsonify({"error": "Unknown import type"}), 404
+
+        current_user_id = get_jwt_identity()
+        user = session.query(User).filter_by(username=current_user_id).first()
+
+        upload = request.files.get('file')
+        if upload:
+            try:
+                raw = upload.read().decode('utf-8')
+            except UnicodeDecodeError:
+                return jsonify({"error": "File must be UTF-8 encoded"}), 400
+            default_format = 'csv' if (upload.filename or '').lower().endswith('.csv') else 'ndjson'
+        else:
+            raw = request.get_data(as_text=True)
+            default_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+
+        fmt = request.args.get('format', default_format)
+        if fmt not in ('ndjson', 'csv'):
+            return jsonify({"error": "Format must be ndjson or csv"}), 400
+
+        if not raw.strip():
+            return jsonify({"error": "No data provided"}), 400
+
+        records = list(parse_records(raw, fmt))
+        if len(records) > MAX_ROWS:
+            return jsonify({"error": f"At most {MAX_ROWS} rows per import"}), 400
+
+        summary = import_records(kind, records, user.id)
+
+        logger.info(f"Admin {current_user_id} imported {summary['created']} {kind} ({summary['failed']} failed)")
+        return jsonify(summary), 201 if summary['created'] else 200
+
+    except Exception as e:
+        logger.error(f"Bulk import failed: {type(e).__name__}: {str(e)}")
+        return jsonify({"error": "Bulk import failed"}), 500
+    finally:
+        session.close()
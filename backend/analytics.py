@@ -0,0 +1,250 @@
+from sqlalchemy import update, bindparam
+from sqlalchemy.exc import IntegrityError
+from collections import Counter
+from datetime import datetime, timedelta
+import threading
+import time
+import os
+import logging
+from database import SessionFactory, ActivityLog, ActivityRollup, RollupWatermark, IST
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('hour', 'day')
+WATERMARK_NAME = 'activity_logs'
+BATCH_SIZE = 1000
+# user_id of the all-users total; a sentinel rather than NULL so the unique key covers it
+ALL_USERS = 0
+ROLLUP_INTERVAL_SECONDS = int(os.getenv('ROLLUP_INTERVAL_SECONDS', '60'))
+
+# Review actions are logged under one action_type; the outcome is only in the
+# description, so it is split out here to make acceptance funnels countable.
+OUTCOME_ACTIONS = {
+    'updated_application': ('accepted_application', 'rejected_application'),
+    'updated_hackathon_application': ('accepted_hackathon_application', 'rejected_hackathon_application'),
+}
+
+FUNNELS = {
+    'projects': ['applied_to_project', 'updated_application', 'accepted_application'],
+    'hackathons': ['applied_to_hackathon', 'updated_hackathon_application', 'accepted_hackathon_application'],
+}
+
+_refresh_lock = threading.Lock()
+
+def bucket_start(timestamp, granularity):
+    """Truncate a timestamp to the start of its hour or day bucket"""
+    timestamp = timestamp.replace(tzinfo=None)
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def rollup_action_types(action_type, action_description):
+    """Counter keys an activity row contributes to"""
+    keys = [action_type]
+    outcomes = OUTCOME_ACTIONS.get(action_type)
+    if outcomes:
+        if action_description.startswith('Accepted'):
+            keys.append(outcomes[0])
+        elif action_description.startswith('Rejected'):
+            keys.append(outcomes[1])
+    return keys
+
+def _apply_counts(session, counts):
+    """Add counts to their rollup rows, incrementing in SQL so concurrent readers never see a lost update"""
+    buckets = {key[1] for key in counts}
+    existing = {
+        (row.granularity, row.bucket_start, row.action_type, row.user_id)
+        for row in session.query(
+            ActivityRollup.granularity, ActivityRollup.bucket_start, ActivityRollup.action_type, ActivityRollup.user_id
+        ).filter(ActivityRollup.bucket_start.in_(buckets))
+    }
+
+    increments, inserts = [], []
+    for (granularity, start, action_type, user_id), count in counts.items():
+        values = {'g': granularity, 's': start, 'a': action_type, 'u': user_id, 'n': count}
+        (increments if (granularity, start, action_type, user_id) in existing else inserts).append(values)
+
+    table = ActivityRollup.__table__
+    connection = session.connection()
+    if increments:
+        connection.execute(update(table).where(
+            table.c.granularity == bindparam('g'),
+            table.c.bucket_start == bindparam('s'),
+            table.c.action_type == bindparam('a'),
+            table.c.user_id == bindparam('u')
+        ).values(count=table.c.count + bindparam('n')), increments)
+    if inserts:
+        connection.execute(table.insert(), [
+            {'granularity': v['g'], 'bucket_start': v['s'], 'action_type': v['a'], 'user_id': v['u'], 'count': v['n']}
+            for v in inserts
+        ])
+
+def _ensure_watermark(session):
+    if session.query(RollupWatermark.name).filter_by(name=WATERMARK_NAME).first():
+        return
+    try:
+        session.add(RollupWatermark(name=WATERMARK_NAME, last_id=0))
+        session.commit()
+    except IntegrityError:
+        # Another process created it first
+        session.rollback()
+
+def refresh_rollups(batch_size=BATCH_SIZE):
+    """Fold activity_logs rows past the watermark into the hourly and daily counters
+
+    Each batch claims its id range by moving the watermark with a compare-and-set
+    UPDATE in the same transaction as the counter increments. A worker that loses
+    the race updates no row and rolls back, so a batch is counted exactly once even
+    with several processes refreshing. The UPDATE also holds the watermark row lock
+    until commit, which serializes the counter writes.
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        # Another thread in this process is already catching up; its result is good enough
+        return 0
+
+    session = SessionFactory()
+    try:
+        _ensure_watermark(session)
+
+        processed = 0
+        while True:
+            last_id = session.query(RollupWatermark.last_id).filter_by(name=WATERMARK_NAME).scalar()
+            rows = session.query(
+                ActivityLog.id,
+                ActivityLog.user_id,
+                ActivityLog.action_type,
+                ActivityLog.action_description,
+                ActivityLog.created_at
+            ).filter(ActivityLog.id > last_id).order_by(ActivityLog.id).limit(batch_size).all()
+
+            if not rows:
+                break
+
+            claimed = session.query(RollupWatermark).filter(
+                RollupWatermark.name == WATERMARK_NAME,
+                RollupWatermark.last_id == last_id
+            ).update({RollupWatermark.last_id: rows[-1].id}, synchronize_session=False)
+            if not claimed:
+                # Another worker moved the watermark since it was read; it owns this batch
+                session.rollback()
+                break
+
+            counts = Counter()
+            for row in rows:
+                if row.created_at is None:
+                    continue
+                for action_type in rollup_action_types(row.action_type, row.action_description):
+                    for granularity in GRANULARITIES:
+                        start = bucket_start(row.created_at, granularity)
+                        counts[(granularity, start, action_type, ALL_USERS)] += 1
+                        counts[(granularity, start, action_type, row.user_id)] += 1
+
+            _apply_counts(session, counts)
+            session.commit()
+            processed += len(rows)
+            last_id = rows[-1].id
+
+        if processed:
+            logger.info(f"Rolled up {processed} activity rows (watermark: {last_id})")
+        return processed
+
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to refresh activity rollups: {type(e).__name__}: {str(e)}")
+        raise
+    finally:
+        session.close()
+        _refresh_lock.release()
+
+def migrate_rollup_totals():
+    """Rebuild the rollups once if they still hold NULL all-users rows
+
+    NULL never conflicted under the unique key, so those totals may hold duplicate
+    rows. The activity log is the source of truth, so the counters are dropped and
+    the watermark is reset for the refresher to replay.
+    """
+    session = SessionFactory()
+    try:
+        if not session.query(ActivityRollup.id).filter(ActivityRollup.user_id.is_(None)).first():
+            return False
+        session.query(ActivityRollup).delete(synchronize_session=False)
+        session.query(RollupWatermark).filter_by(name=WATERMARK_NAME).update(
+            {RollupWatermark.last_id: 0}, synchronize_session=False)
+        session.commit()
+        logger.info("Reset activity rollups for rebuild with the all-users sentinel")
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to migrate activity rollups: {type(e).__name__}: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+_refresher = None
+
+def start_rollup_refresher(interval=ROLLUP_INTERVAL_SECONDS):
+    """Run refresh_rollups() periodically on a daemon thread, so analytics reads never catch up inline"""
+    global _refresher
+    if _refresher is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                refresh_rollups()
+            except Exception:
+                # Already logged; try again next interval
+                pass
+
+    _refresher = threading.Thread(target=run, name='rollup-refresher', daemon=True)
+    _refresher.start()
+    logger.info(f"Rollup refresher started (interval: {interval}s)")
+
+def query_series(session, granularity, since, action_type=None, user_id=None):
+    """Counter rows for a granularity since a point in time, oldest first"""
+    query = session.query(ActivityRollup).filter(
+        ActivityRollup.granularity == granularity,
+        ActivityRollup.bucket_start >= bucket_start(since, granularity)
+    )
+
+    if action_type:
+        query = query.filter(ActivityRollup.action_type == action_type)
+
+    query = query.filter(ActivityRollup.user_id == (ALL_USERS if user_id is None else user_id))
+
+    return query.order_by(ActivityRollup.bucket_start, ActivityRollup.action_type).all()
+
+def query_funnel(session, name, since):
+    """Stage totals for one of the configured funnels"""
+    stages = FUNNELS[name]
+    totals = dict.fromkeys(stages, 0)
+
+    rows = session.query(ActivityRollup).filter(
+        ActivityRollup.granularity == 'day',
+        ActivityRollup.bucket_start >= bucket_start(since, 'day'),
+        ActivityRollup.action_type.in_(stages),
+        ActivityRollup.user_id == ALL_USERS
+    ).all()
+
+    for row in rows:
+        totals[row.action_type] += row.count
+
+    funnel = []
+    first = totals[stages[0]]
+    for stage in stages:
+        funnel.append({
+            "action_type": stage,
+            "count": totals[stage],
+            "conversion": round(totals[stage] / first, 4) if first else 0.0
+        })
+    return funnel
+
+def since_days(days):
+    # Activity timestamps are stored as IST wall-clock time
+    return datetime.now(IST).replace(tzinfo=None) - timedelta(days=days)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    processed = refresh_rollups()
+    logger.info(f"Activity rollup refresh completed: {processed} rows")
@@ -1,22 +1,42 @@
-import sys
 import os
+
+# Green-thread workers have to patch the standard library before anything else imports it
+if os.getenv('SOCKETIO_ASYNC_MODE') == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif os.getenv('SOCKETIO_ASYNC_MODE') == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+import sys
+import hmac
 import logging
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from flask_cors import CORS
-from flask_socketio import SocketIO
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import timedelta
 import os
-from database import init_db, Session
+from database import init_db, Session, engine
 from auth import auth_bp
 from projects import projects_bp
 from notifications import notifications_bp
 from hackathons import hackathon_bp
 from chat import chat_bp
-from admin import admin_bp
+from admin import admin_bp, admin_required
+from dashboard import dashboard_bp
+from deletion import start_purge_sweeper
+from message_archive import start_archiver
+from analytics import start_rollup_refresher
+from password_hashing import hasher
+from token_state import revocations
+from realtime import create_socketio, ASYNC_MODE
+from request_logging import configure_logging, init_request_logging
+from metrics import init_metrics, instrument_socketio, render_metrics, METRICS_TOKEN
+from query_guard import init_query_guard
 
 app = Flask(
     __name__,
@@ -24,16 +44,12 @@ app = Flask(
     static_url_path="/"
 )
 
+# Fork the password hashing workers first: the logging listener, Socket.IO tasks and the
+# background sweepers all start threads, and forking with those alive can deadlock a worker
+hasher.start()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure logging (queued: file and stdout writes happen off the request path)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -41,13 +57,19 @@ logger = logging.getLogger(__name__)
 app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-in-production'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
 
+# Number of reverse proxies in front of the app; only then is X-Forwarded-For trusted for request.remote_addr
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES, x_host=TRUSTED_PROXIES)
+
 # Initialize extensions
 jwt = JWTManager(app)
 CORS(app, supports_credentials=True)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+socketio = create_socketio(app)
+instrument_socketio(socketio)
 
 # Initialize socketio in chat module
-from chat import init_socketio
+from chat import init_socketio, start_message_pipeline
 init_socketio(socketio)
 
 # JWT Error Handlers
@@ -61,32 +83,35 @@ def invalid_token_callback(error):
     logger.warning(f"Invalid token: {error}")
     return jsonify({"error": "Invalid token", "code": "INVALID_TOKEN"}), 401
 
+@jwt.token_in_blocklist_loader
+def token_revoked_check(jwt_header, jwt_payload):
+    # Answered from memory; the DB is only read by the periodic refresh
+    return revocations.is_revoked(jwt_payload)
+
+@jwt.revoked_token_loader
+def revoked_token_callback(jwt_header, jwt_payload):
+    logger.warning(f"Revoked token used by: {jwt_payload.get('sub')}")
+    return jsonify({"error": "Token has been revoked", "code": "TOKEN_REVOKED"}), 401
+
 @jwt.unauthorized_loader
 def missing_token_callback(error):
     logger.warning(f"Missing token: {error}")
     return jsonify({"error": "Authorization token is required", "code": "MISSING_TOKEN"}), 401
 
 # Request logging middleware
-@app.before_request
-def log_request_info():
-    logger.info(f"Request: {request.method} {request.url}")
-    if request.is_json and request.get_json():
-        # Don't log passwords
-        data = request.get_json().copy()
-        if 'password' in data:
-            data['password'] = '[REDACTED]'
-        logger.info(f"Request Body: {data}")
-
-@app.after_request
-def log_response_info(response):
-    logger.info(f"Response: {response.status_code}")
-    return response
+init_request_logging(app)
+init_metrics(app, engine)
+init_query_guard(app, engine)
 
 # Initialize database with error handling
 try:
     logger.info("Initializing database...")
     init_db()
     logger.info("Database initialized successfully")
+    start_purge_sweeper()
+    start_archiver()
+    start_rollup_refresher()
+    start_message_pipeline()
 except Exception as e:
     logger.error(f"Failed to initialize database: {str(e)}")
     logger.error(f"Error type: {type(e).__name__}")
@@ -101,6 +126,7 @@ try:
     app.register_blueprint(hackathon_bp)
     app.register_blueprint(chat_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(dashboard_bp)
     logger.info("All blueprints registered successfully")
 except Exception as e:
     logger.error(f"Failed to register blueprints: {str(e)}")
@@ -129,6 +155,18 @@ def health_check():
             "error": str(e)
         }), 500
 
+def metrics_response():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape target for this process: METRICS_TOKEN as a bearer token, else an admin's JWT"""
+    if METRICS_TOKEN:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}"):
+            return jsonify({"error": "Unauthorized"}), 401
+        return metrics_response()
+    return admin_required(metrics_response)()
+
 @app.errorhandler(400)
 def bad_request(error):
     logger.error(f"Bad Request (400): {error}")
@@ -200,8 +238,13 @@ if __name__ == '__main__':
     logger.info(f"Debug mode: {app.debug}")
     logger.info(f"Environment: {os.getenv('FLASK_ENV', 'development')}")
     
+    debug = os.getenv('FLASK_DEBUG', 'true').lower() == 'true'
+    port = int(os.getenv('PORT', '5000'))
+    
     try:
-        socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+        # eventlet/gevent serve with their own WSGI servers; threading falls back to Werkzeug
+        socketio.run(app, debug=debug, host='0.0.0.0', port=port,
+                     allow_unsafe_werkzeug=(ASYNC_MODE == 'threading'))
     except Exception as e:
         logger.error(f"Failed to start Flask application: {str(e)}")
         raise
\ No newline at end of file
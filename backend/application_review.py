@@ -0,0 +1,94 @@
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from database import User, user_skills
+
+APPLICATION_STATUSES = ('pending', 'accepted', 'rejected')
+REVIEW_SORTS = ('newest', 'oldest', 'skill_overlap', 'status')
+REVIEW_PAGE_SIZE = 20
+MAX_REVIEW_PAGE_SIZE = 100
+
+class ReviewArgumentError(ValueError):
+    """A filter or sort the review endpoints do not support"""
+
+def review_arguments(args):
+    """Filter, sort and page parameters of the application review endpoints
+
+    Paging is opt-in through ?paginate=true; without it per_page is None and the
+    endpoints keep their original response, a bare list of every application.
+    """
+    status = args.get('status', '').strip() or None
+    if status and status not in APPLICATION_STATUSES:
+        raise ReviewArgumentError(f"Status must be one of {', '.join(APPLICATION_STATUSES)}")
+
+    sort = args.get('sort', 'newest')
+    if sort not in REVIEW_SORTS:
+        raise ReviewArgumentError(f"Sort must be one of {', '.join(REVIEW_SORTS)}")
+
+    return {
+        'status': status,
+        'sort': sort,
+        'min_overlap': max(args.get('min_overlap', 0, type=int), 0),
+        'page': max(args.get('page', 1, type=int), 1),
+        'per_page': (min(max(args.get('per_page', REVIEW_PAGE_SIZE, type=int), 1), MAX_REVIEW_PAGE_SIZE)
+                     if args.get('paginate', 'false').lower() == 'true' else None),
+    }
+
+def review_applications(session, model, parent_column, parent_id, target_skill_ids, status=None, sort='newest',
+                        min_overlap=0, page=1, per_page=REVIEW_PAGE_SIZE):
+    """One page of (application, skill_overlap) rows, the filtered total and per-status counts
+
+    skill_overlap is how many of target_skill_ids the applicant has. Applicants come with
+    their skills and roles loaded, so serializing the page issues no further queries.
+    With per_page None every matching row is returned and total and status_counts are None.
+    """
+    status_counts = None
+    if per_page is not None:
+        status_counts = dict.fromkeys(APPLICATION_STATUSES, 0)
+        for row_status, count in session.query(model.status, func.count(model.id)).filter(
+            parent_column == parent_id
+        ).group_by(model.status):
+            status_counts[row_status or 'pending'] = count
+
+    overlap = session.query(
+        user_skills.c.user_id.label('user_id'),
+        func.count().label('overlap')
+    ).filter(user_skills.c.skill_id.in_(target_skill_ids)).group_by(user_skills.c.user_id).subquery()
+    skill_overlap = func.coalesce(overlap.c.overlap, 0)
+
+    query = session.query(model, skill_overlap.label('skill_overlap')).outerjoin(
+        overlap, overlap.c.user_id == model.user_id
+    ).filter(parent_column == parent_id)
+
+    if status:
+        query = query.filter(model.status == status)
+    if min_overlap:
+        query = query.filter(skill_overlap >= min_overlap)
+
+    total = query.count() if per_page is not None else None
+
+    if sort == 'oldest':
+        order = (model.applied_at.asc(), model.id.asc())
+    elif sort == 'skill_overlap':
+        order = (skill_overlap.desc(), model.applied_at.desc(), model.id.desc())
+    elif sort == 'status':
+        order = (model.status.asc(), model.applied_at.desc(), model.id.desc())
+    else:
+        order = (model.applied_at.desc(), model.id.desc())
+
+    query = query.options(
+        joinedload(model.user).selectinload(User.skills),
+        joinedload(model.user).selectinload(User.roles)
+    ).order_by(*order)
+    if per_page is not None:
+        query = query.offset((page - 1) * per_page).limit(per_page)
+    rows = query.all()
+
+    return rows, total, status_counts
+
+def review_pagination(total, page, per_page):
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page
+    }
@@ -1,11 +1,19 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime, timezone
 import pytz
 import re
 import logging
 from database import Session, User, Skill, Role, PortfolioItem, ActivityLog
+from catalog import sync_skills, sync_roles
+from password_hashing import hasher, HashingBusy
+from username_filter import usernames
+from ratelimit import limiter
+from token_state import issue_tokens, token_claims, revocations
+from profile_overview import profile_fields, build_overview, profile_counts, ProfileFieldsError, PRIVATE_FIELDS
+from query_guard import query_budget
+from request_logging import redact
+from sqlalchemy.exc import IntegrityError
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 logger = logging.getLogger(__name__)
@@ -23,6 +31,11 @@ def validate_vit_email(email):
 def validate_password(password):
     return len(password) >= 6
 
+def hashing_busy_response():
+    response = jsonify({"error": "Server is busy, please try again in a moment"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     session = Session()
@@ -46,6 +59,11 @@ def register():
             logger.error("Missing required fields in registration")
             return jsonify({"error": "Username, email, and password are required"}), 400
         
+        if '@' in username:
+            # Login reads an identifier with '@' as an email
+            logger.error(f"Username contains '@': {username}")
+            return jsonify({"error": "Username cannot contain '@'"}), 400
+        
         if not validate_email(email):
             logger.error(f"Invalid email format: {email}")
             return jsonify({"error": "Invalid email format"}), 400
@@ -58,19 +76,8 @@ def register():
             logger.error("Password too short")
             return jsonify({"error": "Password must be at least 6 characters long"}), 400
         
-        # Check if user already exists
-        existing_username = session.query(User).filter_by(username=username).first()
-        if existing_username:
-            logger.error(f"Username already exists: {username}")
-            return jsonify({"error": "Username already exists"}), 409
-        
-        existing_email = session.query(User).filter_by(email=email).first()
-        if existing_email:
-            logger.error(f"Email already exists: {email}")
-            return jsonify({"error": "Email already exists"}), 409
-        
-        # Create new user
-        hashed_password = generate_password_hash(password)
+        # Create new user; the unique indexes on username and email decide duplicates
+        hashed_password = hasher.hash(password)
         new_user = User(
             username=username,
             email=email,
@@ -80,13 +87,22 @@ def register():
         )
         
         session.add(new_user)
-        session.commit()
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            # Only the failure path pays for a lookup, to say which field clashed
+            if session.query(User.id).filter_by(username=username).first():
+                logger.error(f"Username already exists: {username}")
+                return jsonify({"error": "Username already exists"}), 409
+            logger.error(f"Email already exists: {email}")
+            return jsonify({"error": "Email already exists"}), 409
         
+        usernames.add(username)
         logger.info(f"User created successfully: {username} (ID: {new_user.id})")
         
         # Create tokens
-        access_token = create_access_token(identity=new_user.username)
-        refresh_token = create_refresh_token(identity=new_user.username)
+        access_token, refresh_token = issue_tokens(new_user)
         
         logger.info(f"Tokens created for user: {username}")
         
@@ -103,10 +119,13 @@ def register():
             }
         }), 201
         
+    except HashingBusy:
+        logger.warning("Registration rejected: password hashing pool saturated")
+        return hashing_busy_response()
     except Exception as e:
         session.rollback()
         logger.error(f"Registration failed: {type(e).__name__}: {str(e)}")
-        logger.error(f"Registration data: {data if 'data' in locals() else 'No data'}")
+        logger.error(f"Registration data: {redact(data) if 'data' in locals() else 'No data'}")
         return jsonify({"error": "Registration failed", "details": str(e)}), 500
     finally:
         session.close()
@@ -131,10 +150,13 @@ def login():
             logger.error("Missing username or password")
             return jsonify({"error": "Username and password are required"}), 400
         
-        # Find user by username or email
-        user = session.query(User).filter(
-            (User.username == username) | (User.email == username)
-        ).first()
+        # One probe against one unique index: emails contain '@', usernames are matched as given.
+        # Usernames registered before '@' was refused still get a second probe on the username index
+        user = None
+        if '@' in username:
+            user = session.query(User).filter_by(email=username.lower()).first()
+        if not user:
+            user = session.query(User).filter_by(username=username).first()
 
         if not user:
             logger.error(f"User not found: {username}")
@@ -144,7 +166,7 @@ def login():
             logger.error(f"Login attempt with non-VIT email: {user.email}")
             return jsonify({"error": "Only @vitstudent.ac.in email addresses are allowed"}), 401
         
-        if not check_password_hash(user.password, password):
+        if not hasher.verify(user.password, password):
             logger.error(f"Invalid password for user: {username}")
             return jsonify({"error": "Invalid credentials"}), 401
         
@@ -152,6 +174,12 @@ def login():
             logger.error(f"Inactive account login attempt: {username}")
             return jsonify({"error": "Account is disabled"}), 401
         
+        # Upgrade hashes made with older parameters while the plaintext is at hand
+        if hasher.needs_rehash(user.password):
+            user.password = hasher.hash(password)
+            hasher.count('rehashed')
+            logger.info(f"Rehashed password for user: {user.username}")
+        
         # Update last login
         user.last_login = datetime.now(IST)
         session.commit()
@@ -159,8 +187,7 @@ def login():
         logger.info(f"User logged in successfully: {username} (ID: {user.id})")
         
         # Create tokens
-        access_token = create_access_token(identity=user.username)
-        refresh_token = create_refresh_token(identity=user.username)
+        access_token, refresh_token = issue_tokens(user)
         
         return jsonify({
             "message": "Login successful",
@@ -179,24 +206,66 @@ def login():
             }
         }), 200
         
+    except HashingBusy:
+        logger.warning("Login rejected: password hashing pool saturated")
+        return hashing_busy_response()
     except Exception as e:
         logger.error(f"Login failed: {type(e).__name__}: {str(e)}")
-        logger.error(f"Login data: {data if 'data' in locals() else 'No data'}")
+        logger.error(f"Login data: {redact(data) if 'data' in locals() else 'No data'}")
         return jsonify({"error": "Login failed", "details": str(e)}), 500
     finally:
         session.close()
 
+@auth_bp.route('/username-available', methods=['GET'])
+def username_available():
+    """Signup-form check; names never registered are answered from a bloom filter without touching the DB"""
+    try:
+        username = request.args.get('username', '').strip()
+        if not username:
+            return jsonify({"error": "Username is required"}), 400
+        
+        # Anonymous, so the address is all there is to key on (its bucket is scaled up for shared NATs)
+        if not limiter.check('username_available', ip=request.remote_addr)[0]:
+            return jsonify({"error": "Too many requests"}), 429
+        
+        available = '@' not in username and usernames.is_available(username)
+        return jsonify({"username": username, "available": available}), 200
+        
+    except Exception as e:
+        logger.error(f"Username availability check failed: {type(e).__name__}: {str(e)}")
+        return jsonify({"error": "Failed to check username"}), 500
+
 @auth_bp.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
+    session = Session()
     try:
         current_user = get_jwt_identity()
         logger.info(f"Token refresh for user: {current_user}")
-        access_token = create_access_token(identity=current_user)
+        # Once an hour per user: pick up admin flag changes for the claims
+        user = session.query(User).filter_by(username=current_user).first()
+        if not user or not user.is_active:
+            return jsonify({"error": "Account is disabled"}), 401
+        access_token = create_access_token(identity=user.username, additional_claims=token_claims(user))
         return jsonify({"access_token": access_token}), 200
     except Exception as e:
         logger.error(f"Token refresh failed: {type(e).__name__}: {str(e)}")
         return jsonify({"error": "Token refresh failed", "details": str(e)}), 500
+    finally:
+        session.close()
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """Revoke the presented token (call once with the access and once with the refresh token)"""
+    try:
+        claims = get_jwt()
+        revocations.revoke_token(claims['jti'], claims['exp'], claims.get('uid'))
+        logger.info(f"Token revoked for user: {claims['sub']} ({claims['type']})")
+        return jsonify({"message": "Logged out"}), 200
+    except Exception as e:
+        logger.error(f"Logout failed: {type(e).__name__}: {str(e)}")
+        return jsonify({"error": "Logout failed"}), 500
 
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
@@ -212,9 +281,7 @@ def get_profile():
             logger.error(f"User not found in profile request: {current_user_id}")
             return jsonify({"error": "User not found"}), 404
         
-        # Get user stats
-        project_count = len(user.projects)
-        skills_count = len(user.skills)
+        counts = profile_counts(session, user.id)
         
         logger.info(f"Profile data retrieved for user: {current_user_id}")
         
@@ -236,8 +303,8 @@ def get_profile():
             "avatar_url": user.avatar_url,
             "is_active": user.is_active,
             "is_admin": user.is_admin,
-            "project_count": project_count,
-            "skills_count": skills_count,
+            "project_count": counts["projects"],
+            "skills_count": counts["skills"],
             "created_at": user.created_at.astimezone(IST).isoformat(),
             "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in user.skills],
             "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category} for role in user.roles]
@@ -294,17 +361,13 @@ def update_profile():
         
         # Update skills
         if 'skill_ids' in data:
-            skill_ids = data['skill_ids']
-            skills = session.query(Skill).filter(Skill.id.in_(skill_ids)).all()
-            user.skills = skills
-            logger.info(f"Updated skills for user {current_user_id}: {len(skills)} skills")
+            skill_ids = sync_skills(session, user, data['skill_ids'])
+            logger.info(f"Updated skills for user {current_user_id}: {len(skill_ids)} skills")
         
         # Update roles
         if 'role_ids' in data:
-            role_ids = data['role_ids']
-            roles = session.query(Role).filter(Role.id.in_(role_ids)).all()
-            user.roles = roles
-            logger.info(f"Updated roles for user {current_user_id}: {len(roles)} roles")
+            role_ids = sync_roles(session, user, data['role_ids'])
+            logger.info(f"Updated roles for user {current_user_id}: {len(role_ids)} roles")
         
         user.updated_at = datetime.now(IST)
         session.commit()
@@ -383,9 +446,7 @@ def get_user_profile(user_id):
             logger.error(f"User not found: {user_id}")
             return jsonify({"error": "User not found"}), 404
         
-        # Get user stats
-        project_count = len(user.projects)
-        skills_count = len(user.skills)
+        counts = profile_counts(session, user.id)
         
         logger.info(f"User profile retrieved: {user.username}")
         
@@ -404,8 +465,8 @@ def get_user_profile(user_id):
             "availability": user.availability,
             "open_to_opportunities": user.open_to_opportunities,
             "avatar_url": user.avatar_url,
-            "project_count": project_count,
-            "skills_count": skills_count,
+            "project_count": counts["projects"],
+            "skills_count": counts["skills"],
             "created_at": user.created_at.astimezone(IST).isoformat(),
             "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in user.skills],
             "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category} for role in user.roles]
@@ -417,6 +478,38 @@ def get_user_profile(user_id):
     finally:
         session.close()
 
+@auth_bp.route('/users/<int:user_id>/overview', methods=['GET'])
+@jwt_required()
+@query_budget(8)
+def get_user_overview(user_id):
+    """Profile, counts, portfolio and recent activity in one response; fields= picks the sections"""
+    session = Session()
+    try:
+        viewer_id = get_jwt().get('uid')
+        if viewer_id is None:
+            # Token issued before the id claim existed
+            viewer = session.query(User.id).filter_by(username=get_jwt_identity()).first()
+            viewer_id = viewer.id if viewer else None
+        own_profile = viewer_id == user_id
+
+        fields = profile_fields(request.args, own_profile)
+        if not own_profile and any(field in PRIVATE_FIELDS for field in fields):
+            return jsonify({"error": "Activity is only visible to its owner"}), 403
+
+        overview = build_overview(session, user_id, fields)
+        if overview is None:
+            return jsonify({"error": "User not found"}), 404
+
+        return jsonify(overview), 200
+
+    except ProfileFieldsError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to fetch user overview: {type(e).__name__}: {str(e)}")
+        return jsonify({"error": "Failed to fetch user profile"}), 500
+    finally:
+        session.close()
+
 @auth_bp.route('/portfolio', methods=['GET'])
 @jwt_required()
 def get_portfolio():
@@ -0,0 +1,208 @@
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import base64
+import time
+import os
+import logging
+from database import SessionFactory, Project, user_bookmarks, IST, UPSERT_DIALECTS
+from counters import adjust_project_counters
+from dashboard import dashboard_cache
+
+logger = logging.getLogger(__name__)
+
+# Writes by this process update the cached set at once. Other processes keep serving their
+# cached set, so a bookmark made through another worker shows up there within this TTL
+BOOKMARK_CACHE_SECONDS = int(os.getenv('BOOKMARK_CACHE_SECONDS', '30'))
+BOOKMARK_CACHE_USERS = int(os.getenv('BOOKMARK_CACHE_USERS', '10000'))
+BOOKMARK_PAGE_SIZE = 20
+MAX_BOOKMARK_PAGE_SIZE = 100
+MAX_BULK_BOOKMARKS = 100
+
+class BookmarkCursorError(ValueError):
+    """A listing cursor that was not issued by list_bookmarks"""
+
+class BookmarkCache:
+    """Each user's bookmarked project ids as a frozenset, so list endpoints can flag rows in O(1)"""
+
+    def __init__(self, ttl=BOOKMARK_CACHE_SECONDS, max_users=BOOKMARK_CACHE_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        # user_id -> (expires_at, frozenset of project ids), least recently used first
+        self._sets = OrderedDict()
+        # user_id -> count of changes seen, so a load that raced a change is not cached
+        self._generations = {}
+        self.stats = {'hits': 0, 'loads': 0}
+
+    def _load(self, user_id):
+        session = SessionFactory()
+        try:
+            # Joined so bookmarks of soft-deleted projects drop out
+            return frozenset(project_id for (project_id,) in session.query(user_bookmarks.c.project_id).join(
+                Project, Project.id == user_bookmarks.c.project_id
+            ).filter(user_bookmarks.c.user_id == user_id, Project.deleted_at.is_(None)))
+        finally:
+            session.close()
+
+    def ids(self, user_id):
+        with self._lock:
+            entry = self._sets.get(user_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._sets.move_to_end(user_id)
+                self.stats['hits'] += 1
+                return entry[1]
+            generation = self._generations.get(user_id, 0)
+
+        ids = self._load(user_id)
+        self._store(user_id, ids, generation)
+        return ids
+
+    def _store(self, user_id, ids, generation):
+        with self._lock:
+            self.stats['loads'] += 1
+            # A change committed while loading may be missing from ids; the next read loads again
+            if self._generations.get(user_id, 0) != generation:
+                return
+            self._sets[user_id] = (time.monotonic() + self.ttl, ids)
+            self._sets.move_to_end(user_id)
+            while len(self._sets) > self.max_users:
+                self._sets.popitem(last=False)
+
+    def update(self, user_id, added=(), removed=()):
+        """Apply a committed change to a cached set (an uncached user is loaded on next use)"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            entry = self._sets.get(user_id)
+            if entry is not None:
+                self._sets[user_id] = (entry[0], (entry[1] | frozenset(added)) - frozenset(removed))
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+                self._sets.pop(user_id, None)
+
+bookmark_cache = BookmarkCache()
+
+def bookmarked_ids(user_id):
+    return bookmark_cache.ids(user_id) if user_id is not None else frozenset()
+
+def _encode_cursor(created_at, project_id):
+    raw = f"{created_at.isoformat()}|{project_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, project_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(project_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise BookmarkCursorError('Invalid cursor') from e
+
+def list_bookmarks(session, user_id, cursor=None, limit=BOOKMARK_PAGE_SIZE, options=()):
+    """Newest bookmarks first, keyset-paged on (created_at, project_id); returns (rows, next_cursor)
+
+    Each row is (project, bookmarked_at). The cursor is opaque to clients.
+    """
+    query = session.query(Project, user_bookmarks.c.created_at).join(
+        user_bookmarks, user_bookmarks.c.project_id == Project.id
+    ).filter(user_bookmarks.c.user_id == user_id)
+
+    if cursor:
+        created_at, project_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            user_bookmarks.c.created_at < created_at,
+            and_(user_bookmarks.c.created_at == created_at, user_bookmarks.c.project_id < project_id)
+        ))
+
+    rows = query.options(*options).order_by(
+        user_bookmarks.c.created_at.desc(), user_bookmarks.c.project_id.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        project, created_at = rows[-1]
+        next_cursor = _encode_cursor(created_at, project.id)
+    return rows, next_cursor
+
+def _changed(user_id, project_ids, added):
+    dashboard_cache.invalidate([user_id])
+    if added:
+        bookmark_cache.update(user_id, added=project_ids)
+    else:
+        bookmark_cache.update(user_id, removed=project_ids)
+
+def _insert_new(session, rows):
+    """Insert bookmark rows, skipping any that already exist; returns the project ids actually inserted"""
+    dialect_insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(user_bookmarks).values(rows).on_conflict_do_nothing().returning(
+            user_bookmarks.c.project_id)
+        return sorted(project_id for (project_id,) in session.execute(statement))
+
+    inserted = []
+    for row in rows:
+        try:
+            with session.begin_nested():
+                session.execute(user_bookmarks.insert().values(**row))
+            inserted.append(row['project_id'])
+        except IntegrityError:
+            # Bookmarked concurrently since the caller looked
+            pass
+    return inserted
+
+def add_bookmarks(session, user_id, project_ids):
+    """Bookmark every listed project that exists and is not bookmarked yet; returns the ids newly added
+
+    Repeating a call changes nothing, including when two calls race: conflicting inserts
+    are skipped and only rows actually inserted count. Commits the session.
+    """
+    project_ids = set(project_ids)
+    if not project_ids:
+        return []
+
+    valid = sorted(project_id for (project_id,) in session.query(Project.id).filter(Project.id.in_(project_ids)))
+    added = []
+    if valid:
+        now = datetime.now(IST)
+        added = _insert_new(session, [
+            {'user_id': user_id, 'project_id': project_id, 'created_at': now} for project_id in valid
+        ])
+        if added:
+            adjust_project_counters(session, added, bookmarks=1)
+    session.commit()
+
+    if added:
+        _changed(user_id, added, added=True)
+    return added
+
+def remove_bookmarks(session, user_id, project_ids):
+    """Remove every listed bookmark that exists; returns the ids actually removed. Commits the session.
+
+    The delete reports which rows it removed, so a concurrent removal is not counted twice.
+    """
+    project_ids = set(project_ids)
+    if not project_ids:
+        return []
+
+    def delete(ids):
+        return user_bookmarks.delete().where(
+            user_bookmarks.c.user_id == user_id, user_bookmarks.c.project_id.in_(ids))
+
+    if session.get_bind().dialect.delete_returning:
+        removed = sorted(project_id for (project_id,) in session.execute(
+            delete(project_ids).returning(user_bookmarks.c.project_id)))
+    else:
+        removed = [project_id for project_id in sorted(project_ids)
+                   if session.execute(delete([project_id])).rowcount]
+    if removed:
+        adjust_project_counters(session, removed, bookmarks=-1)
+    session.commit()
+
+    if removed:
+        _changed(user_id, removed, added=False)
+    return removed
@@ -0,0 +1,261 @@
+from sqlalchemy import insert
+from datetime import datetime
+import argparse
+import csv
+import io
+import json
+import logging
+from database import SessionFactory, User, Project, HackathonPost, ActivityLog, project_skills, project_roles, hackathon_skills, hackathon_roles, IST
+from catalog import resolve_skill_names, resolve_role_names
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+MAX_ROWS = 5000
+
+class ImportRowError(ValueError):
+    pass
+
+def parse_records(raw, fmt):
+    """Yield (row_number, record) pairs from an NDJSON or CSV payload"""
+    if fmt == 'ndjson':
+        for number, line in enumerate(raw.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, ImportRowError(f"Invalid JSON: {str(e)}")
+                continue
+            if not isinstance(record, dict):
+                yield number, ImportRowError("Each line must be a JSON object")
+                continue
+            yield number, record
+    elif fmt == 'csv':
+        # Row 1 is the header, so data rows start at 2 to match what editors show
+        for number, record in enumerate(csv.DictReader(io.StringIO(raw)), start=2):
+            yield number, record
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+def _names(value):
+    """Skill/role names arrive as a JSON list or a ';'-separated CSV cell"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [name for name in str(value).split(';') if name.strip()]
+
+def _text(record, field):
+    value = record.get(field)
+    return str(value).strip() if value is not None else ''
+
+def _resolve_associations(record):
+    skill_ids, unknown_skills = resolve_skill_names(_names(record.get('skills')))
+    role_ids, unknown_roles = resolve_role_names(_names(record.get('roles')))
+    if unknown_skills:
+        raise ImportRowError(f"Unknown skills: {', '.join(unknown_skills)}")
+    if unknown_roles:
+        raise ImportRowError(f"Unknown roles: {', '.join(unknown_roles)}")
+    return skill_ids, role_ids
+
+def _build_project(record, owner_id):
+    name = _text(record, 'name')
+    if not name:
+        raise ImportRowError("Project name is required")
+
+    skill_ids, role_ids = _resolve_associations(record)
+    now = datetime.now(IST)
+    row = {
+        'name': name,
+        'description': _text(record, 'description'),
+        'github_url': _text(record, 'github_url'),
+        'live_url': _text(record, 'live_url'),
+        'status': _text(record, 'status') or 'active',
+        'is_active': True,
+        'owner_id': owner_id,
+        'created_at': now,
+        'updated_at': now
+    }
+    return row, skill_ids, role_ids
+
+def _build_hackathon(record, owner_id):
+    title = _text(record, 'title')
+    hackathon_name = _text(record, 'hackathon_name')
+    if not title or not hackathon_name:
+        raise ImportRowError("Title and hackathon name are required")
+
+    hackathon_date = None
+    if _text(record, 'hackathon_date'):
+        try:
+            hackathon_date = datetime.fromisoformat(_text(record, 'hackathon_date').replace('Z', '+00:00')).astimezone(IST)
+        except ValueError:
+            raise ImportRowError("Invalid date format")
+
+    max_team_size = None
+    if _text(record, 'max_team_size'):
+        try:
+            max_team_size = int(_text(record, 'max_team_size'))
+        except ValueError:
+            raise ImportRowError("Invalid team size")
+        if max_team_size < 1:
+            raise ImportRowError("Team size must be at least 1")
+
+    skill_ids, role_ids = _resolve_associations(record)
+    row = {
+        'title': title,
+        'description': _text(record, 'description'),
+        'hackathon_name': hackathon_name,
+        'hackathon_date': hackathon_date,
+        'max_team_size': max_team_size,
+        'current_member_count': 0,
+        'is_active': True,
+        'owner_id': owner_id,
+        'created_at': datetime.now(IST)
+    }
+    return row, skill_ids, role_ids
+
+IMPORTERS = {
+    'projects': {
+        'model': Project,
+        'build': _build_project,
+        'skills_table': project_skills,
+        'roles_table': project_roles,
+        'fk': 'project_id',
+        'action_type': 'created_project',
+        'describe': lambda row: f"Created project '{row['name']}'"
+    },
+    'hackathons': {
+        'model': HackathonPost,
+        'build': _build_hackathon,
+        'skills_table': hackathon_skills,
+        'roles_table': hackathon_roles,
+        'fk': 'hackathon_id',
+        'action_type': 'created_hackathon',
+        'describe': lambda row: f"Created team search '{row['title']}' for {row['hackathon_name']}"
+    }
+}
+
+def _resolve_owners(session, records, default_owner_id):
+    usernames = {_text(record, 'owner_username') for _, record in records if isinstance(record, dict)}
+    usernames.discard('')
+    owners = {}
+    if usernames:
+        owners = dict(session.query(User.username, User.id).filter(User.username.in_(usernames)).all())
+
+    def owner_for(record):
+        username = _text(record, 'owner_username')
+        if not username:
+            return default_owner_id
+        if username not in owners:
+            raise ImportRowError(f"Unknown owner: {username}")
+        return owners[username]
+
+    return owner_for
+
+def _insert_batch(session, importer, batch):
+    """Insert one batch with executemany statements; returns the new ids"""
+    model = importer['model']
+    result = session.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True),
+        [row for _, row, _, _ in batch]
+    )
+    new_ids = [row_id for (row_id,) in result]
+
+    skill_rows = []
+    role_rows = []
+    activity_rows = []
+    for new_id, (_, row, skill_ids, role_ids) in zip(new_ids, batch):
+        skill_rows.extend({importer['fk']: new_id, 'skill_id': skill_id} for skill_id in skill_ids)
+        role_rows.extend({importer['fk']: new_id, 'role_id': role_id} for role_id in role_ids)
+        activity_rows.append({
+            'user_id': row['owner_id'],
+            'action_type': importer['action_type'],
+            'action_description': importer['describe'](row)[:255],
+            'related_id': new_id,
+            'created_at': datetime.now(IST)
+        })
+
+    if skill_rows:
+        session.execute(importer['skills_table'].insert(), skill_rows)
+    if role_rows:
+        session.execute(importer['roles_table'].insert(), role_rows)
+    session.execute(insert(ActivityLog), activity_rows)
+    return new_ids
+
+def import_records(kind, records, default_owner_id, batch_size=BATCH_SIZE):
+    """Validate and insert records in batched transactions, collecting per-row errors"""
+    importer = IMPORTERS[kind]
+    records = list(records)
+    session = SessionFactory()
+    try:
+        owner_for = _resolve_owners(session, records, default_owner_id)
+
+        errors = []
+        valid = []
+        for number, record in records:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                row, skill_ids, role_ids = importer['build'](record, owner_for(record))
+                valid.append((number, row, skill_ids, role_ids))
+            except ImportRowError as e:
+                errors.append({"row": number, "error": str(e)})
+
+        created = []
+        for start in range(0, len(valid), batch_size):
+            batch = valid[start:start + batch_size]
+            try:
+                created.extend(_insert_batch(session, importer, batch))
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.warning(f"Batch import of {kind} failed, retrying row by row: {type(e).__name__}: {str(e)}")
+                # Isolate the offending rows without losing the rest of the batch
+                for item in batch:
+                    try:
+                        created.extend(_insert_batch(session, importer, [item]))
+                        session.commit()
+                    except Exception as row_error:
+                        session.rollback()
+                        errors.append({"row": item[0], "error": f"{type(row_error).__name__}: {str(row_error)}"})
+
+        errors.sort(key=lambda error: error['row'])
+        logger.info(f"Imported {len(created)} {kind} ({len(errors)} rows rejected)")
+        return {
+            "created": len(created),
+            "created_ids": created,
+            "failed": len(errors),
+            "errors": errors
+        }
+
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk import projects or hackathon posts from NDJSON or CSV')
+    parser.add_argument('kind', choices=sorted(IMPORTERS))
+    parser.add_argument('path')
+    parser.add_argument('--owner', required=True, help='username that owns rows without an owner_username')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], help='defaults to the file extension')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fmt = args.format or ('csv' if args.path.lower().endswith('.csv') else 'ndjson')
+
+    session = SessionFactory()
+    try:
+        owner = session.query(User).filter_by(username=args.owner).first()
+        if not owner:
+            raise SystemExit(f"Unknown owner: {args.owner}")
+        owner_id = owner.id
+    finally:
+        session.close()
+
+    with open(args.path, encoding='utf-8') as handle:
+        summary = import_records(args.kind, parse_records(handle.read(), fmt), owner_id, batch_size=args.batch_size)
+
+    for error in summary['errors']:
+        print(f"row {error['row']}: {error['error']}")
+    print(f"created={summary['created']} failed={summary['failed']}")
@@ -0,0 +1,152 @@
+from sqlalchemy import select
+import threading
+import time
+import os
+import logging
+from database import SessionFactory, Skill, Role, User, Project, HackathonPost, user_skills, user_roles, project_skills, project_roles, hackathon_skills, hackathon_roles
+
+logger = logging.getLogger(__name__)
+
+# Skills and roles are seeded by init_db and rarely change, so lookups use a process-wide
+# snapshot. A name or id missing from it reloads the snapshot (at most once per interval,
+# so junk input cannot turn every lookup into a query), which picks up skills and roles
+# added at runtime without restarting the worker.
+CATALOG_RELOAD_SECONDS = float(os.getenv('CATALOG_RELOAD_SECONDS', '5'))
+_lock = threading.Lock()
+_snapshot = None
+_loaded_at = 0.0
+
+def _load():
+    session = SessionFactory()
+    try:
+        skills = session.query(Skill.id, Skill.name).all()
+        roles = session.query(Role.id, Role.name).all()
+        snapshot = {
+            'skill_names': {name.lower(): skill_id for skill_id, name in skills},
+            'role_names': {name.lower(): role_id for role_id, name in roles},
+            'skill_ids': frozenset(skill_id for skill_id, _ in skills),
+            'role_ids': frozenset(role_id for role_id, _ in roles)
+        }
+        logger.info(f"Loaded catalog: {len(skills)} skills, {len(roles)} roles")
+        return snapshot
+    finally:
+        session.close()
+
+def _get():
+    global _snapshot, _loaded_at
+    snapshot = _snapshot
+    if snapshot is None:
+        with _lock:
+            if _snapshot is None:
+                _snapshot = _load()
+                _loaded_at = time.monotonic()
+            snapshot = _snapshot
+    return snapshot
+
+def _reload_after_miss():
+    """Snapshot to retry a missed lookup against, reloaded unless that happened very recently"""
+    global _snapshot, _loaded_at
+    with _lock:
+        if _snapshot is None or time.monotonic() - _loaded_at >= CATALOG_RELOAD_SECONDS:
+            _snapshot = _load()
+            _loaded_at = time.monotonic()
+        return _snapshot
+
+def invalidate():
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+def _resolve(names, lookup):
+    ids = []
+    unknown = []
+    for name in names:
+        key = str(name).strip().lower()
+        if not key:
+            continue
+        if key in lookup:
+            if lookup[key] not in ids:
+                ids.append(lookup[key])
+        else:
+            unknown.append(str(name).strip())
+    return ids, unknown
+
+def _resolve_names(names, key):
+    ids, unknown = _resolve(names, _get()[key])
+    if unknown:
+        ids, unknown = _resolve(names, _reload_after_miss()[key])
+    return ids, unknown
+
+def resolve_skill_names(names):
+    """Map skill names (case-insensitive) to ids; returns (ids, unknown_names)"""
+    return _resolve_names(names, 'skill_names')
+
+def resolve_role_names(names):
+    """Map role names (case-insensitive) to ids; returns (ids, unknown_names)"""
+    return _resolve_names(names, 'role_names')
+
+def _valid_ids(ids, key):
+    requested = []
+    for value in ids or []:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            continue
+        if value not in requested:
+            requested.append(value)
+
+    known = _get()[key]
+    if any(value not in known for value in requested):
+        known = _reload_after_miss()[key]
+    return [value for value in requested if value in known]
+
+def valid_skill_ids(ids):
+    """Keep the ids that name an existing skill, querying only when one is not in the snapshot"""
+    return _valid_ids(ids, 'skill_ids')
+
+def valid_role_ids(ids):
+    """Keep the ids that name an existing role, querying only when one is not in the snapshot"""
+    return _valid_ids(ids, 'role_ids')
+
+def sync_association(session, table, owner_column, owner_id, target_column, target_ids):
+    """Bring one owner's association rows in line with target_ids, touching only the difference"""
+    owner_col = table.c[owner_column]
+    target_col = table.c[target_column]
+
+    current = set(session.execute(select(target_col).where(owner_col == owner_id)).scalars())
+    wanted = set(target_ids)
+    removed = current - wanted
+    added = wanted - current
+
+    if removed:
+        session.execute(table.delete().where(owner_col == owner_id, target_col.in_(removed)))
+    if added:
+        session.execute(table.insert(), [{owner_column: owner_id, target_column: target_id} for target_id in sorted(added)])
+
+    return added, removed
+
+# owner model -> (skills table, roles table, owner column)
+_ASSOCIATIONS = {
+    User: (user_skills, user_roles, 'user_id'),
+    Project: (project_skills, project_roles, 'project_id'),
+    HackathonPost: (hackathon_skills, hackathon_roles, 'hackathon_id'),
+}
+
+def _sync(session, owner, table_index, target_column, relationship_name, ids):
+    tables = _ASSOCIATIONS[type(owner)]
+    if owner.id is None:
+        session.flush()
+
+    added, removed = sync_association(session, tables[table_index], tables[2], owner.id, target_column, ids)
+    if added or removed:
+        # The rows changed underneath the ORM; reload the collection on next access
+        session.expire(owner, [relationship_name])
+    return ids
+
+def sync_skills(session, owner, skill_ids):
+    """Set a user's, project's or hackathon post's skills; returns the valid ids applied"""
+    return _sync(session, owner, 0, 'skill_id', 'skills', valid_skill_ids(skill_ids))
+
+def sync_roles(session, owner, role_ids):
+    """Set a user's, project's or hackathon post's roles; returns the valid ids applied"""
+    return _sync(session, owner, 1, 'role_id', 'roles', valid_role_ids(role_ids))
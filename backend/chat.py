@@ -1,8 +1,19 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-from database import Session, User, Message
-from flask_socketio import SocketIO, emit, join_room, leave_room
+from sqlalchemy import func, or_
+from database import Session, User, Message, ConversationMessage, MessageReadMark
+from flask_socketio import SocketIO, emit, join_room, leave_room, ConnectionRefusedError
+from connections import authenticate, current_connection, registry
+from presence import presence, user_room, init_presence, emit_to_user
+from message_pipeline import pipeline, new_message_row, WRITE_BEHIND
+from message_archive import load_history, count_history
+from ratelimit import limiter, rate_limited
+from typing_indicators import typing_coalescer, start_typing_expiry
+from read_state import (pair_watermarks, message_is_read, mark_messages_read, unread_message_counts,
+                        unread_message_total)
+from group_chat import (group_room, membership, member_conversation_ids, list_conversations, sync_group,
+                        mark_read, serialize_group_message, on_room_changes)
 import logging
 
 chat_bp = Blueprint('chat', __name__, url_prefix='/api/chat')
@@ -11,44 +22,240 @@ logger = logging.getLogger(__name__)
 # This will be initialized in app.py
 socketio = None
 
+def chat_room(user_id, other_user_id):
+    """Consistent room name for a pair of users"""
+    return f"chat_{min(user_id, other_user_id)}_{max(user_id, other_user_id)}"
+
+def _user_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+SYNC_PAGE_SIZE = 50
+SYNC_MAX_PAGE_SIZE = 200
+
+def serialize_message(message, user_id, watermarks):
+    return {
+        "id": message.id,
+        "content": message.content,
+        "sender_id": message.sender_id,
+        "receiver_id": message.receiver_id,
+        "is_read": message_is_read(message, watermarks),
+        "created_at": message.created_at.isoformat(),
+        "is_own": message.sender_id == user_id
+    }
+
+def mark_conversation_read(session, user_id, other_user_id):
+    """Move the user's watermark for this conversation to its newest message; returns it, or None if unchanged"""
+    return mark_messages_read(session, user_id, other_user_id)
+
+def announce_read(user_id, other_user_id, last_read_id):
+    """Tell the sender how far their messages have been read"""
+    if last_read_id:
+        emit_to_user(other_user_id, 'messages_read', {"user_id": user_id, "last_read_id": last_read_id})
+
+def sync_conversation(session, user_id, other_user_id, after_id=None, before_id=None, limit=SYNC_PAGE_SIZE, read_id=None):
+    """Only the messages a client is missing: newer than after_id, or older than before_id for scrollback.
+    
+    Pages are fetched with limit + 1 rows instead of counting the conversation, and
+    scrollback continues into the monthly archives once the hot table runs out.
+    """
+    rows = load_history(session, user_id, other_user_id, after_id=after_id, before_id=before_id, limit=limit)
+    if after_id is not None:
+        messages = rows[:limit]
+    else:
+        messages = list(reversed(rows[:limit]))
+    
+    # Read receipt: how far the other user has read what this user sent, only when it moved
+    watermarks = pair_watermarks(session, user_id, other_user_id)
+    their_last_read = watermarks.get((other_user_id, user_id), 0)
+    read_receipt = None
+    if their_last_read and (read_id is None or their_last_read > read_id):
+        read_receipt = {"user_id": other_user_id, "last_read_id": their_last_read}
+    
+    return {
+        "messages": [serialize_message(message, user_id, watermarks) for message in messages],
+        "has_more": len(rows) > limit,
+        "last_id": messages[-1].id if messages else after_id,
+        "read_receipt": read_receipt
+    }
+
+def _sync_arguments(values):
+    limit = _user_id(values.get('limit')) or SYNC_PAGE_SIZE
+    return {
+        "after_id": _user_id(values.get('after_id')),
+        "before_id": _user_id(values.get('before_id')),
+        "limit": max(1, min(limit, SYNC_MAX_PAGE_SIZE)),
+        "read_id": _user_id(values.get('read_id'))
+    }
+
+def _admit(connection, event):
+    """Token-bucket check for a socket event; the sender is told when and for how long it is limited"""
+    allowed, retry_after = limiter.check(event, user_id=connection.username, connection_id=connection.sid)
+    if not allowed:
+        emit('rate_limited', {"event": event, "retry_after": round(retry_after, 2)})
+    return allowed
+
 def init_socketio(app_socketio):
     global socketio
     socketio = app_socketio
+    init_presence(socketio)
+    start_typing_expiry(socketio)
+    on_room_changes(_update_group_rooms)
     
     # Register socket event handlers
+    @socketio.on('connect')
+    def on_connect(auth=None):
+        """Verify the JWT once per connection and remember who it belongs to"""
+        connection = authenticate(auth)
+        if connection is None:
+            logger.warning("Rejected unauthenticated socket connection")
+            raise ConnectionRefusedError('unauthorized')
+        
+        registry.add(connection)
+        
+        # Personal room: reaches the user from any conversation or page
+        join_room(user_room(connection.user_id))
+        connection.rooms.add(user_room(connection.user_id))
+        presence.connect(connection.user_id, connection.sid)
+        
+        # Group messages are fanned out through one room per conversation
+        session = Session()
+        try:
+            for conversation_id in member_conversation_ids(session, connection.user_id):
+                join_room(group_room(conversation_id))
+                connection.rooms.add(group_room(conversation_id))
+        finally:
+            session.close()
+        
+        logger.info(f"User {connection.user_id} connected (sid: {connection.sid})")
+
+    @socketio.on('disconnect')
+    def on_disconnect():
+        connection = registry.remove(request.sid)
+        if connection:
+            presence.disconnect(connection.user_id, connection.sid)
+            for room, user_id in typing_coalescer.drop_sid(connection.sid):
+                emit('user_typing', {'user_id': user_id, 'is_typing': False}, room=room, include_self=False)
+            logger.info(f"User {connection.user_id} disconnected (sid: {connection.sid})")
+
+    @socketio.on('heartbeat')
+    def on_heartbeat(data=None):
+        """Keep the user marked online"""
+        connection = current_connection()
+        if connection:
+            presence.heartbeat(connection.user_id, connection.sid)
+
     @socketio.on('join_chat')
     def on_join_chat(data):
         """Join a chat room for real-time messaging"""
         try:
-            user_id = data.get('user_id')
-            other_user_id = data.get('other_user_id')
+            connection = current_connection()
+            other_user_id = _user_id(data.get('other_user_id'))
             
-            if not user_id or not other_user_id:
+            if not connection or not other_user_id:
                 return
             
-            # Create a consistent room name for both users
-            room = f"chat_{min(user_id, other_user_id)}_{max(user_id, other_user_id)}"
+            room = chat_room(connection.user_id, other_user_id)
             join_room(room)
+            connection.rooms.add(room)
             
-            logger.info(f"User {user_id} joined chat room {room}")
+            logger.info(f"User {connection.user_id} joined chat room {room}")
             
         except Exception as e:
             logger.error(f"Error joining chat room: {str(e)}")
 
+    @socketio.on('sync_messages')
+    def on_sync_messages(data):
+        """Catch up after a reconnect; the result is returned through the client's ack callback"""
+        session = Session()
+        try:
+            connection = current_connection()
+            other_user_id = _user_id((data or {}).get('other_user_id'))
+            
+            if not connection or not other_user_id:
+                return {"error": "other_user_id is required"}
+            
+            last_read_id = mark_conversation_read(session, connection.user_id, other_user_id)
+            result = sync_conversation(session, connection.user_id, other_user_id, **_sync_arguments(data))
+            session.commit()
+            announce_read(connection.user_id, other_user_id, last_read_id)
+            
+            return result
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error syncing messages: {str(e)}")
+            return {"error": "Failed to sync messages"}
+        finally:
+            session.close()
+
+    @socketio.on('join_group')
+    def on_join_group(data):
+        """Join a group conversation's room (e.g. right after being accepted into a team)"""
+        session = Session()
+        try:
+            connection = current_connection()
+            conversation_id = _user_id((data or {}).get('conversation_id'))
+            
+            if not connection or not conversation_id:
+                return
+            
+            if not membership(session, conversation_id, connection.user_id):
+                return
+            
+            join_room(group_room(conversation_id))
+            connection.rooms.add(group_room(conversation_id))
+            
+        except Exception as e:
+            logger.error(f"Error joining group room: {str(e)}")
+        finally:
+            session.close()
+
+    @socketio.on('send_group_message')
+    def on_send_group_message(data):
+        """Store a group message once and deliver it through the conversation's room"""
+        session = Session()
+        try:
+            connection = current_connection()
+            conversation_id = _user_id((data or {}).get('conversation_id'))
+            content = (data or {}).get('content', '').strip()
+            
+            if not connection or not conversation_id or not content:
+                return
+            
+            if not _admit(connection, 'send_message'):
+                return
+            
+            if not membership(session, conversation_id, connection.user_id):
+                return
+            
+            message_data = post_group_message(session, conversation_id, connection.user_id, content)
+            message_data["client_msg_id"] = data.get('client_msg_id')
+            emit('group_message', dict(message_data, is_own=False), room=group_room(conversation_id))
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error sending group message: {str(e)}")
+        finally:
+            session.close()
+
     @socketio.on('leave_chat')
     def on_leave_chat(data):
         """Leave a chat room"""
         try:
-            user_id = data.get('user_id')
-            other_user_id = data.get('other_user_id')
+            connection = current_connection()
+            other_user_id = _user_id(data.get('other_user_id'))
             
-            if not user_id or not other_user_id:
+            if not connection or not other_user_id:
                 return
             
-            room = f"chat_{min(user_id, other_user_id)}_{max(user_id, other_user_id)}"
+            room = chat_room(connection.user_id, other_user_id)
             leave_room(room)
+            connection.rooms.discard(room)
             
-            logger.info(f"User {user_id} left chat room {room}")
+            logger.info(f"User {connection.user_id} left chat room {room}")
             
         except Exception as e:
             logger.error(f"Error leaving chat room: {str(e)}")
@@ -58,37 +265,38 @@ def init_socketio(app_socketio):
         """Handle real-time message sending"""
         session = Session()
         try:
-            sender_id = data.get('sender_id')
-            receiver_id = data.get('receiver_id')
+            connection = current_connection()
+            receiver_id = _user_id(data.get('receiver_id'))
             content = data.get('content', '').strip()
             
-            if not sender_id or not receiver_id or not content:
+            if not connection or not receiver_id or not content:
                 return
             
-            # Save message to database
-            message = Message(
-                sender_id=sender_id,
-                receiver_id=receiver_id,
-                content=content
-            )
-            session.add(message)
-            session.commit()
+            if not _admit(connection, 'send_message'):
+                return
+            
+            sender_id = connection.user_id
+            if receiver_id == sender_id:
+                return
+            
+            # Checked here because the write-behind insert happens after the sender moved on
+            if not session.query(User.id).filter_by(id=receiver_id).first():
+                emit('message_failed', {"client_msg_id": data.get('client_msg_id'), "error": "Receiver not found"})
+                return
+            
+            row = new_message_row(sender_id, receiver_id, content)
+            client_msg_id = data.get('client_msg_id')
+            
+            if pipeline.running:
+                # Delivered by the writer thread once the row is committed and its id is final
+                pipeline.submit(row, sid=connection.sid, client_msg_id=client_msg_id)
+            else:
+                message = Message(**row)
+                session.add(message)
+                session.commit()
+                row['id'] = message.id
+                _deliver_message(row, connection.sid, client_msg_id)
             
-            # Create room name
-            room = f"chat_{min(sender_id, receiver_id)}_{max(sender_id, receiver_id)}"
-            
-            # Emit message to room
-            message_data = {
-                "id": message.id,
-                "content": message.content,
-                "sender_id": message.sender_id,
-                "receiver_id": message.receiver_id,
-                "is_read": message.is_read,
-                "created_at": message.created_at.isoformat(),
-                "is_own": False  # Will be determined by client
-            }
-            
-            emit('new_message', message_data, room=room)
             logger.info(f"Message sent from {sender_id} to {receiver_id}")
             
         except Exception as e:
@@ -101,23 +309,113 @@ def init_socketio(app_socketio):
     def on_typing(data):
         """Handle typing indicators"""
         try:
-            user_id = data.get('user_id')
-            other_user_id = data.get('other_user_id')
+            connection = current_connection()
+            other_user_id = _user_id(data.get('other_user_id'))
             is_typing = data.get('is_typing', False)
             
-            if not user_id or not other_user_id:
+            if not connection or not other_user_id:
                 return
             
-            room = f"chat_{min(user_id, other_user_id)}_{max(user_id, other_user_id)}"
+            # Over-limit typing events are dropped silently
+            if not limiter.check('typing', user_id=connection.username, connection_id=connection.sid)[0]:
+                return
+            
+            room = chat_room(connection.user_id, other_user_id)
+            
+            # Repeats are absorbed; a typer who goes quiet is stopped by the expiry task
+            if not typing_coalescer.update(room, connection.user_id, connection.sid, bool(is_typing)):
+                return
             
             emit('user_typing', {
-                'user_id': user_id,
+                'user_id': connection.user_id,
                 'is_typing': is_typing
             }, room=room, include_self=False)
             
         except Exception as e:
             logger.error(f"Error handling typing indicator: {str(e)}")
 
+def post_group_message(session, conversation_id, sender_id, content):
+    """Insert a group message; the sender's own watermark moves past it"""
+    message = ConversationMessage(conversation_id=conversation_id, sender_id=sender_id, content=content)
+    session.add(message)
+    session.flush()
+    mark_read(session, conversation_id, sender_id, message.id)
+    session.commit()
+    return serialize_group_message(message, sender_id)
+
+def _announce_group_read(conversation_id, user_id, last_read_id):
+    if socketio:
+        socketio.emit('group_read', {
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "last_read_id": last_read_id
+        }, room=group_room(conversation_id))
+
+def _deliver_message(row, sid, client_msg_id):
+    """Emit a committed message to its chat room and the receiver's inbox, then ack the sender"""
+    if not socketio:
+        return
+    message_data = {
+        "id": row['id'],
+        "content": row['content'],
+        "sender_id": row['sender_id'],
+        "receiver_id": row['receiver_id'],
+        "is_read": False,
+        "created_at": row['created_at'].isoformat(),
+        "client_msg_id": client_msg_id,
+        "is_own": False  # Will be determined by client
+    }
+    socketio.emit('new_message', message_data, room=chat_room(row['sender_id'], row['receiver_id']))
+    emit_to_user(row['receiver_id'], 'inbox_message', message_data)
+    if sid:
+        socketio.emit('message_ack', {
+            "id": row['id'],
+            "client_msg_id": client_msg_id,
+            "created_at": row['created_at'].isoformat()
+        }, to=sid)
+
+def _reject_message(row, sid, client_msg_id):
+    """Tell the sender a queued message could not be stored and was set aside"""
+    if socketio and sid:
+        socketio.emit('message_failed', {"client_msg_id": client_msg_id, "error": "Message could not be saved"}, to=sid)
+
+def _update_group_rooms(joins, leaves, closed):
+    """Move sockets into or out of group rooms whose membership or conversation just changed"""
+    if not socketio:
+        return
+    for conversation_id, user_id in joins:
+        room = group_room(conversation_id)
+        for sid in registry.add_room(room, user_id):
+            socketio.server.enter_room(sid, room, namespace='/')
+        # Sockets held by other workers are told to emit join_group themselves
+        emit_to_user(user_id, 'group_added', {"conversation_id": conversation_id})
+    for conversation_id, user_id in leaves:
+        room = group_room(conversation_id)
+        # Sockets held by other workers leave the room when they reconnect
+        for sid in registry.discard_room(room, user_id):
+            socketio.server.leave_room(sid, room, namespace='/')
+        emit_to_user(user_id, 'group_removed', {"conversation_id": conversation_id})
+    for conversation_id in closed:
+        room = group_room(conversation_id)
+        registry.discard_room(room)
+        # Closing goes through the message queue, so it reaches every worker
+        socketio.close_room(room)
+
+def disconnect_user(user_id):
+    """Close every socket this process holds for a user whose tokens were just revoked"""
+    if not socketio:
+        return 0
+    sids = registry.sids_for_user(user_id)
+    for sid in sids:
+        socketio.emit('session_revoked', {}, to=sid)
+        socketio.server.disconnect(sid, namespace='/')
+    return len(sids)
+
+def start_message_pipeline():
+    """Start write-behind persistence for socket messages (needs the tables to exist)"""
+    if WRITE_BEHIND:
+        pipeline.start(on_durable=_deliver_message, on_failed=_reject_message)
+
 @chat_bp.route('/conversations', methods=['GET'])
 @jwt_required()
 def get_conversations():
@@ -146,6 +444,15 @@ def get_conversations():
         # Remove current user from the list
         user_ids.discard(user.id)
         
+        # Read state for every conversation at once: unread range counts and both sides' watermarks
+        unread_counts = unread_message_counts(session, user.id)
+        watermarks = {
+            (mark.reader_id, mark.sender_id): mark.last_read_message_id
+            for mark in session.query(MessageReadMark).filter(
+                or_(MessageReadMark.reader_id == user.id, MessageReadMark.sender_id == user.id)
+            ).all()
+        }
+        
         conversations = []
         for user_id in user_ids:
             # Get the last message between current user and this user
@@ -158,13 +465,6 @@ def get_conversations():
                 # Get user info
                 chat_user = session.query(User).filter_by(id=user_id).first()
                 if chat_user:
-                    # Count unread messages from this user
-                    unread_count = session.query(Message).filter_by(
-                        sender_id=user_id,
-                        receiver_id=user.id,
-                        is_read=False
-                    ).count()
-                    
                     conversations.append({
                         "user": {
                             "id": chat_user.id,
@@ -178,11 +478,16 @@ def get_conversations():
                             "sender_id": last_message.sender_id,
                             "receiver_id": last_message.receiver_id,
                             "created_at": last_message.created_at.isoformat(),
-                            "is_read": last_message.is_read
+                            "is_read": message_is_read(last_message, watermarks)
                         },
-                        "unread_count": unread_count
+                        "unread_count": unread_counts.get(user_id, 0)
                     })
         
+        # Attach presence in one lookup
+        online = presence.lookup([conversation["user"]["id"] for conversation in conversations])
+        for conversation in conversations:
+            conversation["user"]["is_online"] = online[conversation["user"]["id"]]["online"]
+        
         # Sort conversations by last message time
         conversations.sort(key=lambda x: x["last_message"]["created_at"], reverse=True)
         
@@ -210,54 +515,40 @@ def get_messages(user_id):
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 50, type=int), 100)
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
         
-        # Get messages between current user and specified user
-        query = session.query(Message).filter(
-            ((Message.sender_id == user.id) & (Message.receiver_id == user_id)) |
-            ((Message.sender_id == user_id) & (Message.receiver_id == user.id))
-        )
-        
-        # Get total count
-        total = query.count()
+        # Mark messages from the other user as read (before loading, so the page reflects it)
+        last_read_id = mark_conversation_read(session, user.id, user_id)
+        watermarks = pair_watermarks(session, user.id, user_id)
         
-        # Apply pagination (newest first)
+        # Apply pagination (newest first), reading archived months when the page reaches them
         offset = (page - 1) * per_page
-        messages = query.order_by(Message.created_at.desc()).offset(offset).limit(per_page).all()
-        
-        # Mark messages from the other user as read
-        unread_messages = session.query(Message).filter_by(
-            sender_id=user_id,
-            receiver_id=user.id,
-            is_read=False
-        ).all()
-        
-        for message in unread_messages:
-            message.is_read = True
-        
-        if unread_messages:
-            session.commit()
+        rows = load_history(session, user.id, user_id, limit=per_page, offset=offset)
+        messages = rows[offset:offset + per_page]
         
         # Serialize messages
         messages_data = []
         for message in reversed(messages):  # Reverse to show oldest first
-            messages_data.append({
-                "id": message.id,
-                "content": message.content,
-                "sender_id": message.sender_id,
-                "receiver_id": message.receiver_id,
-                "is_read": message.is_read,
-                "created_at": message.created_at.isoformat(),
-                "is_own": message.sender_id == user.id
-            })
+            messages_data.append(serialize_message(message, user.id, watermarks))
+        
+        if last_read_id:
+            session.commit()
+            announce_read(user.id, user_id, last_read_id)
+        
+        pagination = {
+            "page": page,
+            "per_page": per_page,
+            "has_more": len(rows) > offset + per_page
+        }
+        if include_total:
+            # Counts every archived month; the delta sync endpoint pages without it
+            total = count_history(session, user.id, user_id)
+            pagination["total"] = total
+            pagination["pages"] = (total + per_page - 1) // per_page
         
         return jsonify({
             "messages": messages_data,
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "pages": (total + per_page - 1) // per_page
-            }
+            "pagination": pagination
         }), 200
         
     except Exception as e:
@@ -266,8 +557,34 @@ def get_messages(user_id):
     finally:
         session.close()
 
+@chat_bp.route('/messages/<int:user_id>/sync', methods=['GET'])
+@jwt_required()
+def sync_messages(user_id):
+    """Delta fetch: ?after_id= for new messages, ?before_id= for scrollback, ?read_id= for receipt changes"""
+    session = Session()
+    try:
+        current_username = get_jwt_identity()
+        user = session.query(User).filter_by(username=current_username).first()
+        if user is None:
+            return jsonify({"error": "User not found"}), 404
+        
+        last_read_id = mark_conversation_read(session, user.id, user_id)
+        result = sync_conversation(session, user.id, user_id, **_sync_arguments(request.args))
+        session.commit()
+        announce_read(user.id, user_id, last_read_id)
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to sync messages: {str(e)}")
+        return jsonify({"error": "Failed to sync messages"}), 500
+    finally:
+        session.close()
+
 @chat_bp.route('/messages', methods=['POST'])
 @jwt_required()
+@rate_limited('send_message')
 def send_message():
     session = Session()
     try:
@@ -297,11 +614,7 @@ def send_message():
             return jsonify({"error": "Cannot send message to yourself"}), 400
         
         # Create message
-        message = Message(
-            sender_id=user.id,
-            receiver_id=receiver_id,
-            content=content
-        )
+        message = Message(**new_message_row(user.id, int(receiver_id), content))
         
         session.add(message)
         session.commit()
@@ -312,11 +625,15 @@ def send_message():
             "content": message.content,
             "sender_id": message.sender_id,
             "receiver_id": message.receiver_id,
-            "is_read": message.is_read,
+            "is_read": False,
             "created_at": message.created_at.isoformat(),
             "is_own": True
         }
         
+        if socketio:
+            socketio.emit('new_message', dict(message_data, is_own=False), room=chat_room(user.id, int(receiver_id)))
+        emit_to_user(int(receiver_id), 'inbox_message', dict(message_data, is_own=False))
+        
         return jsonify(message_data), 201
         
     except Exception as e:
@@ -328,6 +645,7 @@ def send_message():
 
 @chat_bp.route('/users/search', methods=['GET'])
 @jwt_required()
+@rate_limited('search_users')
 def search_users():
     session = Session()
     try:
@@ -381,10 +699,7 @@ def get_unread_count():
         # Use current_user throughout:
         user = current_user
         
-        unread_count = session.query(Message).filter_by(
-            receiver_id=user.id,
-            is_read=False
-        ).count()
+        unread_count = unread_message_total(session, user.id)
         
         return jsonify({"unread_count": unread_count}), 200
         
@@ -392,4 +707,149 @@ def get_unread_count():
         logger.error(f"Failed to fetch unread count: {str(e)}")
         return jsonify({"error": "Failed to fetch unread count"}), 500
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+@chat_bp.route('/presence', methods=['GET'])
+@jwt_required()
+def get_presence():
+    try:
+        raw_ids = request.args.get('user_ids', '')
+        user_ids = []
+        for value in raw_ids.split(','):
+            user_id = _user_id(value.strip())
+            if user_id and user_id not in user_ids:
+                user_ids.append(user_id)
+        
+        if len(user_ids) > 500:
+            return jsonify({"error": "At most 500 user ids per request"}), 400
+        
+        statuses = presence.lookup(user_ids)
+        
+        return jsonify({
+            "presence": {str(user_id): status for user_id, status in statuses.items()},
+            "online_count": presence.online_count()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Failed to fetch presence: {str(e)}")
+        return jsonify({"error": "Failed to fetch presence"}), 500
+
+@chat_bp.route('/groups', methods=['GET'])
+@jwt_required()
+def get_groups():
+    session = Session()
+    try:
+        current_username = get_jwt_identity()
+        user = session.query(User).filter_by(username=current_username).first()
+        if user is None:
+            return jsonify({"error": "User not found"}), 404
+        
+        return jsonify(list_conversations(session, user.id)), 200
+        
+    except Exception as e:
+        logger.error(f"Failed to fetch group conversations: {str(e)}")
+        return jsonify({"error": "Failed to fetch group conversations"}), 500
+    finally:
+        session.close()
+
+@chat_bp.route('/groups/<int:conversation_id>/messages', methods=['GET'])
+@jwt_required()
+def get_group_messages(conversation_id):
+    """Same after_id / before_id delta contract as direct message sync"""
+    session = Session()
+    try:
+        current_username = get_jwt_identity()
+        user = session.query(User).filter_by(username=current_username).first()
+        if user is None:
+            return jsonify({"error": "User not found"}), 404
+        
+        if not membership(session, conversation_id, user.id):
+            return jsonify({"error": "Not a member of this conversation"}), 403
+        
+        arguments = _sync_arguments(request.args)
+        result = sync_group(
+            session, conversation_id, user.id,
+            after_id=arguments["after_id"],
+            before_id=arguments["before_id"],
+            limit=arguments["limit"]
+        )
+        
+        # Reading the newest page moves the watermark; scrollback does not
+        if arguments["before_id"] is None and result["last_id"] and mark_read(session, conversation_id, user.id, result["last_id"]):
+            session.commit()
+            _announce_group_read(conversation_id, user.id, result["last_id"])
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to fetch group messages: {str(e)}")
+        return jsonify({"error": "Failed to fetch group messages"}), 500
+    finally:
+        session.close()
+
+@chat_bp.route('/groups/<int:conversation_id>/messages', methods=['POST'])
+@jwt_required()
+@rate_limited('send_message')
+def send_group_message(conversation_id):
+    session = Session()
+    try:
+        current_username = get_jwt_identity()
+        user = session.query(User).filter_by(username=current_username).first()
+        if user is None:
+            return jsonify({"error": "User not found"}), 404
+        
+        if not membership(session, conversation_id, user.id):
+            return jsonify({"error": "Not a member of this conversation"}), 403
+        
+        content = (request.get_json() or {}).get('content', '').strip()
+        if not content:
+            return jsonify({"error": "Content is required"}), 400
+        
+        message_data = post_group_message(session, conversation_id, user.id, content)
+        if socketio:
+            socketio.emit('group_message', dict(message_data, is_own=False), room=group_room(conversation_id))
+        
+        return jsonify(message_data), 201
+        
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to send group message: {str(e)}")
+        return jsonify({"error": "Failed to send group message"}), 500
+    finally:
+        session.close()
+
+@chat_bp.route('/groups/<int:conversation_id>/read', methods=['POST'])
+@jwt_required()
+def mark_group_read(conversation_id):
+    session = Session()
+    try:
+        current_username = get_jwt_identity()
+        user = session.query(User).filter_by(username=current_username).first()
+        if user is None:
+            return jsonify({"error": "User not found"}), 404
+        
+        if not membership(session, conversation_id, user.id):
+            return jsonify({"error": "Not a member of this conversation"}), 403
+        
+        last_read_id = _user_id((request.get_json() or {}).get('last_read_id'))
+        if not last_read_id:
+            return jsonify({"error": "last_read_id is required"}), 400
+        
+        # Never past the newest message that exists
+        newest = session.query(func.max(ConversationMessage.id)).filter(
+            ConversationMessage.conversation_id == conversation_id
+        ).scalar() or 0
+        last_read_id = min(last_read_id, newest)
+        
+        if mark_read(session, conversation_id, user.id, last_read_id):
+            session.commit()
+            _announce_group_read(conversation_id, user.id, last_read_id)
+        
+        return jsonify({"conversation_id": conversation_id, "last_read_id": last_read_id}), 200
+        
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to mark group conversation read: {str(e)}")
+        return jsonify({"error": "Failed to mark conversation read"}), 500
+    finally:
+        session.close()
@@ -0,0 +1,108 @@
+from flask import request
+from flask_jwt_extended import decode_token
+from datetime import datetime
+import threading
+import logging
+from database import SessionFactory, User
+from token_state import revocations
+
+logger = logging.getLogger(__name__)
+
+class ConnectionSession:
+    """State kept in memory for one authenticated socket connection"""
+    __slots__ = ('sid', 'user_id', 'username', 'is_admin', 'rooms', 'connected_at')
+
+    def __init__(self, sid, user_id, username, is_admin=False):
+        self.sid = sid
+        self.user_id = user_id
+        self.username = username
+        self.is_admin = is_admin
+        self.rooms = set()
+        self.connected_at = datetime.now()
+
+class ConnectionRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_sid = {}
+
+    def add(self, connection):
+        with self._lock:
+            self._by_sid[connection.sid] = connection
+
+    def remove(self, sid):
+        with self._lock:
+            return self._by_sid.pop(sid, None)
+
+    def get(self, sid):
+        return self._by_sid.get(sid)
+
+    def sids_for_user(self, user_id):
+        with self._lock:
+            return [sid for sid, connection in self._by_sid.items() if connection.user_id == user_id]
+
+    def add_room(self, room, user_id):
+        """Record a room on every connection of a user; returns their sids"""
+        with self._lock:
+            sids = []
+            for sid, connection in self._by_sid.items():
+                if connection.user_id == user_id:
+                    connection.rooms.add(room)
+                    sids.append(sid)
+            return sids
+
+    def discard_room(self, room, user_id=None):
+        """Forget a room on every connection (of one user, if given); returns the sids that were in it"""
+        with self._lock:
+            sids = []
+            for sid, connection in self._by_sid.items():
+                if room in connection.rooms and (user_id is None or connection.user_id == user_id):
+                    connection.rooms.discard(room)
+                    sids.append(sid)
+            return sids
+
+    def __len__(self):
+        return len(self._by_sid)
+
+registry = ConnectionRegistry()
+
+def _token_from_request(auth):
+    if isinstance(auth, dict) and auth.get('token'):
+        return auth['token']
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):]
+    return request.args.get('token')
+
+def authenticate(auth):
+    """Verify the connect-time access token and resolve its user; returns a ConnectionSession or None"""
+    token = _token_from_request(auth)
+    if not token:
+        return None
+
+    try:
+        claims = decode_token(token)
+    except Exception as e:
+        logger.warning(f"Socket token rejected: {type(e).__name__}: {str(e)}")
+        return None
+
+    if claims.get('type') != 'access' or revocations.is_revoked(claims):
+        return None
+
+    # Tokens carrying the id and admin claims need no lookup: revocation covered deactivation
+    if claims.get('uid') is not None:
+        return ConnectionSession(request.sid, claims['uid'], claims['sub'], bool(claims.get('adm')))
+
+    session = SessionFactory()
+    try:
+        user = session.query(User.id, User.username, User.is_active, User.is_admin).filter_by(username=claims['sub']).first()
+    finally:
+        session.close()
+
+    if not user or not user.is_active:
+        return None
+
+    return ConnectionSession(request.sid, user.id, user.username, bool(user.is_admin))
+
+def current_connection():
+    """The ConnectionSession of the socket that sent the current event"""
+    return registry.get(request.sid)
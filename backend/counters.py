@@ -0,0 +1,108 @@
+from sqlalchemy import func, case
+import argparse
+import logging
+from database import SessionFactory, Project, HackathonPost, ProjectApplication, HackathonApplication, user_bookmarks
+
+logger = logging.getLogger(__name__)
+
+def _adjust(session, model, row_id, deltas):
+    # row_id may also be a collection of ids that all take the same deltas
+    values = {getattr(model, column): getattr(model, column) + delta for column, delta in deltas.items() if delta}
+    if values:
+        if hasattr(model, 'updated_at'):
+            # Counter changes are not content edits; keep onupdate from bumping the timestamp
+            values[model.updated_at] = model.updated_at
+        # Single UPDATE ... SET count = count + n, committed with the caller's write
+        if isinstance(row_id, (list, tuple, set, frozenset)):
+            row_filter = model.id.in_(row_id)
+        else:
+            row_filter = model.id == row_id
+        session.query(model).filter(row_filter).update(values, synchronize_session=False)
+
+def adjust_project_counters(session, project_id, applications=0, accepted=0, bookmarks=0):
+    _adjust(session, Project, project_id, {
+        'application_count': applications,
+        'accepted_count': accepted,
+        'bookmark_count': bookmarks
+    })
+
+def adjust_hackathon_counters(session, hackathon_id, applications=0, accepted=0):
+    _adjust(session, HackathonPost, hackathon_id, {
+        'application_count': applications,
+        'accepted_count': accepted
+    })
+
+def accepted_delta(old_status, new_status):
+    """Change in accepted_count when an application moves between statuses"""
+    return int(new_status == 'accepted') - int(old_status == 'accepted')
+
+def _actual_application_counts(session, application_model, parent_column):
+    rows = session.query(
+        parent_column,
+        func.count(application_model.id),
+        func.sum(case((application_model.status == 'accepted', 1), else_=0))
+    ).group_by(parent_column).all()
+    return {row[0]: (row[1], int(row[2] or 0)) for row in rows}
+
+def reconcile_counters(repair=False):
+    """Compare the denormalized counters against the source rows, optionally fixing drift"""
+    session = SessionFactory()
+    try:
+        drift = []
+
+        project_applications = _actual_application_counts(session, ProjectApplication, ProjectApplication.project_id)
+        project_bookmarks = dict(session.query(
+            user_bookmarks.c.project_id,
+            func.count()
+        ).group_by(user_bookmarks.c.project_id).all())
+
+        for project in session.query(Project).all():
+            applications, accepted = project_applications.get(project.id, (0, 0))
+            expected = {
+                'application_count': applications,
+                'accepted_count': accepted,
+                'bookmark_count': project_bookmarks.get(project.id, 0)
+            }
+            for column, value in expected.items():
+                if getattr(project, column) != value:
+                    drift.append({"table": "projects", "id": project.id, "column": column,
+                                  "stored": getattr(project, column), "actual": value})
+                    if repair:
+                        setattr(project, column, value)
+
+        hackathon_applications = _actual_application_counts(session, HackathonApplication, HackathonApplication.hackathon_id)
+
+        for hackathon in session.query(HackathonPost).all():
+            applications, accepted = hackathon_applications.get(hackathon.id, (0, 0))
+            expected = {
+                'application_count': applications,
+                'accepted_count': accepted
+            }
+            for column, value in expected.items():
+                if getattr(hackathon, column) != value:
+                    drift.append({"table": "hackathon_posts", "id": hackathon.id, "column": column,
+                                  "stored": getattr(hackathon, column), "actual": value})
+                    if repair:
+                        setattr(hackathon, column, value)
+
+        if repair:
+            session.commit()
+
+        logger.info(f"Counter reconciliation found {len(drift)} drifted values{' (repaired)' if repair and drift else ''}")
+        return drift
+
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Counter reconciliation failed: {type(e).__name__}: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verify denormalized application and bookmark counters')
+    parser.add_argument('--repair', action='store_true', help='rewrite drifted counters from the source rows')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for item in reconcile_counters(repair=args.repair):
+        print(f"{item['table']}#{item['id']} {item['column']}: stored={item['stored']} actual={item['actual']}")
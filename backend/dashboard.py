@@ -0,0 +1,274 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import joinedload
+from collections import OrderedDict
+import threading
+import time
+import os
+import logging
+from database import (Session, SessionFactory, User, Project, HackathonPost, ProjectApplication,
+                      HackathonApplication, user_bookmarks, IST)
+from query_guard import query_budget
+
+dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
+logger = logging.getLogger(__name__)
+
+# Writes by this process invalidate at once; the TTL bounds staleness from other processes
+DASHBOARD_CACHE_SECONDS = int(os.getenv('DASHBOARD_CACHE_SECONDS', '60'))
+DASHBOARD_CACHE_USERS = int(os.getenv('DASHBOARD_CACHE_USERS', '5000'))
+DASHBOARD_PAGE_SIZE = 5
+MAX_DASHBOARD_PAGE_SIZE = 50
+
+class DashboardCache:
+    """Summaries per user and page; a user's entries are dropped together when their data changes"""
+
+    def __init__(self, ttl=DASHBOARD_CACHE_SECONDS, max_users=DASHBOARD_CACHE_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        # user_id -> {(page, per_page): (expires_at, summary)}, least recently used first
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, user_id, key):
+        with self._lock:
+            entry = self._entries.get(user_id, {}).get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, user_id, key, summary):
+        with self._lock:
+            self._entries.setdefault(user_id, {})[key] = (time.monotonic() + self.ttl, summary)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.stats['invalidations'] += 1
+
+dashboard_cache = DashboardCache()
+
+# Which users' dashboards a flushed row shows up on. Applications also reach the post owner;
+# edited or deleted posts also reach their applicants and bookmarkers
+def _affected_users(instance, user_ids, parents, posts):
+    if isinstance(instance, User):
+        user_ids.add(instance.id)
+    elif isinstance(instance, (Project, HackathonPost)):
+        user_ids.add(instance.owner_id)
+        if instance.id is not None:
+            posts.add((type(instance), instance.id))
+    elif isinstance(instance, ProjectApplication):
+        user_ids.add(instance.user_id)
+        parents.add((Project, instance.project_id))
+    elif isinstance(instance, HackathonApplication):
+        user_ids.add(instance.user_id)
+        parents.add((HackathonPost, instance.hackathon_id))
+
+def _audience(connection, parents, posts):
+    """Owners of the parent posts, plus the applicants and bookmarkers of the changed posts"""
+    user_ids = set()
+    for model in (Project, HackathonPost):
+        ids = [parent_id for parent_model, parent_id in parents if parent_model is model]
+        if ids:
+            user_ids.update(connection.execute(select(model.owner_id).where(model.id.in_(ids))).scalars())
+    for model, application_model, column in ((Project, ProjectApplication, ProjectApplication.project_id),
+                                             (HackathonPost, HackathonApplication, HackathonApplication.hackathon_id)):
+        ids = [post_id for post_model, post_id in posts if post_model is model]
+        if ids:
+            user_ids.update(connection.execute(select(application_model.user_id).where(column.in_(ids))).scalars())
+            if model is Project:
+                user_ids.update(connection.execute(select(user_bookmarks.c.user_id).where(
+                    user_bookmarks.c.project_id.in_(ids))).scalars())
+    return user_ids
+
+# Affected users are resolved at flush time, on the flushing transaction's own connection,
+# so the commit hook only drops cache entries and never opens a session of its own
+@event.listens_for(SessionFactory, 'after_flush')
+def _collect_dashboard_changes(session, flush_context):
+    user_ids = session.info.setdefault('dashboard_users', set())
+    parents, posts = set(), set()
+    for instance in list(session.dirty) + list(session.deleted):
+        _affected_users(instance, user_ids, parents, posts)
+    # A new post has no audience yet
+    for instance in session.new:
+        _affected_users(instance, user_ids, parents, set())
+    if parents or posts:
+        user_ids.update(_audience(session.connection(), parents, posts))
+
+@event.listens_for(SessionFactory, 'after_commit')
+def _invalidate_dashboards(session):
+    user_ids = session.info.pop('dashboard_users', None)
+    if user_ids:
+        dashboard_cache.invalidate(user_ids)
+
+@event.listens_for(SessionFactory, 'after_rollback')
+def _discard_dashboard_changes(session):
+    session.info.pop('dashboard_users', None)
+
+def _summary_counts(session, user_id):
+    """Every dashboard count in one statement"""
+    def count(statement):
+        return statement.scalar_subquery()
+
+    row = session.query(
+        count(select(func.count(Project.id)).where(Project.owner_id == user_id, Project.deleted_at.is_(None))),
+        count(select(func.coalesce(func.sum(Project.application_count), 0)).where(
+            Project.owner_id == user_id, Project.deleted_at.is_(None))),
+        count(select(func.count(HackathonPost.id)).where(
+            HackathonPost.owner_id == user_id, HackathonPost.deleted_at.is_(None))),
+        count(select(func.count(ProjectApplication.id)).join(Project, Project.id == ProjectApplication.project_id).where(
+            ProjectApplication.user_id == user_id, Project.deleted_at.is_(None))),
+        count(select(func.count(ProjectApplication.id)).join(Project, Project.id == ProjectApplication.project_id).where(
+            ProjectApplication.user_id == user_id, ProjectApplication.status == 'accepted', Project.deleted_at.is_(None))),
+        count(select(func.count(HackathonApplication.id)).join(
+            HackathonPost, HackathonPost.id == HackathonApplication.hackathon_id).where(
+            HackathonApplication.user_id == user_id, HackathonPost.deleted_at.is_(None))),
+        count(select(func.count()).select_from(user_bookmarks).join(Project, Project.id == user_bookmarks.c.project_id).where(
+            user_bookmarks.c.user_id == user_id, Project.deleted_at.is_(None)))
+    ).one()
+
+    return {
+        "projects": row[0],
+        "applications_received": row[1],
+        "hackathons": row[2],
+        "project_applications": row[3],
+        "project_applications_accepted": row[4],
+        "hackathon_applications": row[5],
+        "bookmarks": row[6]
+    }
+
+def _section(items, total, page, per_page):
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": (total + per_page - 1) // per_page
+    }
+
+def build_summary(session, user_id, page, per_page):
+    offset = (page - 1) * per_page
+    counts = _summary_counts(session, user_id)
+
+    projects = session.query(Project).filter(Project.owner_id == user_id).order_by(
+        Project.created_at.desc()).offset(offset).limit(per_page).all()
+
+    hackathons = session.query(HackathonPost).filter(HackathonPost.owner_id == user_id).order_by(
+        HackathonPost.created_at.desc()).offset(offset).limit(per_page).all()
+
+    project_applications = session.query(ProjectApplication).join(ProjectApplication.project).options(
+        joinedload(ProjectApplication.project).joinedload(Project.owner)
+    ).filter(ProjectApplication.user_id == user_id).order_by(
+        ProjectApplication.applied_at.desc()).offset(offset).limit(per_page).all()
+
+    hackathon_applications = session.query(HackathonApplication).join(HackathonApplication.hackathon).options(
+        joinedload(HackathonApplication.hackathon).joinedload(HackathonPost.owner)
+    ).filter(HackathonApplication.user_id == user_id).order_by(
+        HackathonApplication.applied_at.desc()).offset(offset).limit(per_page).all()
+
+    bookmarks = session.query(Project, user_bookmarks.c.created_at).join(
+        user_bookmarks, user_bookmarks.c.project_id == Project.id
+    ).options(joinedload(Project.owner)).filter(user_bookmarks.c.user_id == user_id).order_by(
+        user_bookmarks.c.created_at.desc(), Project.id.desc()).offset(offset).limit(per_page).all()
+
+    def owner_data(owner):
+        return {
+            "id": owner.id,
+            "username": owner.username,
+            "full_name": owner.full_name,
+            "avatar_url": owner.avatar_url
+        }
+
+    return {
+        "counts": counts,
+        "projects": _section([{
+            "id": project.id,
+            "name": project.name,
+            "description": project.description,
+            "status": project.status,
+            "is_active": project.is_active,
+            "created_at": project.created_at.astimezone(IST).isoformat(),
+            "application_count": project.application_count,
+            "accepted_count": project.accepted_count
+        } for project in projects], counts["projects"], page, per_page),
+        "hackathons": _section([{
+            "id": hackathon.id,
+            "title": hackathon.title,
+            "hackathon_name": hackathon.hackathon_name,
+            "hackathon_date": hackathon.hackathon_date.astimezone(IST).isoformat() if hackathon.hackathon_date else None,
+            "is_active": hackathon.is_active,
+            "created_at": hackathon.created_at.astimezone(IST).isoformat(),
+            "application_count": hackathon.application_count,
+            "accepted_count": hackathon.accepted_count
+        } for hackathon in hackathons], counts["hackathons"], page, per_page),
+        "project_applications": _section([{
+            "id": app.id,
+            "status": app.status,
+            "applied_at": app.applied_at.astimezone(IST).isoformat(),
+            "project": {
+                "id": app.project.id,
+                "name": app.project.name,
+                "description": app.project.description,
+                "owner": owner_data(app.project.owner)
+            }
+        } for app in project_applications], counts["project_applications"], page, per_page),
+        "hackathon_applications": _section([{
+            "id": app.id,
+            "status": app.status,
+            "applied_at": app.applied_at.astimezone(IST).isoformat(),
+            "hackathon": {
+                "id": app.hackathon.id,
+                "title": app.hackathon.title,
+                "hackathon_name": app.hackathon.hackathon_name,
+                "owner": owner_data(app.hackathon.owner)
+            }
+        } for app in hackathon_applications], counts["hackathon_applications"], page, per_page),
+        "bookmarks": _section([{
+            "id": project.id,
+            "name": project.name,
+            "description": project.description,
+            "status": project.status,
+            "application_count": project.application_count,
+            "bookmarked_at": bookmarked_at.astimezone(IST).isoformat() if bookmarked_at else None,
+            "owner": owner_data(project.owner)
+        } for project, bookmarked_at in bookmarks], counts["bookmarks"], page, per_page)
+    }
+
+@dashboard_bp.route('/summary', methods=['GET'])
+@jwt_required()
+@query_budget(8)
+def get_summary():
+    """Owned posts, applications and bookmarks with their counts, one page of each"""
+    session = Session()
+    try:
+        user_id = get_jwt().get('uid')
+        if user_id is None:
+            # Token issued before the id claim existed
+            user = session.query(User.id).filter_by(username=get_jwt_identity()).first()
+            if not user:
+                return jsonify({"error": "User not found"}), 404
+            user_id = user.id
+
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', DASHBOARD_PAGE_SIZE, type=int), 1), MAX_DASHBOARD_PAGE_SIZE)
+
+        summary = dashboard_cache.get(user_id, (page, per_page))
+        if summary is None:
+            summary = build_summary(session, user_id, page, per_page)
+            dashboard_cache.put(user_id, (page, per_page), summary)
+
+        return jsonify(summary), 200
+
+    except Exception as e:
+        logger.error(f"Failed to build dashboard summary: {type(e).__name__}: {str(e)}")
+        return jsonify({"error": "Failed to load dashboard"}), 500
+    finally:
+        session.close()
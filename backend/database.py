@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Boolean, Text, Table, func
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship, scoped_session
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Boolean, Text, Table, UniqueConstraint, Index, func, inspect, text, event
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship, scoped_session, with_loader_criteria
+from sqlalchemy.dialects import sqlite, postgresql
 from datetime import datetime, timezone
 import pytz
 import os
@@ -23,9 +24,24 @@ Base = declarative_base()
 SessionFactory = sessionmaker(bind=engine)
 Session = scoped_session(SessionFactory)
 
+class SoftDeleteMixin:
+    # Set when a row is deleted; the purge sweep removes it and its children later
+    deleted_at = Column(DateTime, nullable=True, index=True)
+
+@event.listens_for(SessionFactory, 'do_orm_execute')
+def _exclude_soft_deleted(execute_state):
+    """Hide soft-deleted rows from every ORM query unless include_deleted is set"""
+    if execute_state.is_select and not execute_state.execution_options.get('include_deleted', False):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        )
+
 # Set Indian timezone
 IST = pytz.timezone('Asia/Kolkata')
 
+# Dialects whose insert() supports ON CONFLICT; other backends fall back to check-then-write
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
 # Association tables
 user_skills = Table(
     'user_skills',
@@ -60,7 +76,9 @@ user_bookmarks = Table(
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
     Column('project_id', Integer, ForeignKey('projects.id'), primary_key=True),
-    Column('created_at', DateTime, default=lambda: datetime.now(IST))
+    Column('created_at', DateTime, default=lambda: datetime.now(IST)),
+    # Keyset order of a user's bookmark list
+    Index('ix_user_bookmarks_user_created', 'user_id', 'created_at', 'project_id')
 )
 
 hackathon_skills = Table(
@@ -103,6 +121,8 @@ class User(Base):
     
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    # Bumped to invalidate every token issued before (deactivation, forced logout)
+    token_version = Column(Integer, default=0, server_default='0', nullable=False)
     last_login = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(IST))
     updated_at = Column(DateTime, default=lambda: datetime.now(IST), onupdate=lambda: datetime.now(IST))
@@ -119,7 +139,7 @@ class User(Base):
     activity_logs = relationship('ActivityLog', back_populates='user', cascade='all, delete-orphan')
     bookmarked_projects = relationship('Project', secondary=user_bookmarks, back_populates='bookmarked_by')
 
-class Project(Base):
+class Project(SoftDeleteMixin, Base):
     __tablename__ = 'projects'
     
     id = Column(Integer, primary_key=True)
@@ -133,6 +153,11 @@ class Project(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(IST))
     updated_at = Column(DateTime, default=lambda: datetime.now(IST), onupdate=lambda: datetime.now(IST))
     
+    # Denormalized counters, maintained by counters.py
+    application_count = Column(Integer, default=0, server_default='0', nullable=False)
+    accepted_count = Column(Integer, default=0, server_default='0', nullable=False)
+    bookmark_count = Column(Integer, default=0, server_default='0', nullable=False)
+    
     # Relationships
     owner = relationship('User', back_populates='projects')
     skills = relationship('Skill', secondary=project_skills, back_populates='projects')
@@ -178,6 +203,9 @@ class ProjectApplication(Base):
     status = Column(String(20), default='pending')  # pending, accepted, rejected
     applied_at = Column(DateTime, default=lambda: datetime.now(IST))
     
+    # Application review pages list one project's applicants, newest first
+    __table_args__ = (Index('ix_project_applications_project', 'project_id', 'applied_at'),)
+    
     # Relationships
     project = relationship('Project', back_populates='applications')
     user = relationship('User')
@@ -190,13 +218,15 @@ class Notification(Base):
     title = Column(String(100), nullable=False)
     content = Column(Text, nullable=False)
     type = Column(String(20), default='info')  # info, success, warning, error
-    is_read = Column(Boolean, default=False)
+    is_read = Column(Boolean, default=False)  # Superseded by notification_read_marks; kept for old rows
     created_at = Column(DateTime, default=lambda: datetime.now(IST))
     
+    __table_args__ = (Index('ix_notifications_user', 'user_id', 'id'),)
+    
     # Relationships
     user = relationship('User', back_populates='notifications')
 
-class HackathonPost(Base):
+class HackathonPost(SoftDeleteMixin, Base):
     __tablename__ = 'hackathon_posts'
     
     id = Column(Integer, primary_key=True)
@@ -210,6 +240,10 @@ class HackathonPost(Base):
     owner_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(IST))
     
+    # Denormalized counters, maintained by counters.py
+    application_count = Column(Integer, default=0, server_default='0', nullable=False)
+    accepted_count = Column(Integer, default=0, server_default='0', nullable=False)
+    
     # Relationships
     owner = relationship('User', back_populates='hackathon_posts')
     skills = relationship('Skill', secondary=hackathon_skills, back_populates='hackathons')
@@ -226,6 +260,8 @@ class HackathonApplication(Base):
     status = Column(String(20), default='pending')
     applied_at = Column(DateTime, default=lambda: datetime.now(IST))
     
+    __table_args__ = (Index('ix_hackathon_applications_hackathon', 'hackathon_id', 'applied_at'),)
+    
     # Relationships
     hackathon = relationship('HackathonPost', back_populates='applications')
     user = relationship('User')
@@ -237,8 +273,18 @@ class Message(Base):
     sender_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     receiver_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     content = Column(Text, nullable=False)
-    is_read = Column(Boolean, default=False)
+    is_read = Column(Boolean, default=False)  # Superseded by message_read_marks; kept for old rows
     created_at = Column(DateTime, default=lambda: datetime.now(IST))
+    # Set by the write-behind pipeline so a replayed journal row is recognised as already stored
+    write_key = Column(String(32), nullable=True)
+    
+    __table_args__ = (
+        Index('ux_messages_write_key', 'write_key', unique=True),
+        # Serves both directions of a conversation, in id order, for history sync
+        Index('ix_messages_pair', 'sender_id', 'receiver_id', 'id'),
+        # Unread totals: everything a user received, per sender, above that sender's watermark
+        Index('ix_messages_receiver', 'receiver_id', 'sender_id', 'id'),
+    )
     
     # Relationships
     sender = relationship('User', foreign_keys=[sender_id], back_populates='sent_messages')
@@ -246,6 +292,7 @@ class Message(Base):
 
 class PortfolioItem(Base):
     __tablename__ = 'portfolio_items'
+    __table_args__ = (Index('ix_portfolio_items_user', 'user_id', 'created_at'),)
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -259,13 +306,60 @@ class PortfolioItem(Base):
     
     # Relationships
     user = relationship('User', back_populates='portfolio_items')
+def migrate_columns():
+    """Add columns and indexes that were introduced after a table was first created"""
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                conn.execute(text(ddl))
+                for index in table.indexes:
+                    if column.name in index.columns:
+                        index.create(conn, checkfirst=True)
+                added.append(f"{table.name}.{column.name}")
+                logger.info(f"Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    return added
+
 def init_db():
     """Initialize database and create tables"""
     try:
         logger.info("Creating database tables...")
+        existing_tables = set(inspect(engine).get_table_names())
         Base.metadata.create_all(engine)
+        added_columns = migrate_columns()
         logger.info("Database tables created successfully")
         
+        if any(column.endswith('_count') for column in added_columns):
+            # Counter columns start at zero on existing rows; backfill them once
+            from counters import reconcile_counters
+            reconcile_counters(repair=True)
+        
+        if 'message_read_marks' not in existing_tables:
+            # Read state moved from per-row flags to watermarks; derive them once
+            from read_state import migrate_read_flags
+            migrate_read_flags()
+        
+        if 'activity_rollups' in existing_tables:
+            # All-users totals moved from NULL to a 0 sentinel; rebuild them once
+            from analytics import migrate_rollup_totals
+            migrate_rollup_totals()
+        
+        if 'conversations' not in existing_tables:
+            # Teams accepted before group chat existed get their conversations once
+            from group_chat import backfill_team_conversations
+            backfill_team_conversations()
+        
         # Create default skills and roles if they don't exist
         session = Session()
         try:
@@ -377,6 +471,7 @@ def init_db():
 
 class ActivityLog(Base):
     __tablename__ = 'activity_logs'
+    __table_args__ = (Index('ix_activity_logs_user', 'user_id', 'created_at'),)
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -404,6 +499,105 @@ class ProjectMilestone(Base):
     # Relationships
     project = relationship('Project', back_populates='milestones')
 
+class ActivityRollup(Base):
+    __tablename__ = 'activity_rollups'
+    
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String(10), nullable=False)  # hour, day
+    bucket_start = Column(DateTime, nullable=False)
+    action_type = Column(String(50), nullable=False)
+    user_id = Column(Integer, nullable=False, default=0)  # 0 holds the all-users total
+    count = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('granularity', 'bucket_start', 'action_type', 'user_id', name='uq_activity_rollup_bucket'),
+        Index('ix_activity_rollups_user', 'user_id', 'granularity', 'bucket_start'),
+    )
+
+class RollupWatermark(Base):
+    __tablename__ = 'rollup_watermarks'
+    
+    name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(IST), onupdate=lambda: datetime.now(IST))
+
+class RevokedToken(Base):
+    __tablename__ = 'revoked_tokens'
+    
+    # Tokens revoked one at a time (logout); every process loads the unexpired ones
+    jti = Column(String(36), primary_key=True)
+    user_id = Column(Integer, nullable=True)
+    # The token's exp claim in epoch seconds; the row is pruned once it has passed
+    expires_at = Column(Integer, nullable=False)
+    
+    __table_args__ = (Index('ix_revoked_tokens_expires', 'expires_at'),)
+
+class Conversation(Base):
+    __tablename__ = 'conversations'
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)  # project, hackathon
+    project_id = Column(Integer, ForeignKey('projects.id'), nullable=True, unique=True)
+    hackathon_id = Column(Integer, ForeignKey('hackathon_posts.id'), nullable=True, unique=True)
+    title = Column(String(200), nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(IST))
+    
+    # Relationships
+    members = relationship('ConversationMember', back_populates='conversation', cascade='all, delete-orphan')
+
+class ConversationMember(Base):
+    __tablename__ = 'conversation_members'
+    
+    conversation_id = Column(Integer, ForeignKey('conversations.id'), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    # Read watermark: every message with an id up to this one has been read
+    last_read_message_id = Column(Integer, default=0, server_default='0', nullable=False)
+    joined_at = Column(DateTime, default=lambda: datetime.now(IST))
+    
+    __table_args__ = (Index('ix_conversation_members_user', 'user_id'),)
+    
+    # Relationships
+    conversation = relationship('Conversation', back_populates='members')
+    user = relationship('User')
+
+class ConversationMessage(Base):
+    __tablename__ = 'conversation_messages'
+    
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id'), nullable=False)
+    sender_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(IST))
+    
+    __table_args__ = (Index('ix_conversation_messages_conversation', 'conversation_id', 'id'),)
+    
+    # Relationships
+    sender = relationship('User')
+
+class MessageArchive(Base):
+    __tablename__ = 'message_archives'
+    
+    # One row per month of messages moved out of the hot table into messages_archive_<month>
+    month = Column(String(6), primary_key=True)  # YYYYMM
+    min_id = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=False)
+    row_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(IST), onupdate=lambda: datetime.now(IST))
+
+class MessageReadMark(Base):
+    __tablename__ = 'message_read_marks'
+    
+    # Every message from sender_id to reader_id with an id up to last_read_message_id is read
+    reader_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    sender_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    last_read_message_id = Column(Integer, default=0, nullable=False)
+
+class NotificationReadMark(Base):
+    __tablename__ = 'notification_read_marks'
+    
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    last_read_notification_id = Column(Integer, default=0, nullable=False)
+
 if __name__ == '__main__':
     try:
         init_db()
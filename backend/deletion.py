@@ -0,0 +1,121 @@
+from sqlalchemy import select, delete
+from datetime import datetime, timedelta
+import threading
+import time
+import os
+import logging
+from database import (SessionFactory, Project, HackathonPost, ProjectApplication, HackathonApplication, ProjectMilestone,
+                      Conversation, project_skills, project_roles, user_bookmarks, hackathon_skills, hackathon_roles, IST)
+from group_chat import purge_team_conversations
+
+logger = logging.getLogger(__name__)
+
+# With soft delete on, a delete request only stamps deleted_at; the sweep does the heavy lifting
+SOFT_DELETE = os.getenv('SOFT_DELETE', 'true').lower() == 'true'
+PURGE_INTERVAL_SECONDS = int(os.getenv('PURGE_INTERVAL_SECONDS', '300'))
+PURGE_GRACE_SECONDS = int(os.getenv('PURGE_GRACE_SECONDS', '0'))
+PURGE_BATCH_SIZE = 500
+
+def purge_projects(session, project_ids):
+    """Physically delete projects and their dependent rows with set-based statements"""
+    if not project_ids:
+        return
+    # SQLite does not enforce foreign keys here, so every child table is purged explicitly
+    for table, column in (
+        (ProjectApplication.__table__, ProjectApplication.__table__.c.project_id),
+        (ProjectMilestone.__table__, ProjectMilestone.__table__.c.project_id),
+        (project_skills, project_skills.c.project_id),
+        (project_roles, project_roles.c.project_id),
+        (user_bookmarks, user_bookmarks.c.project_id),
+    ):
+        session.execute(delete(table).where(column.in_(project_ids)))
+    purge_team_conversations(session, Conversation.project_id, project_ids)
+    session.execute(delete(Project.__table__).where(Project.__table__.c.id.in_(project_ids)))
+
+def purge_hackathons(session, hackathon_ids):
+    """Physically delete hackathon posts and their dependent rows with set-based statements"""
+    if not hackathon_ids:
+        return
+    for table, column in (
+        (HackathonApplication.__table__, HackathonApplication.__table__.c.hackathon_id),
+        (hackathon_skills, hackathon_skills.c.hackathon_id),
+        (hackathon_roles, hackathon_roles.c.hackathon_id),
+    ):
+        session.execute(delete(table).where(column.in_(hackathon_ids)))
+    purge_team_conversations(session, Conversation.hackathon_id, hackathon_ids)
+    session.execute(delete(HackathonPost.__table__).where(HackathonPost.__table__.c.id.in_(hackathon_ids)))
+
+def remove_project(session, project):
+    """Delete a project: stamp it when soft delete is on, otherwise purge it now"""
+    if SOFT_DELETE:
+        project.deleted_at = datetime.now(IST)
+        project.is_active = False
+    else:
+        purge_projects(session, [project.id])
+        session.expunge(project)
+
+def remove_hackathon(session, hackathon):
+    """Delete a hackathon post: stamp it when soft delete is on, otherwise purge it now"""
+    if SOFT_DELETE:
+        hackathon.deleted_at = datetime.now(IST)
+        hackathon.is_active = False
+    else:
+        purge_hackathons(session, [hackathon.id])
+        session.expunge(hackathon)
+
+def _deleted_ids(session, model, cutoff, limit):
+    return list(session.execute(
+        select(model.id).where(model.deleted_at.is_not(None), model.deleted_at <= cutoff).limit(limit),
+        execution_options={'include_deleted': True}
+    ).scalars())
+
+def sweep(batch_size=PURGE_BATCH_SIZE):
+    """Purge soft-deleted rows past the grace period; returns how many parents were removed"""
+    session = SessionFactory()
+    try:
+        cutoff = datetime.now(IST) - timedelta(seconds=PURGE_GRACE_SECONDS)
+        purged = 0
+        for model, purge in ((Project, purge_projects), (HackathonPost, purge_hackathons)):
+            while True:
+                ids = _deleted_ids(session, model, cutoff, batch_size)
+                if not ids:
+                    break
+                purge(session, ids)
+                session.commit()
+                purged += len(ids)
+
+        if purged:
+            logger.info(f"Purged {purged} soft-deleted projects and hackathon posts")
+        return purged
+
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Purge sweep failed: {type(e).__name__}: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+_sweeper = None
+
+def start_purge_sweeper(interval=PURGE_INTERVAL_SECONDS):
+    """Run sweep() periodically on a daemon thread (no-op when soft delete is off)"""
+    global _sweeper
+    if not SOFT_DELETE or _sweeper is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                sweep()
+            except Exception:
+                # Already logged; try again next interval
+                pass
+
+    _sweeper = threading.Thread(target=run, name='purge-sweeper', daemon=True)
+    _sweeper.start()
+    logger.info(f"Purge sweeper started (interval: {interval}s)")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Purge sweep completed: {sweep()} rows")
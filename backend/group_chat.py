@@ -0,0 +1,289 @@
+from sqlalchemy import event, func, and_, or_, select, delete
+from sqlalchemy.exc import IntegrityError
+import logging
+from database import (SessionFactory, Project, HackathonPost, ProjectApplication, HackathonApplication,
+                      Conversation, ConversationMember, ConversationMessage, User, UPSERT_DIALECTS)
+
+logger = logging.getLogger(__name__)
+
+GROUP_PAGE_SIZE = 50
+
+# kind -> (team model, conversation column, application model, application foreign key, title attribute)
+TEAMS = {
+    'project': (Project, Conversation.project_id, ProjectApplication, ProjectApplication.project_id, 'name'),
+    'hackathon': (HackathonPost, Conversation.hackathon_id, HackathonApplication, HackathonApplication.hackathon_id, 'hackathon_name'),
+}
+
+# Called as handler(joins, leaves, closed) after a commit that added or removed members
+# ({(conversation_id, user_id)}) or deleted whole conversations ({conversation_id}), so live
+# sockets start or stop receiving those groups
+_room_change_handler = None
+
+def on_room_changes(handler):
+    global _room_change_handler
+    _room_change_handler = handler
+
+@event.listens_for(SessionFactory, 'after_commit')
+def _apply_room_changes(session):
+    joins = session.info.pop('group_joins', set())
+    leaves = session.info.pop('group_leaves', set())
+    closed = session.info.pop('group_closed', set())
+    if (joins or leaves or closed) and _room_change_handler:
+        try:
+            _room_change_handler(joins, leaves, closed)
+        except Exception as e:
+            logger.error(f"Failed to update group rooms: {type(e).__name__}: {str(e)}")
+
+@event.listens_for(SessionFactory, 'after_rollback')
+def _discard_room_changes(session):
+    session.info.pop('group_joins', None)
+    session.info.pop('group_leaves', None)
+    session.info.pop('group_closed', None)
+
+def group_room(conversation_id):
+    """Socket.IO room shared by every member of a group conversation"""
+    return f"group_{conversation_id}"
+
+def _latest_message_id(session, conversation_id):
+    return session.query(func.max(ConversationMessage.id)).filter(
+        ConversationMessage.conversation_id == conversation_id
+    ).scalar() or 0
+
+def add_member(session, conversation_id, user_id):
+    """Idempotent, even when two requests accept the same user at once; returns True if added
+
+    Newcomers can scroll back through history but start with nothing unread. Their sockets
+    join the group room once the session commits.
+    """
+    table = ConversationMember.__table__
+    values = {
+        'conversation_id': conversation_id,
+        'user_id': user_id,
+        'last_read_message_id': _latest_message_id(session, conversation_id)
+    }
+    dialect_insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        added = session.execute(dialect_insert(table).values(**values).on_conflict_do_nothing()).rowcount > 0
+    else:
+        try:
+            with session.begin_nested():
+                session.execute(table.insert().values(**values))
+            added = True
+        except IntegrityError:
+            added = False
+    if added:
+        session.info.setdefault('group_joins', set()).add((conversation_id, user_id))
+    return added
+
+def remove_member(session, conversation_id, user_id):
+    """Drop a membership; the user's sockets leave the group room once the session commits"""
+    removed = session.query(ConversationMember).filter_by(
+        conversation_id=conversation_id, user_id=user_id
+    ).delete(synchronize_session=False)
+    if removed:
+        session.info.setdefault('group_leaves', set()).add((conversation_id, user_id))
+    return removed
+
+def purge_team_conversations(session, column, team_ids):
+    """Delete the group conversations of purged teams with their members and messages
+
+    Done explicitly because SQLite does not enforce foreign keys here.
+    """
+    conversation_ids = list(session.execute(select(Conversation.id).where(column.in_(team_ids))).scalars())
+    if not conversation_ids:
+        return []
+    for table in (ConversationMessage.__table__, ConversationMember.__table__):
+        session.execute(delete(table).where(table.c.conversation_id.in_(conversation_ids)))
+    session.execute(delete(Conversation.__table__).where(Conversation.__table__.c.id.in_(conversation_ids)))
+    session.info.setdefault('group_closed', set()).update(conversation_ids)
+    return conversation_ids
+
+def team_conversation(session, kind, team):
+    """The group conversation of a project or hackathon team, created with its owner on first use"""
+    model, column, _, _, title_attribute = TEAMS[kind]
+    conversation = session.query(Conversation).filter(column == team.id).first()
+    if conversation:
+        return conversation
+
+    conversation = Conversation(kind=kind, title=getattr(team, title_attribute))
+    setattr(conversation, column.key, team.id)
+    try:
+        with session.begin_nested():
+            session.add(conversation)
+    except IntegrityError:
+        # Another request created it first
+        return session.query(Conversation).filter(column == team.id).one()
+
+    add_member(session, conversation.id, team.owner_id)
+    return conversation
+
+def sync_team_membership(session, kind, team, user_id, old_status, new_status):
+    """Keep the team conversation in step with an application status change"""
+    if new_status == 'accepted' and old_status != 'accepted':
+        conversation = team_conversation(session, kind, team)
+        add_member(session, conversation.id, user_id)
+        return conversation
+    if old_status == 'accepted' and new_status != 'accepted':
+        _, column, _, _, _ = TEAMS[kind]
+        conversation = session.query(Conversation).filter(column == team.id).first()
+        if conversation and user_id != team.owner_id:
+            remove_member(session, conversation.id, user_id)
+        return conversation
+    return None
+
+def backfill_team_conversations():
+    """Create conversations and memberships for teams accepted before group chat existed"""
+    session = SessionFactory()
+    try:
+        created = 0
+        added = 0
+        for kind, (model, column, application_model, application_team, title_attribute) in TEAMS.items():
+            accepted = session.query(application_team, application_model.user_id).filter(
+                application_model.status == 'accepted'
+            ).all()
+            if not accepted:
+                continue
+
+            team_ids = {team_id for team_id, _ in accepted}
+            existing = dict(session.query(column, Conversation.id).filter(column.in_(team_ids)).all())
+            teams = {team.id: team for team in session.query(model).filter(model.id.in_(team_ids)).all()}
+
+            for team_id in team_ids - set(existing):
+                team = teams.get(team_id)
+                if team is None:
+                    continue
+                conversation = Conversation(kind=kind, title=getattr(team, title_attribute))
+                setattr(conversation, column.key, team_id)
+                session.add(conversation)
+                session.flush()
+                existing[team_id] = conversation.id
+                created += 1
+
+            wanted = {(existing[team_id], user_id) for team_id, user_id in accepted if team_id in existing}
+            wanted |= {(existing[team_id], team.owner_id) for team_id, team in teams.items() if team_id in existing}
+            present = set(session.query(ConversationMember.conversation_id, ConversationMember.user_id).filter(
+                ConversationMember.conversation_id.in_(set(existing.values()))
+            ).all())
+            missing = wanted - present
+            if missing:
+                session.bulk_insert_mappings(ConversationMember, [
+                    {'conversation_id': conversation_id, 'user_id': user_id, 'last_read_message_id': 0}
+                    for conversation_id, user_id in missing
+                ])
+                added += len(missing)
+
+        session.commit()
+        if created or added:
+            logger.info(f"Backfilled {created} team conversations and {added} memberships")
+        return created, added
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def membership(session, conversation_id, user_id):
+    return session.query(ConversationMember).filter_by(conversation_id=conversation_id, user_id=user_id).first()
+
+def member_conversation_ids(session, user_id):
+    return [conversation_id for (conversation_id,) in session.query(ConversationMember.conversation_id).filter_by(user_id=user_id).all()]
+
+def list_conversations(session, user_id):
+    """A user's group conversations with last message and unread count, in three queries"""
+    conversations = session.query(Conversation, ConversationMember.last_read_message_id).join(
+        ConversationMember, ConversationMember.conversation_id == Conversation.id
+    ).outerjoin(
+        Project, Conversation.project_id == Project.id
+    ).outerjoin(
+        HackathonPost, Conversation.hackathon_id == HackathonPost.id
+    ).filter(
+        ConversationMember.user_id == user_id,
+        # Soft-deleted teams drop out of the outer joins
+        or_(Project.id != None, HackathonPost.id != None)
+    ).all()
+    if not conversations:
+        return []
+
+    ids = [conversation.id for conversation, _ in conversations]
+
+    # Unread is a range count above the member's watermark on (conversation_id, id)
+    unread = dict(session.query(ConversationMember.conversation_id, func.count(ConversationMessage.id)).join(
+        ConversationMessage, and_(
+            ConversationMessage.conversation_id == ConversationMember.conversation_id,
+            ConversationMessage.id > ConversationMember.last_read_message_id
+        )
+    ).filter(ConversationMember.user_id == user_id).group_by(ConversationMember.conversation_id).all())
+
+    latest_ids = session.query(func.max(ConversationMessage.id)).filter(
+        ConversationMessage.conversation_id.in_(ids)
+    ).group_by(ConversationMessage.conversation_id)
+    latest = {message.conversation_id: message for message in session.query(ConversationMessage).filter(
+        ConversationMessage.id.in_(latest_ids)
+    ).all()}
+
+    result = []
+    for conversation, last_read_message_id in conversations:
+        last_message = latest.get(conversation.id)
+        result.append({
+            "id": conversation.id,
+            "kind": conversation.kind,
+            "title": conversation.title,
+            "project_id": conversation.project_id,
+            "hackathon_id": conversation.hackathon_id,
+            "last_read_message_id": last_read_message_id,
+            "unread_count": unread.get(conversation.id, 0),
+            "last_message": serialize_group_message(last_message, user_id) if last_message else None
+        })
+    result.sort(key=lambda item: item["last_message"]["id"] if item["last_message"] else 0, reverse=True)
+    return result
+
+def serialize_group_message(message, user_id):
+    return {
+        "id": message.id,
+        "conversation_id": message.conversation_id,
+        "sender_id": message.sender_id,
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        "is_own": message.sender_id == user_id
+    }
+
+def sync_group(session, conversation_id, user_id, after_id=None, before_id=None, limit=GROUP_PAGE_SIZE):
+    """Missing messages of a group (after_id / before_id like direct sync) plus every member's watermark"""
+    query = session.query(ConversationMessage).filter(ConversationMessage.conversation_id == conversation_id)
+    if before_id is not None:
+        query = query.filter(ConversationMessage.id < before_id)
+
+    if after_id is not None:
+        rows = query.filter(ConversationMessage.id > after_id).order_by(ConversationMessage.id.asc()).limit(limit + 1).all()
+        messages = rows[:limit]
+    else:
+        rows = query.order_by(ConversationMessage.id.desc()).limit(limit + 1).all()
+        messages = list(reversed(rows[:limit]))
+
+    members = session.query(ConversationMember.user_id, ConversationMember.last_read_message_id, User.username).join(
+        User, User.id == ConversationMember.user_id
+    ).filter(ConversationMember.conversation_id == conversation_id).all()
+
+    return {
+        "messages": [serialize_group_message(message, user_id) for message in messages],
+        "has_more": len(rows) > limit,
+        "last_id": messages[-1].id if messages else after_id,
+        "members": [
+            {"user_id": member_id, "username": username, "last_read_message_id": last_read}
+            for member_id, last_read, username in members
+        ]
+    }
+
+def mark_read(session, conversation_id, user_id, message_id):
+    """Advance one member's watermark (never backwards) with a single-row UPDATE"""
+    if not message_id:
+        return False
+    return session.query(ConversationMember).filter(
+        ConversationMember.conversation_id == conversation_id,
+        ConversationMember.user_id == user_id,
+        ConversationMember.last_read_message_id < message_id
+    ).update({ConversationMember.last_read_message_id: message_id}, synchronize_session=False) > 0
+
+if __name__ == '__main__':
+    created, added = backfill_team_conversations()
+    print(f"Created {created} conversations, added {added} memberships")
@@ -1,16 +1,22 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timezone
-import pytz
-from database import Session, User, HackathonPost, HackathonApplication, Skill, Role, Notification, ActivityLog
+from database import Session, User, HackathonPost, HackathonApplication, Notification, ActivityLog, hackathon_skills, IST
+from counters import adjust_hackathon_counters, accepted_delta
+from catalog import sync_skills, sync_roles
+from deletion import remove_hackathon
+from group_chat import sync_team_membership
+from query_guard import query_budget
+from application_review import review_arguments, review_applications, review_pagination, ReviewArgumentError
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
 
 hackathon_bp = Blueprint('hackathons', __name__, url_prefix='/api/hackathons')
 
 # Set Indian timezone
-IST = pytz.timezone('Asia/Kolkata')
-
 @hackathon_bp.route('/', methods=['GET'], strict_slashes=False)
 @jwt_required()
+@query_budget(8)
 def get_hackathons():
     session = Session()
     try:
@@ -34,20 +40,26 @@ def get_hackathons():
         
         # Apply pagination
         offset = (page - 1) * per_page
-        hackathons = query.order_by(HackathonPost.created_at.desc()).offset(offset).limit(per_page).all()
+        hackathons = query.options(
+            joinedload(HackathonPost.owner), selectinload(HackathonPost.skills), selectinload(HackathonPost.roles)
+        ).order_by(HackathonPost.created_at.desc()).offset(offset).limit(per_page).all()
         
         # Get current user for checking applications
         current_user_id = get_jwt_identity()
         user = session.query(User).filter_by(username=current_user_id).first()
         
+        # One lookup for the whole page instead of one per hackathon
+        applied_ids = set()
+        if user and hackathons:
+            applied_ids = {hackathon_id for (hackathon_id,) in session.query(HackathonApplication.hackathon_id).filter(
+                HackathonApplication.user_id == user.id,
+                HackathonApplication.hackathon_id.in_([hackathon.id for hackathon in hackathons])
+            )}
+        
         # Serialize hackathons
         hackathons_data = []
         for hackathon in hackathons:
-            # Check if current user has applied
-            has_applied = session.query(HackathonApplication).filter_by(
-                hackathon_id=hackathon.id,
-                user_id=user.id if user else None
-            ).first() is not None
+            has_applied = hackathon.id in applied_ids
             
             hackathons_data.append({
                 "id": hackathon.id,
@@ -66,7 +78,7 @@ def get_hackathons():
                 },
                 "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in hackathon.skills],
                 "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category} for role in hackathon.roles],
-                "application_count": len(hackathon.applications),
+                "application_count": hackathon.application_count,
                 "has_applied": has_applied,
                 "is_owner": hackathon.owner_id == (user.id if user else None)
             })
@@ -123,7 +135,7 @@ def get_hackathon(hackathon_id):
             },
             "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in hackathon.skills],
             "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category} for role in hackathon.roles],
-            "application_count": len(hackathon.applications),
+            "application_count": hackathon.application_count,
             "has_applied": has_applied,
             "is_owner": hackathon.owner_id == (user.id if user else None)
         }
@@ -185,19 +197,13 @@ def create_hackathon():
             owner_id=user.id
         )
         
-        # Add skills
-        skill_ids = data.get('skill_ids', [])
-        if skill_ids:
-            skills = session.query(Skill).filter(Skill.id.in_(skill_ids)).all()
-            hackathon.skills = skills
+        session.add(hackathon)
+        session.flush()
         
-        # Add roles
-        role_ids = data.get('role_ids', [])
-        if role_ids:
-            roles = session.query(Role).filter(Role.id.in_(role_ids)).all()
-            hackathon.roles = roles
+        # Add skills and roles
+        sync_skills(session, hackathon, data.get('skill_ids', []))
+        sync_roles(session, hackathon, data.get('role_ids', []))
         
-        session.add(hackathon)
         session.commit()
         
         # Log activity
@@ -264,6 +270,7 @@ def apply_to_hackathon(hackathon_id):
         )
         
         session.add(application)
+        adjust_hackathon_counters(session, hackathon_id, applications=1)
         
         # Create notification for hackathon owner
         notification = Notification(
@@ -296,6 +303,7 @@ def apply_to_hackathon(hackathon_id):
 
 @hackathon_bp.route('/<int:hackathon_id>/applications', methods=['GET'])
 @jwt_required()
+@query_budget(10)
 def get_hackathon_applications(hackathon_id):
     session = Session()
     try:
@@ -310,15 +318,25 @@ def get_hackathon_applications(hackathon_id):
         if not hackathon:
             return jsonify({"error": "Hackathon not found or not owned by you"}), 404
         
-        applications = session.query(HackathonApplication).filter_by(hackathon_id=hackathon_id).order_by(HackathonApplication.applied_at.desc()).all()
+        try:
+            arguments = review_arguments(request.args)
+        except ReviewArgumentError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Overlap is counted against the hackathon's own skills, inside the same query
+        target_skill_ids = select(hackathon_skills.c.skill_id).where(hackathon_skills.c.hackathon_id == hackathon_id)
+        rows, total, status_counts = review_applications(
+            session, HackathonApplication, HackathonApplication.hackathon_id, hackathon_id, target_skill_ids, **arguments
+        )
         
         applications_data = []
-        for app in applications:
+        for app, skill_overlap in rows:
             applications_data.append({
                 "id": app.id,
                 "message": app.message,
                 "status": app.status,
                 "applied_at": app.applied_at.astimezone(IST).isoformat(),
+                "skill_overlap": skill_overlap,
                 "user": {
                     "id": app.user.id,
                     "username": app.user.username,
@@ -332,7 +350,14 @@ def get_hackathon_applications(hackathon_id):
                 }
             })
         
-        return jsonify(applications_data), 200
+        if arguments['per_page'] is None:
+            return jsonify(applications_data), 200
+        
+        return jsonify({
+            "applications": applications_data,
+            "status_counts": status_counts,
+            "pagination": review_pagination(total, arguments['page'], arguments['per_page'])
+        }), 200
         
     except Exception as e:
         return jsonify({"error": "Failed to fetch applications"}), 500
@@ -350,7 +375,7 @@ def update_hackathon_application_status(application_id):
         if not user:
             return jsonify({"error": "User not found"}), 404
         
-        application = session.query(HackathonApplication).filter_by(id=application_id).first()
+        application = session.query(HackathonApplication).join(HackathonApplication.hackathon).filter(HackathonApplication.id == application_id).first()
         if not application:
             return jsonify({"error": "Application not found"}), 404
         
@@ -364,7 +389,10 @@ def update_hackathon_application_status(application_id):
         if new_status not in ['accepted', 'rejected']:
             return jsonify({"error": "Invalid status"}), 400
         
+        old_status = application.status
         application.status = new_status
+        adjust_hackathon_counters(session, application.hackathon_id, accepted=accepted_delta(old_status, new_status))
+        sync_team_membership(session, 'hackathon', application.hackathon, application.user_id, old_status, new_status)
         
         # Create notification for applicant
         notification = Notification(
@@ -376,9 +404,9 @@ def update_hackathon_application_status(application_id):
         session.add(notification)
         
         # Update team member count
-        if new_status == 'accepted':
+        if new_status == 'accepted' and old_status != 'accepted':
             application.hackathon.current_member_count += 1
-        elif application.status == 'accepted' and new_status == 'rejected':
+        elif old_status == 'accepted' and new_status == 'rejected':
             application.hackathon.current_member_count = max(0, application.hackathon.current_member_count - 1)
         
         # Create notification for applicant
@@ -437,7 +465,7 @@ def get_my_hackathons():
                 "created_at": hackathon.created_at.astimezone(IST).isoformat(),
                 "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in hackathon.skills],
                 "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category} for role in hackathon.roles],
-                "application_count": len(hackathon.applications)
+                "application_count": hackathon.application_count
             })
         
         return jsonify(hackathons_data), 200
@@ -480,13 +508,11 @@ def update_hackathon(hackathon_id):
         
         # Update skills
         if 'skill_ids' in data:
-            skills = session.query(Skill).filter(Skill.id.in_(data['skill_ids'])).all()
-            hackathon.skills = skills
+            sync_skills(session, hackathon, data['skill_ids'])
         
         # Update roles
         if 'role_ids' in data:
-            roles = session.query(Role).filter(Role.id.in_(data['role_ids'])).all()
-            hackathon.roles = roles
+            sync_roles(session, hackathon, data['role_ids'])
         
         session.commit()
         
@@ -524,7 +550,7 @@ def delete_hackathon(hackathon_id):
             return jsonify({"error": "Hackathon not found or not owned by you"}), 404
         
         hackathon_title = hackathon.title
-        session.delete(hackathon)
+        remove_hackathon(session, hackathon)
         session.commit()
         
         # Log activity
@@ -556,7 +582,7 @@ def get_my_hackathon_applications():
         if not user:
             return jsonify({"error": "User not found"}), 404
         
-        applications = session.query(HackathonApplication).filter_by(user_id=user.id).order_by(HackathonApplication.applied_at.desc()).all()
+        applications = session.query(HackathonApplication).join(HackathonApplication.hackathon).filter(HackathonApplication.user_id == user.id).order_by(HackathonApplication.applied_at.desc()).all()
         
         applications_data = []
         for app in applications:
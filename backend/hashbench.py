@@ -0,0 +1,60 @@
+"""Password hashing benchmark.
+
+Runs simulated logins (one password verification each) from many request
+threads through the hashing pool and reports throughput and latency for each
+worker count, so PASSWORD_HASH_WORKERS can be sized for the machine.
+
+    python hashbench.py --workers 1 2 4 8 --logins 200 --threads 32
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import statistics
+import time
+from password_hashing import PasswordHasher, HashingBusy, HASH_METHOD
+
+def run(workers, logins, threads, method, max_pending):
+    hasher = PasswordHasher(workers=workers, max_pending=max_pending, method=method)
+    hasher.start()
+    stored = hasher.hash('benchmark-password')
+    latencies = []
+    rejected = 0
+
+    def login(_):
+        started = time.perf_counter()
+        try:
+            hasher.verify(stored, 'benchmark-password')
+        except HashingBusy:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for latency in pool.map(login, range(logins)):
+            if latency is None:
+                rejected += 1
+            else:
+                latencies.append(latency)
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0
+    print(f"workers={workers:<3} logins/s={len(latencies) / elapsed:8.1f}  "
+          f"p50={statistics.median(latencies) * 1000 if latencies else 0:7.1f}ms  "
+          f"p95={p95 * 1000:7.1f}ms  rejected(503)={rejected}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput versus hashing pool size')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent request threads')
+    parser.add_argument('--method', default=HASH_METHOD)
+    parser.add_argument('--max-pending', type=int, default=1000, help='queue-depth limit; lower it to see 503s')
+    args = parser.parse_args()
+
+    print(f"method={args.method} logins={args.logins} threads={args.threads} (workers=0 hashes on the request thread)")
+    for workers in args.workers:
+        run(workers, args.logins, args.threads, args.method, args.max_pending)
+
+if __name__ == '__main__':
+    main()
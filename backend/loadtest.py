@@ -0,0 +1,150 @@
+"""Socket.IO chat load test.
+
+Registers (or logs in) pairs of users, opens one socket per user, has every
+pair exchange messages and reports how many concurrent sockets held and how
+many messages per second were delivered.
+
+    python loadtest.py --url http://localhost:5000 --clients 500 --messages 20
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import statistics
+import threading
+import time
+import requests
+import socketio
+
+def get_account(base_url, index, password):
+    username = f"loadtest{index}"
+    email = f"{username}@vitstudent.ac.in"
+    response = requests.post(f"{base_url}/api/auth/register", json={
+        "username": username,
+        "email": email,
+        "password": password
+    })
+    if response.status_code == 409:
+        response = requests.post(f"{base_url}/api/auth/login", json={
+            "username": username,
+            "password": password
+        })
+    response.raise_for_status()
+    body = response.json()
+    return {"id": body["user"]["id"], "token": body["access_token"]}
+
+class ChatClient:
+    def __init__(self, base_url, account, peer_id, stats):
+        self.base_url = base_url
+        self.account = account
+        self.peer_id = peer_id
+        self.stats = stats
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('new_message', self.on_message)
+
+    def on_message(self, data):
+        content = data.get('content', '')
+        if not content.startswith('lt:'):
+            return
+        sent_at = float(content.split(':')[2])
+        self.stats.record_received(time.time() - sent_at)
+
+    def connect(self):
+        self.sio.connect(
+            self.base_url,
+            auth={"token": self.account["token"]},
+            headers={"Authorization": f"Bearer {self.account['token']}"},
+            wait_timeout=10
+        )
+        self.sio.emit('join_chat', {"user_id": self.account["id"], "other_user_id": self.peer_id})
+
+    def send(self, count, interval):
+        for index in range(count):
+            self.sio.emit('send_message', {
+                "sender_id": self.account["id"],
+                "receiver_id": self.peer_id,
+                "content": f"lt:{index}:{time.time()}"
+            })
+            self.stats.record_sent()
+            if interval:
+                time.sleep(interval)
+
+    def close(self):
+        if self.sio.connected:
+            self.sio.disconnect()
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.received = 0
+        self.latencies = []
+
+    def record_sent(self):
+        with self.lock:
+            self.sent += 1
+
+    def record_received(self, latency):
+        with self.lock:
+            self.received += 1
+            self.latencies.append(latency)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO chat load test')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=100, help='concurrent sockets (rounded up to an even number)')
+    parser.add_argument('--messages', type=int, default=10, help='messages sent per client')
+    parser.add_argument('--interval', type=float, default=0.0, help='seconds between a client\'s messages')
+    parser.add_argument('--drain', type=float, default=5.0, help='seconds to wait for deliveries after sending')
+    parser.add_argument('--workers', type=int, default=50, help='threads used to connect and send')
+    parser.add_argument('--password', default='loadtest-password')
+    args = parser.parse_args()
+
+    count = args.clients + (args.clients % 2)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        accounts = list(pool.map(lambda index: get_account(args.url, index, args.password), range(count)))
+
+    stats = Stats()
+    clients = []
+    for index, account in enumerate(accounts):
+        peer = accounts[index ^ 1]
+        clients.append(ChatClient(args.url, account, peer["id"], stats))
+
+    def try_connect(client):
+        try:
+            client.connect()
+            return True
+        except Exception as e:
+            print(f"connect failed for user {client.account['id']}: {e}")
+            return False
+
+    connect_started = time.time()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        connected = [client for client, ok in zip(clients, pool.map(try_connect, clients)) if ok]
+    connect_seconds = time.time() - connect_started
+
+    send_started = time.time()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(lambda client: client.send(args.messages, args.interval), connected))
+    send_seconds = time.time() - send_started
+
+    time.sleep(args.drain)
+    for client in connected:
+        client.close()
+
+    elapsed = send_seconds + args.drain
+    print(f"sockets connected:   {len(connected)}/{len(clients)} in {connect_seconds:.2f}s")
+    print(f"messages sent:       {stats.sent} ({stats.sent / send_seconds if send_seconds else 0:.1f}/s)")
+    print(f"messages delivered:  {stats.received} ({stats.received / elapsed if elapsed else 0:.1f}/s incl. drain)")
+    if stats.latencies:
+        print(f"delivery latency:    p50={percentile(stats.latencies, 0.5) * 1000:.1f}ms "
+              f"p95={percentile(stats.latencies, 0.95) * 1000:.1f}ms "
+              f"p99={percentile(stats.latencies, 0.99) * 1000:.1f}ms "
+              f"mean={statistics.mean(stats.latencies) * 1000:.1f}ms")
+
+if __name__ == '__main__':
+    main()
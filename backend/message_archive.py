@@ -0,0 +1,189 @@
+from sqlalchemy import (MetaData, Table, Column, Integer, Text, Boolean, DateTime, Index, select, insert, delete,
+                        func, and_, or_, exists)
+from datetime import datetime, timedelta
+import threading
+import time
+import os
+import logging
+from database import SessionFactory, Message, MessageArchive, MessageReadMark, IST
+
+logger = logging.getLogger(__name__)
+
+# Read messages older than this leave the hot table; the newest message of each direction always stays.
+# Unread messages stay hot whatever their age, so unread counts never have to read the archives.
+ARCHIVE_AFTER_DAYS = int(os.getenv('MESSAGE_ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv('MESSAGE_ARCHIVE_INTERVAL_SECONDS', '3600'))
+ARCHIVE_ENABLED = os.getenv('MESSAGE_ARCHIVE', 'true').lower() == 'true'
+ARCHIVE_BATCH_SIZE = 1000
+
+# Columns copied into the archive; write_key only matters until the pipeline journal is replayed
+ARCHIVE_COLUMNS = ('id', 'sender_id', 'receiver_id', 'content', 'is_read', 'created_at')
+
+_archive_metadata = MetaData()
+_tables_lock = threading.Lock()
+
+def archive_table(month):
+    """Table object for one month of archived messages (same columns and pair index as messages)"""
+    name = f"messages_archive_{month}"
+    with _tables_lock:
+        table = _archive_metadata.tables.get(name)
+        if table is None:
+            table = Table(
+                name, _archive_metadata,
+                Column('id', Integer, primary_key=True, autoincrement=False),
+                Column('sender_id', Integer, nullable=False),
+                Column('receiver_id', Integer, nullable=False),
+                Column('content', Text, nullable=False),
+                Column('is_read', Boolean),
+                Column('created_at', DateTime),
+                Index(f"ix_{name}_pair", 'sender_id', 'receiver_id', 'id')
+            )
+        return table
+
+def _record_month(session, month, rows):
+    ids = [row['id'] for row in rows]
+    archive = session.get(MessageArchive, month)
+    if archive is None:
+        session.add(MessageArchive(month=month, min_id=min(ids), max_id=max(ids), row_count=len(ids)))
+    else:
+        archive.min_id = min(archive.min_id, min(ids))
+        archive.max_id = max(archive.max_id, max(ids))
+        archive.row_count += len(ids)
+
+def archive_messages(after_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move cold messages into per-month archive tables; returns how many moved"""
+    session = SessionFactory()
+    try:
+        cutoff = datetime.now(IST) - timedelta(days=after_days)
+        messages = Message.__table__
+        # Keeping each direction's newest message hot keeps the conversation list off the archives
+        newest = select(func.max(messages.c.id)).group_by(messages.c.sender_id, messages.c.receiver_id)
+        read = exists().where(
+            MessageReadMark.reader_id == messages.c.receiver_id,
+            MessageReadMark.sender_id == messages.c.sender_id,
+            MessageReadMark.last_read_message_id >= messages.c.id
+        )
+        moved = 0
+        while True:
+            rows = [dict(row) for row in session.execute(
+                select(*(messages.c[name] for name in ARCHIVE_COLUMNS)).where(
+                    messages.c.created_at < cutoff,
+                    messages.c.id.not_in(newest),
+                    read
+                ).order_by(messages.c.id).limit(batch_size)
+            ).mappings()]
+            if not rows:
+                break
+
+            by_month = {}
+            for row in rows:
+                by_month.setdefault(row['created_at'].strftime('%Y%m'), []).append(row)
+
+            for month, month_rows in by_month.items():
+                table = archive_table(month)
+                table.create(session.connection(), checkfirst=True)
+                session.execute(insert(table), month_rows)
+                _record_month(session, month, month_rows)
+
+            session.execute(delete(messages).where(messages.c.id.in_([row['id'] for row in rows])))
+            # Copy and delete commit together, so a message is never in both tiers or neither
+            session.commit()
+            moved += len(rows)
+
+        if moved:
+            logger.info(f"Archived {moved} messages older than {after_days} days")
+        return moved
+
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Message archive failed: {type(e).__name__}: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+def _pair_filter(table, user_id, other_user_id):
+    return or_(
+        and_(table.c.sender_id == user_id, table.c.receiver_id == other_user_id),
+        and_(table.c.sender_id == other_user_id, table.c.receiver_id == user_id)
+    )
+
+def _archives(session):
+    return session.query(MessageArchive).order_by(MessageArchive.max_id.desc()).all()
+
+def load_history(session, user_id, other_user_id, after_id=None, before_id=None, limit=50, offset=0):
+    """One conversation's messages across the hot table and the monthly archives.
+
+    Newest first unless after_id is given (then oldest first after it). Returns up to
+    offset + limit + 1 rows in that order; archives are only read once the hot table
+    runs out of rows for the requested range.
+    """
+    wanted = offset + limit + 1
+    ascending = after_id is not None
+    tiers = [(Message.__table__, None, None)]
+    for archive in _archives(session):
+        if after_id is not None and archive.max_id <= after_id:
+            continue
+        if before_id is not None and archive.min_id >= before_id:
+            continue
+        tiers.append((archive_table(archive.month), archive.min_id, archive.max_id))
+    if ascending:
+        # Oldest archive first, hot table last
+        tiers = tiers[1:][::-1] + tiers[:1]
+
+    rows = []
+    for table, min_id, max_id in tiers:
+        if len(rows) >= wanted and min_id is not None:
+            # Enough rows already unless this tier still holds ids inside the collected range
+            if (ascending and min_id > rows[wanted - 1].id) or (not ascending and max_id < rows[wanted - 1].id):
+                continue
+        query = select(table).where(_pair_filter(table, user_id, other_user_id))
+        if after_id is not None:
+            query = query.where(table.c.id > after_id)
+        if before_id is not None:
+            query = query.where(table.c.id < before_id)
+        order = table.c.id.asc() if ascending else table.c.id.desc()
+        rows.extend(session.execute(query.order_by(order).limit(wanted)).all())
+        rows.sort(key=lambda row: row.id, reverse=not ascending)
+
+    return rows[:wanted]
+
+def count_history(session, user_id, other_user_id):
+    """Total messages in a conversation across every tier
+
+    One COUNT per archived month, so callers only run it when a client asks for the total.
+    """
+    total = 0
+    for table in [Message.__table__] + [archive_table(archive.month) for archive in _archives(session)]:
+        total += session.execute(
+            select(func.count()).select_from(table).where(_pair_filter(table, user_id, other_user_id))
+        ).scalar() or 0
+    return total
+
+_archiver = None
+
+def start_archiver(interval=ARCHIVE_INTERVAL_SECONDS):
+    """Run archive_messages() periodically on a daemon thread"""
+    global _archiver
+    if not ARCHIVE_ENABLED or _archiver is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                archive_messages()
+            except Exception:
+                # Already logged; try again next interval
+                pass
+
+    _archiver = threading.Thread(target=run, name='message-archiver', daemon=True)
+    _archiver.start()
+    logger.info(f"Message archiver started (interval: {interval}s, after {ARCHIVE_AFTER_DAYS} days)")
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Move old chat messages into monthly archive tables')
+    parser.add_argument('--after-days', type=int, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Archived {archive_messages(after_days=args.after_days)} messages")
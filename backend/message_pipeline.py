@@ -0,0 +1,315 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from datetime import datetime
+import threading
+import atexit
+import queue
+import json
+import time
+import uuid
+import glob
+import os
+import logging
+try:
+    import fcntl
+except ImportError:  # Windows: journals of other processes are left alone
+    fcntl = None
+from database import SessionFactory, Message, IST
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND = os.getenv('MESSAGE_WRITE_BEHIND', 'true').lower() == 'true'
+FLUSH_INTERVAL_MS = int(os.getenv('MESSAGE_FLUSH_INTERVAL_MS', '5'))
+MAX_BATCH_SIZE = int(os.getenv('MESSAGE_BATCH_SIZE', '500'))
+# Each process journals to its own locked file here; relative paths are taken from the app directory
+JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.getenv('MESSAGE_JOURNAL_DIR', 'message_journal'))
+JOURNAL_ROTATE_BYTES = 1024 * 1024
+# Failed attempts before a batch is retried row by row and the rows that still fail are set aside
+MAX_BATCH_ATTEMPTS = int(os.getenv('MESSAGE_BATCH_ATTEMPTS', '3'))
+DEAD_LETTER_FILE = 'dead_letters.ndjson'
+
+def new_message_row(sender_id, receiver_id, content):
+    """A message row ready to queue; its id is assigned by the database when the row is inserted
+
+    The write key identifies the row across journal replays, so a message is never stored twice.
+    """
+    return {
+        'write_key': uuid.uuid4().hex,
+        'sender_id': sender_id,
+        'receiver_id': receiver_id,
+        'content': content,
+        'is_read': False,
+        'created_at': datetime.now(IST)
+    }
+
+def _journal_line(row):
+    return json.dumps(dict(row, created_at=row['created_at'].isoformat())) + '\n'
+
+def _try_lock(handle):
+    """Take an exclusive lock on an open journal without waiting; False while another process holds it"""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _read_journal(handle):
+    rows = []
+    for line in handle:
+        try:
+            row = json.loads(line)
+            row['created_at'] = datetime.fromisoformat(row['created_at'])
+            rows.append(row)
+        except (ValueError, KeyError):
+            # A torn final line from a crash mid-write
+            continue
+    return rows
+
+def _insert_missing(session, rows):
+    """Insert rows whose write keys are not stored yet; safe to repeat. Returns (write_key -> id, inserted)"""
+    keys = [row['write_key'] for row in rows]
+    stored = dict(session.query(Message.write_key, Message.id).filter(Message.write_key.in_(keys)).all())
+    missing = list({row['write_key']: row for row in rows if row['write_key'] not in stored}.values())
+    if missing:
+        # Ids come from the table's autoincrement in queue order, so they rise in commit order
+        stored.update(session.execute(insert(Message).returning(Message.write_key, Message.id), missing).all())
+    return stored, len(missing)
+
+class MessagePipeline:
+    """Write-behind persistence: one writer thread group-commits, and callers deliver once a row is durable"""
+
+    def __init__(self, journal_dir=JOURNAL_DIR, flush_interval_ms=FLUSH_INTERVAL_MS, max_batch_size=MAX_BATCH_SIZE):
+        self.journal_dir = journal_dir
+        # Unique per process (pids are reused), and held under an exclusive lock while the process lives
+        self.journal_path = os.path.join(journal_dir, f"journal-{os.getpid()}-{uuid.uuid4().hex[:8]}.ndjson")
+        self.dead_letter_path = os.path.join(journal_dir, DEAD_LETTER_FILE)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._journal_lock = threading.Lock()
+        self._journal = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._on_durable = None
+        self._on_failed = None
+        # Bumped from request threads and the writer; _journal_lock is held across file writes
+        self._stats_lock = threading.Lock()
+        self.stats = {'enqueued': 0, 'persisted': 0, 'batches': 0, 'failures': 0, 'dead_lettered': 0}
+
+    def start(self, on_durable=None, on_failed=None):
+        """Replay the journals of processes that died, then start the writer
+
+        on_durable(row, sid, client_msg_id) runs once a row is committed; on_failed with the
+        same arguments runs for a row that was dead-lettered instead.
+        """
+        if self._thread is not None:
+            return
+        self._on_durable = on_durable
+        self._on_failed = on_failed
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        # Locked before the scan, so a process starting alongside never takes it for an orphan
+        _try_lock(self._journal)
+        self.replay_journals()
+        self._thread = threading.Thread(target=self._run, name='message-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Message pipeline started (flush every {self.flush_interval * 1000:.0f}ms, journal: {self.journal_path})")
+
+    @property
+    def running(self):
+        return self._thread is not None and not self._stopping.is_set()
+
+    def submit(self, row, sid=None, client_msg_id=None):
+        """Queue a row for persistence; it is journaled first so a crash cannot lose it"""
+        with self._journal_lock:
+            # Flushed to the OS (survives a process crash) but not fsynced per message
+            self._journal.write(_journal_line(row))
+            self._journal.flush()
+            self._queue.put((row, sid, client_msg_id))
+        self._count('enqueued')
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows):
+        session = SessionFactory()
+        try:
+            stored, inserted = _insert_missing(session, rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        for row in rows:
+            row['id'] = stored[row['write_key']]
+        return inserted
+
+    def _write_each(self, rows):
+        """Write rows one at a time after their batch kept failing; returns (inserted, dead rows)
+
+        A row that fails on its own is dead-lettered. An OperationalError (locked or unreachable
+        database) is not the row's fault and is raised so the caller retries later.
+        """
+        inserted, dead = 0, []
+        for row in rows:
+            try:
+                inserted += self._write([row])
+            except OperationalError:
+                raise
+            except Exception as e:
+                logger.error(f"Dead-lettering message {row['write_key']}: {type(e).__name__}: {str(e)}")
+                dead.append(row)
+        self._dead_letter(dead)
+        return inserted, dead
+
+    def _dead_letter(self, rows):
+        if not rows:
+            return
+        # Shared by every process; one appended write per call keeps lines whole
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as handle:
+            handle.write(''.join(_journal_line(row) for row in rows))
+        self._count('dead_lettered', len(rows))
+
+    def _dead_letter_keys(self):
+        if not os.path.exists(self.dead_letter_path):
+            return set()
+        keys = set()
+        with open(self.dead_letter_path, encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    keys.add(json.loads(line)['write_key'])
+                except (ValueError, KeyError):
+                    continue
+        return keys
+
+    def _run(self):
+        backoff = 0.1
+        attempts = 0
+        batch = []
+        while not (self._stopping.is_set() and self._queue.empty() and not batch):
+            if not batch:
+                batch = self._next_batch()
+                if not batch:
+                    self._maybe_rotate_journal()
+                    continue
+            dead_keys = set()
+            try:
+                if attempts < MAX_BATCH_ATTEMPTS:
+                    self._write([row for row, _, _ in batch])
+                else:
+                    # Set aside the rows that cannot be stored so they stop blocking the rest
+                    _, dead = self._write_each([row for row, _, _ in batch])
+                    dead_keys = {row['write_key'] for row in dead}
+            except Exception as e:
+                # Keep the batch and retry; the journal still holds it if we never recover
+                self._count('failures')
+                if not isinstance(e, OperationalError):
+                    attempts += 1
+                logger.error(f"Message batch write failed ({len(batch)} messages): {type(e).__name__}: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+
+            backoff = 0.1
+            attempts = 0
+            self._count('persisted', len(batch) - len(dead_keys))
+            self._count('batches')
+            for row, sid, client_msg_id in batch:
+                callback = self._on_failed if row['write_key'] in dead_keys else self._on_durable
+                if callback:
+                    try:
+                        callback(row, sid, client_msg_id)
+                    except Exception as e:
+                        logger.error(f"Message delivery failed: {str(e)}")
+            batch = []
+
+    def _maybe_rotate_journal(self):
+        # Only safe when nothing is queued: every journaled row is then committed
+        with self._journal_lock:
+            if not self._queue.empty() or self._journal is None:
+                return
+            if self._journal.tell() < JOURNAL_ROTATE_BYTES:
+                return
+            # Truncated in place: reopening the file would drop the lock
+            self._journal.seek(0)
+            self._journal.truncate()
+
+    def replay_journals(self):
+        """Persist rows from journals whose process is gone; a live process's journal stays locked"""
+        recovered = 0
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, 'journal-*.ndjson'))):
+            if path == self.journal_path:
+                continue
+            try:
+                handle = open(path, 'r', encoding='utf-8')
+            except FileNotFoundError:
+                # Replayed by another process in the meantime
+                continue
+            with handle:
+                if not _try_lock(handle):
+                    continue
+                recovered += self.replay_journal(handle)
+                try:
+                    # Removed while still locked, so no other process replays it again
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return recovered
+
+    def replay_journal(self, handle):
+        """Persist the rows of one journal that never reached the database (safe to repeat)"""
+        # Rows dead-lettered before the crash stay set aside
+        dead_keys = self._dead_letter_keys()
+        rows = [row for row in _read_journal(handle) if row['write_key'] not in dead_keys]
+
+        recovered = 0
+        for start in range(0, len(rows), self.max_batch_size):
+            chunk = rows[start:start + self.max_batch_size]
+            try:
+                recovered += self._write(chunk)
+            except OperationalError:
+                raise
+            except Exception as e:
+                logger.error(f"Journal replay batch failed, retrying row by row: {type(e).__name__}: {str(e)}")
+                recovered += self._write_each(chunk)[0]
+
+        if recovered:
+            logger.warning(f"Recovered {recovered} unflushed messages from {handle.name}")
+        return recovered
+
+    def stop(self, timeout=5.0):
+        """Drain the queue and stop the writer"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        with self._journal_lock:
+            if self._journal and self._queue.empty() and not self._thread.is_alive():
+                # Everything is committed; the journal is no longer needed
+                os.remove(self.journal_path)
+                self._journal.close()
+                self._journal = None
+
+pipeline = MessagePipeline()
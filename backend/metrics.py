@@ -0,0 +1,212 @@
+from flask import request, g, has_request_context
+from sqlalchemy import event
+from functools import wraps
+import threading
+import bisect
+import time
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this log every statement they ran
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '500'))
+# Statements kept per request for the slow-request log
+MAX_CAPTURED_STATEMENTS = int(os.getenv('METRICS_MAX_STATEMENTS', '200'))
+# Bearer token for the scraper on /metrics; without one, only an admin's JWT can read it
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, label_values)} {_number(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative buckets per label set, in the Prometheus text format"""
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    labels = _label_text(self.labels + ('le',), label_values + (_number(bound) if bound != '+Inf' else bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _label_text(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_number(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+http_requests = Counter('assemble_http_requests_total', 'HTTP requests by endpoint, method and status',
+                        ('endpoint', 'method', 'status'))
+http_latency = Histogram('assemble_http_request_duration_seconds', 'HTTP request latency by endpoint',
+                         ('endpoint', 'method'))
+request_queries = Histogram('assemble_db_queries_per_request', 'SQL statements issued per HTTP request',
+                            ('endpoint',), buckets=QUERY_COUNT_BUCKETS)
+request_db_time = Histogram('assemble_db_time_per_request_seconds', 'Time spent in SQL per HTTP request',
+                            ('endpoint',))
+db_queries = Counter('assemble_db_queries_total', 'SQL statements, by origin (request or background)', ('origin',))
+socket_events = Counter('assemble_socketio_events_total', 'Socket.IO events received, by event and outcome',
+                        ('event', 'outcome'))
+socket_latency = Histogram('assemble_socketio_event_duration_seconds', 'Socket.IO handler latency by event',
+                           ('event',))
+
+METRICS = [http_requests, http_latency, request_queries, request_db_time, db_queries, socket_events, socket_latency]
+
+class RequestStats:
+    """SQL issued while serving one request"""
+    __slots__ = ('started', 'query_count', 'db_time', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements = []
+
+def current_request_stats():
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    pending = conn.info.get('query_started')
+    if not pending:
+        return
+    started = pending.pop()
+    stats = current_request_stats()
+    if stats is None:
+        db_queries.inc('background')
+        return
+    db_queries.inc('request')
+    elapsed = time.perf_counter() - started
+    stats.query_count += 1
+    stats.db_time += elapsed
+    if len(stats.statements) < MAX_CAPTURED_STATEMENTS:
+        stats.statements.append((statement, elapsed))
+
+def instrument_engine(engine):
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+def _endpoint():
+    # The rule's endpoint, never the raw path, so label cardinality stays bounded
+    return request.url_rule.endpoint if request.url_rule else 'unmatched'
+
+def init_metrics(app, engine):
+    """Per-endpoint latency and SQL histograms, plus the slow-request log"""
+    instrument_engine(engine)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def record_request_stats(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        endpoint = _endpoint()
+
+        http_requests.inc(endpoint, request.method, response.status_code)
+        http_latency.observe(elapsed, endpoint, request.method)
+        request_queries.observe(stats.query_count, endpoint)
+        request_db_time.observe(stats.db_time, endpoint)
+
+        if elapsed * 1000 >= SLOW_REQUEST_MS:
+            statements = '\n'.join(f"  [{seconds * 1000:.1f}ms] {statement}" for statement, seconds in stats.statements)
+            logger.warning(
+                f"Slow request: {request.method} {request.path} ({endpoint}) took {elapsed * 1000:.1f}ms, "
+                f"{stats.query_count} queries in {stats.db_time * 1000:.1f}ms\n{statements}"
+            )
+        return response
+
+def timed_handler(event_name, handler):
+    """Wrap one Socket.IO handler so its calls are counted and timed"""
+    @wraps(handler)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = handler(*args, **kwargs)
+        except Exception:
+            socket_events.inc(event_name, 'error')
+            raise
+        finally:
+            socket_latency.observe(time.perf_counter() - started, event_name)
+        socket_events.inc(event_name, 'ok')
+        return result
+    return timed
+
+def instrument_socketio(socketio):
+    """Count and time every Socket.IO event handler, whichever module registered it
+
+    Handlers are wrapped as they are registered through the public on() decorator, so
+    this does not depend on Flask-SocketIO's private dispatch code. Call it before any
+    handler is registered.
+    """
+    register = socketio.on
+
+    def on(message, namespace=None):
+        decorator = register(message, namespace)
+        return lambda handler: decorator(timed_handler(message, handler))
+
+    socketio.on = on
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
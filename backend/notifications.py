@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from database import Session, User, Notification
+from read_state import notification_watermark, mark_notifications_read, unread_notification_count
 
 notifications_bp = Blueprint('notifications', __name__, url_prefix='/api/notifications')
 
@@ -9,19 +10,24 @@ notifications_bp = Blueprint('notifications', __name__, url_prefix='/api/notific
 def get_notifications():
     session = Session()
     try:
-        current_user_id = get_jwt_identity()
+        user = session.query(User).filter_by(username=get_jwt_identity()).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
         
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
         
+        # Everything up to the watermark has been read
+        watermark = notification_watermark(session, user.id)
+        
         # Base query
-        query = session.query(Notification).filter_by(user_id=current_user_id)
+        query = session.query(Notification).filter_by(user_id=user.id)
         
         # Filter by read status
         if unread_only:
-            query = query.filter_by(is_read=False)
+            query = query.filter(Notification.id > watermark)
         
         # Get total count
         total = query.count()
@@ -38,7 +44,7 @@ def get_notifications():
                 "title": notification.title,
                 "content": notification.content,
                 "type": notification.type,
-                "is_read": notification.is_read,
+                "is_read": notification.id <= watermark,
                 "created_at": notification.created_at.isoformat()
             })
         
@@ -62,20 +68,26 @@ def get_notifications():
 def mark_notification_read(notification_id):
     session = Session()
     try:
-        current_user_id = get_jwt_identity()
+        user = session.query(User).filter_by(username=get_jwt_identity()).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
         
-        notification = session.query(Notification).filter_by(
+        notification = session.query(Notification.id).filter_by(
             id=notification_id,
-            user_id=current_user_id
+            user_id=user.id
         ).first()
         
         if not notification:
             return jsonify({"error": "Notification not found"}), 404
         
-        notification.is_read = True
+        # A watermark: this notification and every older one now count as read
+        mark_notifications_read(session, user.id, up_to_id=notification_id)
         session.commit()
         
-        return jsonify({"message": "Notification marked as read"}), 200
+        return jsonify({
+            "message": "Notification marked as read",
+            "last_read_id": notification_watermark(session, user.id)
+        }), 200
         
     except Exception as e:
         session.rollback()
@@ -88,19 +100,15 @@ def mark_notification_read(notification_id):
 def mark_all_notifications_read():
     session = Session()
     try:
-        current_user_id = get_jwt_identity()
-        
-        notifications = session.query(Notification).filter_by(
-            user_id=current_user_id,
-            is_read=False
-        ).all()
-        
-        for notification in notifications:
-            notification.is_read = True
+        user = session.query(User).filter_by(username=get_jwt_identity()).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
         
+        unread_count = unread_notification_count(session, user.id)
+        mark_notifications_read(session, user.id)
         session.commit()
         
-        return jsonify({"message": f"Marked {len(notifications)} notifications as read"}), 200
+        return jsonify({"message": f"Marked {unread_count} notifications as read"}), 200
         
     except Exception as e:
         session.rollback()
@@ -113,11 +121,13 @@ def mark_all_notifications_read():
 def delete_notification(notification_id):
     session = Session()
     try:
-        current_user_id = get_jwt_identity()
+        user = session.query(User).filter_by(username=get_jwt_identity()).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
         
         notification = session.query(Notification).filter_by(
             id=notification_id,
-            user_id=current_user_id
+            user_id=user.id
         ).first()
         
         if not notification:
@@ -139,10 +149,12 @@ def delete_notification(notification_id):
 def get_notification_count():
     session = Session()
     try:
-        current_user_id = get_jwt_identity()
+        user = session.query(User).filter_by(username=get_jwt_identity()).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
         
-        total_count = session.query(Notification).filter_by(user_id=current_user_id).count()
-        unread_count = session.query(Notification).filter_by(user_id=current_user_id, is_read=False).count()
+        total_count = session.query(Notification).filter_by(user_id=user.id).count()
+        unread_count = unread_notification_count(session, user.id)
         
         return jsonify({
             "total": total_count,
@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+import multiprocessing
+import threading
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Werkzeug method string, e.g. pbkdf2:sha256:600000 or scrypt:32768:8:1; stored hashes
+# with any other method are rehashed the next time their owner logs in
+HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+HASH_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', '16'))
+# 0 hashes on the calling thread (tests, scripts)
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Hash jobs allowed to wait or run at once; beyond this requests fail fast with 503
+HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', str(HASH_WORKERS * 8 or 1)))
+HASH_TIMEOUT_SECONDS = float(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', '10'))
+
+class HashingBusy(Exception):
+    """Raised instead of queueing when the hashing pool is saturated"""
+
+class PasswordHasher:
+    """Runs the CPU-bound KDF in worker processes so request threads and sockets keep moving"""
+
+    def __init__(self, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING, method=HASH_METHOD,
+                 salt_length=HASH_SALT_LENGTH, timeout=HASH_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.method = method
+        self.salt_length = salt_length
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        # Bumped from every request thread; _lock is held across pool startup, so stats get their own
+        self._stats_lock = threading.Lock()
+        self.stats = {'hashed': 0, 'verified': 0, 'rejected': 0, 'rehashed': 0}
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def start(self):
+        """Create the pool and fork its workers now; call before anything in the process starts a thread"""
+        if self.workers <= 0:
+            return
+        with self._lock:
+            if self._pool is None:
+                context = multiprocessing.get_context('fork') if hasattr(os, 'fork') else None
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                # With fork, every worker is started on the first submit
+                self._pool.submit(int).result()
+                logger.info(f"Password hashing pool started ({self.workers} workers, method {self.method})")
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.count('rejected')
+            raise HashingBusy()
+        try:
+            if self._pool is None:
+                self.start()
+            return self._pool.submit(fn, *args).result(timeout=self.timeout)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        self.count('hashed')
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, stored_hash, password):
+        self.count('verified')
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+hasher = PasswordHasher()
@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from sqlalchemy import event
+from datetime import datetime
+import threading
+import time
+import os
+import logging
+from database import SessionFactory, Notification
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL_SECONDS = int(os.getenv('PRESENCE_TTL_SECONDS', '90'))
+
+def user_room(user_id):
+    """Room every socket of a user joins on connect"""
+    return f"user_{user_id}"
+
+class PresenceRegistry:
+    """Online users of this process, expired when their heartbeats stop"""
+
+    def __init__(self, ttl=PRESENCE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sids = {}
+        # user_id -> monotonic time of last heartbeat, least recently seen first,
+        # so expiry only ever looks at the entries that are actually stale
+        self._heartbeats = OrderedDict()
+        self._last_seen = {}
+
+    def _touch(self, user_id):
+        self._heartbeats[user_id] = time.monotonic()
+        self._heartbeats.move_to_end(user_id)
+        self._last_seen[user_id] = datetime.now()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        expired = []
+        while self._heartbeats:
+            user_id, seen = next(iter(self._heartbeats.items()))
+            if seen >= cutoff:
+                break
+            self._heartbeats.popitem(last=False)
+            self._sids.pop(user_id, None)
+            expired.append(user_id)
+        return expired
+
+    def connect(self, user_id, sid):
+        with self._lock:
+            self._sids.setdefault(user_id, set()).add(sid)
+            self._touch(user_id)
+
+    def disconnect(self, user_id, sid):
+        with self._lock:
+            sids = self._sids.get(user_id)
+            if sids is None:
+                return
+            sids.discard(sid)
+            if not sids:
+                del self._sids[user_id]
+                self._heartbeats.pop(user_id, None)
+                self._last_seen[user_id] = datetime.now()
+
+    def heartbeat(self, user_id, sid):
+        with self._lock:
+            # Re-registers a connection that expired while it was still open
+            self._sids.setdefault(user_id, set()).add(sid)
+            self._touch(user_id)
+            self._expire()
+
+    def is_online(self, user_id):
+        with self._lock:
+            self._expire()
+            return user_id in self._sids
+
+    def lookup(self, user_ids):
+        """Presence for many users at once: {user_id: {"online": bool, "last_seen": iso or None}}"""
+        with self._lock:
+            self._expire()
+            result = {}
+            for user_id in user_ids:
+                last_seen = self._last_seen.get(user_id)
+                result[user_id] = {
+                    "online": user_id in self._sids,
+                    "last_seen": last_seen.isoformat() if last_seen else None
+                }
+            return result
+
+    def online_count(self):
+        with self._lock:
+            self._expire()
+            return len(self._sids)
+
+presence = PresenceRegistry()
+
+_socketio = None
+
+def init_presence(app_socketio):
+    global _socketio
+    _socketio = app_socketio
+
+def emit_to_user(user_id, event_name, data):
+    """Deliver an event to every socket of a user, on any process sharing the message queue"""
+    if _socketio is None:
+        return
+    _socketio.emit(event_name, data, room=user_room(user_id))
+
+def serialize_notification(notification):
+    return {
+        "id": notification.id,
+        "title": notification.title,
+        "content": notification.content,
+        "type": notification.type,
+        "is_read": bool(notification.is_read),
+        "created_at": notification.created_at.isoformat() if notification.created_at else None
+    }
+
+# Push notifications to their recipient once the transaction that created them commits,
+# so every endpoint that adds a Notification gets real-time delivery for free.
+# Payloads are built at flush time because attributes are expired by the commit.
+@event.listens_for(SessionFactory, 'after_flush')
+def _collect_notifications(session, flush_context):
+    created = [(obj.user_id, serialize_notification(obj)) for obj in session.new if isinstance(obj, Notification)]
+    if created:
+        session.info.setdefault('new_notifications', []).extend(created)
+
+@event.listens_for(SessionFactory, 'after_commit')
+def _push_notifications(session):
+    created = session.info.pop('new_notifications', None)
+    if not created or _socketio is None:
+        return
+    for user_id, payload in created:
+        try:
+            emit_to_user(user_id, 'notification', payload)
+        except Exception as e:
+            logger.error(f"Failed to push notification {payload['id']}: {str(e)}")
+
+@event.listens_for(SessionFactory, 'after_rollback')
+def _drop_notifications(session):
+    session.info.pop('new_notifications', None)
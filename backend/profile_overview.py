@@ -0,0 +1,119 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from database import User, Project, HackathonPost, PortfolioItem, ActivityLog, user_skills, user_roles, IST
+
+# Sections of the profile overview, in response order
+PROFILE_FIELDS = ('profile', 'counts', 'portfolio', 'activity')
+# Sections only the profile's owner may read
+PRIVATE_FIELDS = ('activity',)
+ACTIVITY_LIMIT = 20
+
+class ProfileFieldsError(ValueError):
+    """A fields= value naming a section the overview does not have"""
+
+def profile_fields(args, own_profile):
+    """Sections requested through fields=; without it, every section the viewer may read"""
+    raw = args.get('fields', '').strip()
+    if not raw:
+        return [field for field in PROFILE_FIELDS if own_profile or field not in PRIVATE_FIELDS]
+
+    fields = []
+    for field in raw.split(','):
+        field = field.strip()
+        if field not in PROFILE_FIELDS:
+            raise ProfileFieldsError(f"Fields must be among {', '.join(PROFILE_FIELDS)}")
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+def profile_counts(session, user_id):
+    """Every profile count in one statement, instead of loading the collections to len() them"""
+    def count(statement):
+        return statement.scalar_subquery()
+
+    row = session.query(
+        count(select(func.count(Project.id)).where(Project.owner_id == user_id, Project.deleted_at.is_(None))),
+        count(select(func.count(HackathonPost.id)).where(
+            HackathonPost.owner_id == user_id, HackathonPost.deleted_at.is_(None))),
+        count(select(func.count()).select_from(user_skills).where(user_skills.c.user_id == user_id)),
+        count(select(func.count()).select_from(user_roles).where(user_roles.c.user_id == user_id)),
+        count(select(func.count(PortfolioItem.id)).where(PortfolioItem.user_id == user_id))
+    ).one()
+
+    return {
+        "projects": row[0],
+        "hackathons": row[1],
+        "skills": row[2],
+        "roles": row[3],
+        "portfolio": row[4]
+    }
+
+def portfolio_item_data(item):
+    return {
+        "id": item.id,
+        "title": item.title,
+        "description": item.description,
+        "image_url": item.image_url,
+        "project_url": item.project_url,
+        "github_url": item.github_url,
+        "technologies": item.technologies,
+        "created_at": item.created_at.isoformat()
+    }
+
+def activity_data(activity):
+    return {
+        "id": activity.id,
+        "action_type": activity.action_type,
+        "action_description": activity.action_description,
+        "related_id": activity.related_id,
+        "created_at": activity.created_at.isoformat()
+    }
+
+def build_overview(session, user_id, fields):
+    """The requested sections of a user's profile, one query per section; None if the user does not exist
+
+    The profile section loads skills and roles with one IN query each. Sections left out
+    of fields issue no queries at all.
+    """
+    overview = {}
+    if 'profile' in fields:
+        user = session.query(User).options(selectinload(User.skills), selectinload(User.roles)).filter(
+            User.id == user_id).first()
+        if not user:
+            return None
+        overview["profile"] = {
+            "id": user.id,
+            "username": user.username,
+            "full_name": user.full_name,
+            "bio": user.bio,
+            "location": user.location,
+            "experience": user.experience,
+            "github_url": user.github_url,
+            "linkedin_url": user.linkedin_url,
+            "twitter_url": user.twitter_url,
+            "portfolio_url": user.portfolio_url,
+            "preferred_contact": user.preferred_contact,
+            "availability": user.availability,
+            "open_to_opportunities": user.open_to_opportunities,
+            "avatar_url": user.avatar_url,
+            "created_at": user.created_at.astimezone(IST).isoformat(),
+            "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in user.skills],
+            "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category}
+                      for role in user.roles]
+        }
+    elif session.query(User.id).filter(User.id == user_id).first() is None:
+        return None
+
+    if 'counts' in fields:
+        overview["counts"] = profile_counts(session, user_id)
+
+    if 'portfolio' in fields:
+        overview["portfolio"] = [portfolio_item_data(item) for item in session.query(PortfolioItem).filter(
+            PortfolioItem.user_id == user_id).order_by(PortfolioItem.created_at.desc(), PortfolioItem.id.desc())]
+
+    if 'activity' in fields:
+        overview["activity"] = [activity_data(activity) for activity in session.query(ActivityLog).filter(
+            ActivityLog.user_id == user_id).order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc()).limit(
+            ACTIVITY_LIMIT)]
+
+    return overview
@@ -2,7 +2,17 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timezone
 import pytz
-from database import Session, User, Project, Skill, Role, ProjectApplication, Notification, ActivityLog, ProjectMilestone
+from database import Session, User, Project, Skill, ProjectApplication, Notification, ActivityLog, ProjectMilestone, project_skills
+from counters import adjust_project_counters, accepted_delta
+from catalog import sync_skills, sync_roles
+from deletion import remove_project
+from group_chat import sync_team_membership
+from query_guard import query_budget
+from application_review import review_arguments, review_applications, review_pagination, ReviewArgumentError
+from bookmarks import (bookmarked_ids, list_bookmarks, add_bookmarks, remove_bookmarks, BookmarkCursorError,
+                       BOOKMARK_PAGE_SIZE, MAX_BOOKMARK_PAGE_SIZE, MAX_BULK_BOOKMARKS)
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
 import logging
 
 projects_bp = Blueprint('projects', __name__, url_prefix='/api/projects')
@@ -10,6 +20,7 @@ logger = logging.getLogger(__name__)
 
 @projects_bp.route('/', methods=['GET'], strict_slashes=False)
 @jwt_required()
+@query_budget(8)
 def get_projects():
     session = Session()
     try:
@@ -34,20 +45,28 @@ def get_projects():
         
         # Apply pagination
         offset = (page - 1) * per_page
-        projects = query.order_by(Project.created_at.desc()).offset(offset).limit(per_page).all()
+        projects = query.options(
+            joinedload(Project.owner), selectinload(Project.skills), selectinload(Project.roles)
+        ).order_by(Project.created_at.desc()).offset(offset).limit(per_page).all()
         
         # Get current user for checking applications
         current_user_id = get_jwt_identity()
         user = session.query(User).filter_by(username=current_user_id).first()
         
+        # One lookup for the whole page instead of one per project
+        applied_ids = set()
+        if user and projects:
+            applied_ids = {project_id for (project_id,) in session.query(ProjectApplication.project_id).filter(
+                ProjectApplication.user_id == user.id,
+                ProjectApplication.project_id.in_([project.id for project in projects])
+            )}
+        
+        bookmarked = bookmarked_ids(user.id if user else None)
+        
         # Serialize projects
         projects_data = []
         for project in projects:
-            # Check if current user has applied
-            has_applied = session.query(ProjectApplication).filter_by(
-                project_id=project.id,
-                user_id=user.id if user else None
-            ).first() is not None
+            has_applied = project.id in applied_ids
             
             projects_data.append({
                 "id": project.id,
@@ -65,8 +84,9 @@ def get_projects():
                 },
                 "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in project.skills],
                 "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category} for role in project.roles],
-                "application_count": len(project.applications),
+                "application_count": project.application_count,
                 "has_applied": has_applied,
+                "is_bookmarked": project.id in bookmarked,
                 "is_owner": project.owner_id == (user.id if user else None)
             })
         
@@ -170,8 +190,9 @@ def get_project(project_id):
             },
             "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in project.skills],
             "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category} for role in project.roles],
-            "application_count": len(project.applications),
+            "application_count": project.application_count,
             "has_applied": has_applied,
+            "is_bookmarked": project.id in bookmarked_ids(user.id if user else None),
             "is_owner": project.owner_id == (user.id if user else None)
         }
         
@@ -210,19 +231,13 @@ def create_project():
             owner_id=user.id
         )
         
-        # Add skills
-        skill_ids = data.get('skill_ids', [])
-        if skill_ids:
-            skills = session.query(Skill).filter(Skill.id.in_(skill_ids)).all()
-            project.skills = skills
+        session.add(project)
+        session.flush()
         
-        # Add roles
-        role_ids = data.get('role_ids', [])
-        if role_ids:
-            roles = session.query(Role).filter(Role.id.in_(role_ids)).all()
-            project.roles = roles
+        # Add skills and roles
+        sync_skills(session, project, data.get('skill_ids', []))
+        sync_roles(session, project, data.get('role_ids', []))
         
-        session.add(project)
         session.commit()
         
         # Log activity
@@ -285,6 +300,7 @@ def apply_to_project(project_id):
         )
         
         session.add(application)
+        adjust_project_counters(session, project_id, applications=1)
         
         # Create notification for project owner
         notification = Notification(
@@ -318,6 +334,7 @@ def apply_to_project(project_id):
 
 @projects_bp.route('/<int:project_id>/applications', methods=['GET'])
 @jwt_required()
+@query_budget(10)
 def get_project_applications(project_id):
     session = Session()
     try:
@@ -332,15 +349,25 @@ def get_project_applications(project_id):
         if not project:
             return jsonify({"error": "Project not found or not owned by you"}), 404
         
-        applications = session.query(ProjectApplication).filter_by(project_id=project_id).order_by(ProjectApplication.applied_at.desc()).all()
+        try:
+            arguments = review_arguments(request.args)
+        except ReviewArgumentError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Overlap is counted against the project's own skills, inside the same query
+        target_skill_ids = select(project_skills.c.skill_id).where(project_skills.c.project_id == project_id)
+        rows, total, status_counts = review_applications(
+            session, ProjectApplication, ProjectApplication.project_id, project_id, target_skill_ids, **arguments
+        )
         
         applications_data = []
-        for app in applications:
+        for app, skill_overlap in rows:
             applications_data.append({
                 "id": app.id,
                 "message": app.message,
                 "status": app.status,
                 "applied_at": app.applied_at.isoformat(),
+                "skill_overlap": skill_overlap,
                 "user": {
                     "id": app.user.id,
                     "username": app.user.username,
@@ -354,7 +381,14 @@ def get_project_applications(project_id):
                 }
             })
         
-        return jsonify(applications_data), 200
+        if arguments['per_page'] is None:
+            return jsonify(applications_data), 200
+        
+        return jsonify({
+            "applications": applications_data,
+            "status_counts": status_counts,
+            "pagination": review_pagination(total, arguments['page'], arguments['per_page'])
+        }), 200
         
     except Exception as e:
         logger.error(f"Failed to fetch applications: {str(e)}")
@@ -373,7 +407,7 @@ def update_application_status(application_id):
         if not user:
             return jsonify({"error": "User not found"}), 404
         
-        application = session.query(ProjectApplication).filter_by(id=application_id).first()
+        application = session.query(ProjectApplication).join(ProjectApplication.project).filter(ProjectApplication.id == application_id).first()
         if not application:
             return jsonify({"error": "Application not found"}), 404
         
@@ -387,7 +421,10 @@ def update_application_status(application_id):
         if new_status not in ['accepted', 'rejected']:
             return jsonify({"error": "Invalid status"}), 400
         
+        old_status = application.status
         application.status = new_status
+        adjust_project_counters(session, application.project_id, accepted=accepted_delta(old_status, new_status))
+        sync_team_membership(session, 'project', application.project, application.user_id, old_status, new_status)
         
         # Create notification for applicant
         notification = Notification(
@@ -446,7 +483,7 @@ def get_my_projects():
                 "updated_at": project.updated_at.isoformat(),
                 "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in project.skills],
                 "roles": [{"id": role.id, "name": role.name, "description": role.description, "category": role.category} for role in project.roles],
-                "application_count": len(project.applications)
+                "application_count": project.application_count
             })
         
         return jsonify(projects_data), 200
@@ -468,7 +505,7 @@ def get_my_applications():
         if not user:
             return jsonify({"error": "User not found"}), 404
         
-        applications = session.query(ProjectApplication).filter_by(user_id=user.id).order_by(ProjectApplication.applied_at.desc()).all()
+        applications = session.query(ProjectApplication).join(ProjectApplication.project).filter(ProjectApplication.user_id == user.id).order_by(ProjectApplication.applied_at.desc()).all()
         
         applications_data = []
         for app in applications:
@@ -513,13 +550,9 @@ def bookmark_project(project_id):
         if not project:
             return jsonify({"error": "Project not found"}), 404
         
-        # Check if already bookmarked
-        if project in user.bookmarked_projects:
+        if not add_bookmarks(session, user.id, [project.id]):
             return jsonify({"error": "Project already bookmarked"}), 400
         
-        user.bookmarked_projects.append(project)
-        session.commit()
-        
         return jsonify({"message": "Project bookmarked successfully"}), 201
         
     except Exception as e:
@@ -544,13 +577,9 @@ def remove_bookmark(project_id):
         if not project:
             return jsonify({"error": "Project not found"}), 404
         
-        # Check if bookmarked
-        if project not in user.bookmarked_projects:
+        if not remove_bookmarks(session, user.id, [project.id]):
             return jsonify({"error": "Project not bookmarked"}), 400
         
-        user.bookmarked_projects.remove(project)
-        session.commit()
-        
         return jsonify({"message": "Bookmark removed successfully"}), 200
         
     except Exception as e:
@@ -562,7 +591,9 @@ def remove_bookmark(project_id):
 
 @projects_bp.route('/bookmarks', methods=['GET'])
 @jwt_required()
+@query_budget(6)
 def get_bookmarked_projects():
+    """Newest bookmarks first; pass next_cursor back as cursor for the following page"""
     session = Session()
     try:
         current_user_id = get_jwt_identity()
@@ -571,8 +602,17 @@ def get_bookmarked_projects():
         if not user:
             return jsonify({"error": "User not found"}), 404
         
+        limit = min(max(request.args.get('limit', BOOKMARK_PAGE_SIZE, type=int), 1), MAX_BOOKMARK_PAGE_SIZE)
+        try:
+            rows, next_cursor = list_bookmarks(
+                session, user.id, request.args.get('cursor'), limit,
+                options=(joinedload(Project.owner), selectinload(Project.skills))
+            )
+        except BookmarkCursorError as e:
+            return jsonify({"error": str(e)}), 400
+        
         projects_data = []
-        for project in user.bookmarked_projects:
+        for project, bookmarked_at in rows:
             projects_data.append({
                 "id": project.id,
                 "name": project.name,
@@ -581,6 +621,7 @@ def get_bookmarked_projects():
                 "live_url": project.live_url,
                 "status": project.status,
                 "created_at": project.created_at.isoformat(),
+                "bookmarked_at": bookmarked_at.isoformat() if bookmarked_at else None,
                 "owner": {
                     "id": project.owner.id,
                     "username": project.owner.username,
@@ -588,10 +629,14 @@ def get_bookmarked_projects():
                     "avatar_url": project.owner.avatar_url
                 },
                 "skills": [{"id": skill.id, "name": skill.name, "category": skill.category} for skill in project.skills],
-                "application_count": len(project.applications)
+                "application_count": project.application_count,
+                "is_bookmarked": True
             })
         
-        return jsonify(projects_data), 200
+        return jsonify({
+            "projects": projects_data,
+            "next_cursor": next_cursor
+        }), 200
         
     except Exception as e:
         logger.error(f"Failed to fetch bookmarked projects: {str(e)}")
@@ -599,6 +644,47 @@ def get_bookmarked_projects():
     finally:
         session.close()
 
+@projects_bp.route('/bookmarks/bulk', methods=['POST'])
+@jwt_required()
+def bulk_update_bookmarks():
+    """Idempotent: {"bookmark": [ids], "unbookmark": [ids]}; ids already in the requested state are skipped"""
+    session = Session()
+    try:
+        current_user_id = get_jwt_identity()
+        user = session.query(User).filter_by(username=current_user_id).first()
+        
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        
+        data = request.get_json() or {}
+        to_add = data.get('bookmark', [])
+        to_remove = data.get('unbookmark', [])
+        
+        if not isinstance(to_add, list) or not isinstance(to_remove, list):
+            return jsonify({"error": "bookmark and unbookmark must be lists of project ids"}), 400
+        if not all(isinstance(project_id, int) for project_id in to_add + to_remove):
+            return jsonify({"error": "Project ids must be integers"}), 400
+        if len(to_add) + len(to_remove) > MAX_BULK_BOOKMARKS:
+            return jsonify({"error": f"At most {MAX_BULK_BOOKMARKS} project ids per request"}), 400
+        if set(to_add) & set(to_remove):
+            return jsonify({"error": "A project cannot be both bookmarked and unbookmarked"}), 400
+        
+        added = add_bookmarks(session, user.id, to_add)
+        removed = remove_bookmarks(session, user.id, to_remove)
+        
+        return jsonify({
+            "bookmarked": added,
+            "unbookmarked": removed,
+            "bookmark_ids": sorted(bookmarked_ids(user.id))
+        }), 200
+        
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to update bookmarks: {str(e)}")
+        return jsonify({"error": "Failed to update bookmarks"}), 500
+    finally:
+        session.close()
+
 @projects_bp.route('/<int:project_id>', methods=['PUT'])
 @jwt_required()
 def update_project(project_id):
@@ -650,13 +736,11 @@ def update_project(project_id):
         
         # Update skills
         if 'skill_ids' in data:
-            skills = session.query(Skill).filter(Skill.id.in_(data['skill_ids'])).all()
-            project.skills = skills
+            sync_skills(session, project, data['skill_ids'])
         
         # Update roles
         if 'role_ids' in data:
-            roles = session.query(Role).filter(Role.id.in_(data['role_ids'])).all()
-            project.roles = roles
+            sync_roles(session, project, data['role_ids'])
         
         project.updated_at = datetime.now(pytz.timezone('Asia/Kolkata'))
         session.commit()
@@ -696,7 +780,7 @@ def delete_project(project_id):
             return jsonify({"error": "Project not found or not owned by you"}), 404
         
         project_name = project.name
-        session.delete(project)
+        remove_project(session, project)
         session.commit()
         
         # Log activity
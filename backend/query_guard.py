@@ -0,0 +1,113 @@
+from flask import request, g, has_request_context
+from sqlalchemy import event
+import traceback
+import re
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# off, warn (log) or raise; unset means raise under app.testing, warn under app.debug, off otherwise
+QUERY_GUARD = os.getenv('QUERY_GUARD')
+# Same-shape statements in one request before it is reported as a likely N+1
+REPEAT_THRESHOLD = int(os.getenv('QUERY_GUARD_REPEAT_THRESHOLD', '5'))
+# Budget for endpoints that never declared one
+DEFAULT_BUDGET = int(os.getenv('QUERY_GUARD_DEFAULT_BUDGET', '50'))
+
+# endpoint -> max statements per request; filled by @query_budget, may also be set directly
+QUERY_BUDGETS = {}
+
+_APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s)\s*,)+\s*(?:\?|%\(\w+\)s)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+class QueryBudgetExceeded(Exception):
+    """An endpoint issued more statements than its declared budget"""
+
+def query_budget(max_queries):
+    """Declare how many statements one request to this view may issue (apply under the route decorator)"""
+    def decorator(fn):
+        # functools.wraps copies __dict__, so the attribute survives the decorators stacked above
+        fn._query_budget = max_queries
+        return fn
+    return decorator
+
+def statement_shape(statement):
+    """Statement text with literals and IN-list lengths erased, so repeated lookups compare equal"""
+    shape = _LITERALS.sub('?', statement)
+    shape = _PLACEHOLDER_LISTS.sub('(?...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+def _call_site():
+    # Innermost frame in our own code, skipping this module: usually the lazy attribute access in a loop
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(_APP_ROOT) and not frame.filename.endswith('query_guard.py'):
+            return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.line}"
+    return 'unknown'
+
+class QueryTrace:
+    __slots__ = ('count', 'shapes', 'call_sites')
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = {}
+        self.call_sites = {}
+
+    def record(self, statement):
+        self.count += 1
+        shape = statement_shape(statement)
+        seen = self.shapes.get(shape, 0) + 1
+        self.shapes[shape] = seen
+        if seen == REPEAT_THRESHOLD:
+            self.call_sites[shape] = _call_site()
+
+    def repeated(self):
+        return [(shape, count, self.call_sites.get(shape)) for shape, count in self.shapes.items()
+                if count >= REPEAT_THRESHOLD]
+
+def guard_mode(app):
+    if QUERY_GUARD:
+        return QUERY_GUARD
+    if app.testing:
+        return 'raise'
+    return 'warn' if app.debug else 'off'
+
+def endpoint_budget(app, endpoint):
+    if endpoint in QUERY_BUDGETS:
+        return QUERY_BUDGETS[endpoint]
+    view = app.view_functions.get(endpoint)
+    return getattr(view, '_query_budget', DEFAULT_BUDGET)
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        trace = g.get('query_trace')
+        if trace is not None:
+            trace.record(statement)
+
+def init_query_guard(app, engine):
+    """Flag repeated same-shape statements and enforce per-endpoint query budgets"""
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_query_trace():
+        if guard_mode(app) != 'off':
+            g.query_trace = QueryTrace()
+
+    @app.after_request
+    def check_query_trace(response):
+        trace = g.pop('query_trace', None)
+        if trace is None or request.url_rule is None:
+            return response
+
+        endpoint = request.url_rule.endpoint
+        for shape, count, call_site in trace.repeated():
+            logger.warning(f"Possible N+1 in {endpoint}: {count}x from {call_site}: {shape[:300]}")
+
+        budget = endpoint_budget(app, endpoint)
+        if trace.count > budget:
+            message = f"{endpoint} issued {trace.count} queries (budget {budget})"
+            if guard_mode(app) == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(f"Query budget exceeded: {message}")
+        return response
@@ -0,0 +1,171 @@
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity
+from collections import OrderedDict
+from functools import wraps
+import threading
+import time
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# event -> (burst capacity, tokens refilled per second); override with RATE_LIMIT_<EVENT>="capacity,rate"
+DEFAULT_LIMITS = {
+    'send_message': (20, 2.0),
+    'typing': (10, 2.0),
+    'search_users': (30, 1.0),
+    'username_available': (30, 2.0),
+}
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# memory (per process) or a redis:// URL shared by every process
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+# A client address stands for everyone behind the same NAT or campus proxy, so its bucket is this many times larger
+RATE_LIMIT_IP_FACTOR = float(os.getenv('RATE_LIMIT_IP_FACTOR', '20'))
+
+def _load_limits():
+    limits = {}
+    for event, default in DEFAULT_LIMITS.items():
+        raw = os.getenv(f"RATE_LIMIT_{event.upper()}")
+        if raw:
+            capacity, rate = raw.split(',')
+            limits[event] = (float(capacity), float(rate))
+        else:
+            limits[event] = (float(default[0]), float(default[1]))
+    return limits
+
+class MemoryBackend:
+    """Token buckets in a dict; idle buckets are dropped oldest-first so memory stays bounded"""
+
+    def __init__(self, idle_seconds=600):
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        # key -> [tokens, last refill time], least recently used first
+        self._buckets = OrderedDict()
+
+    def take(self, key, capacity, rate, cost=1.0):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [capacity, now]
+                self._buckets[key] = bucket
+            else:
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+
+            allowed = bucket[0] >= cost
+            if allowed:
+                bucket[0] -= cost
+
+            while self._buckets:
+                oldest_key, (_, seen) = next(iter(self._buckets.items()))
+                if now - seen < self.idle_seconds:
+                    break
+                del self._buckets[oldest_key]
+
+            return allowed, 0.0 if allowed else (cost - bucket[0]) / rate
+
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisBackend:
+    """Buckets shared by every process; one atomic script call per check"""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key, capacity, rate, cost=1.0):
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[capacity, rate, time.time(), cost])
+        allowed = bool(int(allowed))
+        return allowed, 0.0 if allowed else (cost - float(tokens)) / rate
+
+def create_backend(spec=RATE_LIMIT_BACKEND):
+    if spec.startswith('redis://') or spec.startswith('rediss://'):
+        return RedisBackend(spec)
+    return MemoryBackend()
+
+class RateLimiter:
+    """Per-connection, per-user and (much larger) per-address token buckets for each limited event"""
+
+    def __init__(self, backend=None, limits=None, enabled=RATE_LIMIT_ENABLED, ip_factor=RATE_LIMIT_IP_FACTOR):
+        self.backend = backend or create_backend()
+        self.limits = limits or _load_limits()
+        self.enabled = enabled
+        self.ip_factor = ip_factor
+        self._stats_lock = threading.Lock()
+        self.stats = {event: {'allowed': 0, 'limited': 0} for event in self.limits}
+
+    def check(self, event, user_id=None, connection_id=None, ip=None, cost=1.0):
+        """Returns (allowed, retry_after_seconds); every given scope must have a token
+
+        connection_id is a socket sid, never a client address: addresses go in ip, whose
+        bucket is ip_factor times larger because many users can share one.
+        """
+        limit = self.limits.get(event)
+        if not self.enabled or limit is None:
+            return True, 0.0
+
+        capacity, rate = limit
+        allowed, retry_after = True, 0.0
+        try:
+            for scope, identity, factor in (('conn', connection_id, 1), ('user', user_id, 1), ('ip', ip, self.ip_factor)):
+                if identity is None:
+                    continue
+                ok, wait = self.backend.take(f"{event}:{scope}:{identity}", capacity * factor, rate * factor, cost)
+                if not ok:
+                    allowed, retry_after = False, max(retry_after, wait)
+                    break
+        except Exception as e:
+            # A broken shared backend must not take chat down with it
+            logger.error(f"Rate limit backend failed, allowing {event}: {type(e).__name__}: {str(e)}")
+            return True, 0.0
+
+        with self._stats_lock:
+            self.stats[event]['allowed' if allowed else 'limited'] += 1
+        return allowed, retry_after
+
+    def snapshot(self):
+        with self._stats_lock:
+            return {
+                event: dict(counts, capacity=self.limits[event][0], per_second=self.limits[event][1])
+                for event, counts in self.stats.items()
+            }
+
+limiter = RateLimiter()
+
+def rate_limited(event):
+    """Endpoint decorator (inside jwt_required): 429 with Retry-After once the caller's bucket is empty
+
+    Keyed on the token's identity only, so users sharing an address are limited separately.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            allowed, retry_after = limiter.check(event, user_id=get_jwt_identity())
+            if not allowed:
+                response = jsonify({"error": "Too many requests", "retry_after": round(retry_after, 2)})
+                response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+                return response, 429
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,122 @@
+from sqlalchemy import func, and_, insert, select
+import logging
+from database import SessionFactory, Message, Notification, MessageReadMark, NotificationReadMark, UPSERT_DIALECTS
+
+logger = logging.getLogger(__name__)
+
+def advance_watermark(session, model, keys, column, value):
+    """Single-row upsert that only ever moves a watermark forward; returns True when it moved"""
+    values = dict(keys, **{column.key: value})
+    dialect_insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(model).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column.key: statement.excluded[column.key]},
+            where=column < statement.excluded[column.key]
+        )
+        return session.execute(statement).rowcount > 0
+
+    updated = session.query(model).filter_by(**keys).filter(column < value).update({column: value}, synchronize_session=False)
+    if updated:
+        return True
+    if session.query(model).filter_by(**keys).first():
+        return False
+    session.add(model(**values))
+    session.flush()
+    return True
+
+# Direct messages
+
+def pair_watermarks(session, user_id, other_user_id):
+    """{(reader_id, sender_id): last_read_message_id} for both directions of a conversation"""
+    rows = session.query(MessageReadMark).filter(
+        MessageReadMark.reader_id.in_([user_id, other_user_id]),
+        MessageReadMark.sender_id.in_([user_id, other_user_id])
+    ).all()
+    return {(mark.reader_id, mark.sender_id): mark.last_read_message_id for mark in rows}
+
+def message_is_read(message, watermarks):
+    return message.id <= watermarks.get((message.receiver_id, message.sender_id), 0)
+
+def mark_messages_read(session, reader_id, sender_id):
+    """Mark everything sender_id sent to reader_id as read; returns the new watermark, or None if unchanged"""
+    latest = session.query(func.max(Message.id)).filter(
+        Message.sender_id == sender_id,
+        Message.receiver_id == reader_id
+    ).scalar()
+    if not latest:
+        return None
+    keys = {'reader_id': reader_id, 'sender_id': sender_id}
+    if advance_watermark(session, MessageReadMark, keys, MessageReadMark.last_read_message_id, latest):
+        return latest
+    return None
+
+def _unread_messages(session, user_id):
+    return session.query(Message).outerjoin(MessageReadMark, and_(
+        MessageReadMark.reader_id == Message.receiver_id,
+        MessageReadMark.sender_id == Message.sender_id
+    )).filter(
+        Message.receiver_id == user_id,
+        Message.id > func.coalesce(MessageReadMark.last_read_message_id, 0)
+    )
+
+def unread_message_counts(session, user_id):
+    """{sender_id: unread count} in one grouped range count"""
+    return dict(_unread_messages(session, user_id).with_entities(
+        Message.sender_id, func.count(Message.id)
+    ).group_by(Message.sender_id).all())
+
+def unread_message_total(session, user_id):
+    return _unread_messages(session, user_id).with_entities(func.count(Message.id)).scalar() or 0
+
+# Notifications
+
+def notification_watermark(session, user_id):
+    return session.query(NotificationReadMark.last_read_notification_id).filter_by(user_id=user_id).scalar() or 0
+
+def mark_notifications_read(session, user_id, up_to_id=None):
+    """Advance the user's notification watermark to up_to_id (default: their newest notification)"""
+    latest = session.query(func.max(Notification.id)).filter(Notification.user_id == user_id).scalar()
+    if not latest:
+        return None
+    target = min(up_to_id, latest) if up_to_id else latest
+    keys = {'user_id': user_id}
+    if advance_watermark(session, NotificationReadMark, keys, NotificationReadMark.last_read_notification_id, target):
+        return target
+    return None
+
+def unread_notification_count(session, user_id, watermark=None):
+    if watermark is None:
+        watermark = notification_watermark(session, user_id)
+    return session.query(func.count(Notification.id)).filter(
+        Notification.user_id == user_id,
+        Notification.id > watermark
+    ).scalar() or 0
+
+def migrate_read_flags():
+    """Derive watermarks from the old is_read flags: each one is the newest id that was flagged read.
+
+    Older messages that were still unflagged below that id count as read from now on.
+    """
+    session = SessionFactory()
+    try:
+        session.execute(insert(MessageReadMark).from_select(
+            ['reader_id', 'sender_id', 'last_read_message_id'],
+            select(Message.receiver_id, Message.sender_id, func.max(Message.id)).where(
+                Message.is_read == True
+            ).group_by(Message.receiver_id, Message.sender_id)
+        ))
+        session.execute(insert(NotificationReadMark).from_select(
+            ['user_id', 'last_read_notification_id'],
+            select(Notification.user_id, func.max(Notification.id)).where(
+                Notification.is_read == True
+            ).group_by(Notification.user_id)
+        ))
+        session.commit()
+        logger.info("Derived read watermarks from message and notification flags")
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
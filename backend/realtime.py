@@ -0,0 +1,69 @@
+from flask_socketio import SocketIO
+import socketio as socketio_lib
+import threading
+import pickle
+import queue
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# threading for local development; eventlet or gevent for production workers
+ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+# redis://host:6379/0, kafka://..., zmq+tcp://... or local:// (in-process, for tests)
+MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'flask-socketio')
+
+class LocalBroker:
+    """In-process stand-in for Redis pub/sub, shared by every server in one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def subscribe(self, channel):
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscriber)
+        return subscriber
+
+local_broker = LocalBroker()
+
+class LocalManager(socketio_lib.PubSubManager):
+    """Client manager that fans out through LocalBroker instead of an external queue"""
+    name = 'local'
+
+    def __init__(self, url='local://', channel=CHANNEL, write_only=False, logger=None, broker=None):
+        self.broker = broker or local_broker
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _publish(self, data):
+        self.broker.publish(self.channel, pickle.dumps(data))
+
+    def _listen(self):
+        subscriber = self.broker.subscribe(self.channel)
+        while True:
+            yield subscriber.get()
+
+def create_socketio(app, async_mode=ASYNC_MODE, message_queue=MESSAGE_QUEUE):
+    """Build the app's SocketIO server for the configured worker model and backplane"""
+    options = {
+        'cors_allowed_origins': "*",
+        'async_mode': async_mode
+    }
+
+    if message_queue and message_queue.startswith('local://'):
+        options['client_manager'] = LocalManager(message_queue)
+    elif message_queue:
+        # Rooms and emits are shared with every process on the same queue
+        options['message_queue'] = message_queue
+        options['channel'] = CHANNEL
+
+    logger.info(f"Socket.IO async mode: {async_mode}, message queue: {message_queue or 'none'}")
+    return SocketIO(app, **options)
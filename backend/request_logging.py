@@ -0,0 +1,141 @@
+from flask import request, g
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import logging
+import atexit
+import random
+import queue
+import json
+import time
+import sys
+import os
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+# text for humans, json for log shippers
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+# Records waiting for the writer thread; beyond this they are dropped rather than blocking requests
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Fraction of JSON request bodies written to the log (0 disables, 1 logs every body)
+LOG_BODY_SAMPLE_RATE = float(os.getenv('LOG_BODY_SAMPLE_RATE', '0.01'))
+LOG_BODY_MAX_CHARS = int(os.getenv('LOG_BODY_MAX_CHARS', '2000'))
+
+# Any key containing one of these is redacted, at any depth of the body or query string
+SENSITIVE_KEYS = ('password', 'token', 'secret', 'authorization', 'api_key', 'apikey', 'credential', 'oauth_code')
+REDACTED = '[REDACTED]'
+
+_listener = None
+
+def is_sensitive(key):
+    key = str(key).lower()
+    return any(marker in key for marker in SENSITIVE_KEYS)
+
+def redact(value):
+    """Copy of a JSON-like value with every sensitive field replaced"""
+    if isinstance(value, dict):
+        return {key: REDACTED if is_sensitive(key) else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+class StructuredFormatter(logging.Formatter):
+    """Plain text with key=value fields appended, or one JSON object per line"""
+
+    def __init__(self, as_json=False):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        self.as_json = as_json
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None)
+        if not self.as_json:
+            line = super().format(record)
+            if fields:
+                line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+            return line
+
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: when the writer falls behind, records are counted and dropped"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def configure_logging():
+    """Route every logger through a queue; file rotation and stdout writes happen on the listener thread"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = StructuredFormatter(as_json=LOG_FORMAT == 'json')
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued on interpreter exit
+    atexit.register(shutdown_logging)
+    return _listener
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def init_request_logging(app):
+    """One access-log line per request with its latency; request bodies only for a sample"""
+    access_logger = logging.getLogger('access')
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        if LOG_BODY_SAMPLE_RATE > 0 and request.is_json and random.random() < LOG_BODY_SAMPLE_RATE:
+            body = request.get_json(silent=True)
+            if body is not None:
+                text = json.dumps(redact(body), default=str)[:LOG_BODY_MAX_CHARS]
+                access_logger.info(f"Request Body: {request.method} {request.path} {text}")
+
+    @app.after_request
+    def log_request(response):
+        started = g.pop('request_started', None)
+        latency_ms = round((time.perf_counter() - started) * 1000, 2) if started is not None else None
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'latency_ms': latency_ms,
+            'remote_addr': request.remote_addr,
+        }
+        if request.args:
+            fields['query'] = json.dumps(redact(request.args.to_dict()))
+        access_logger.info(f"{request.method} {request.path} {response.status_code}", extra={'fields': fields})
+        return response
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The app configures itself from the environment at import time, so this runs first
+_workdir = tempfile.mkdtemp(prefix='assemble-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ['MESSAGE_JOURNAL_DIR'] = os.path.join(_workdir, 'message_journal')
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ['MESSAGE_ARCHIVE'] = 'false'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+# Background jobs are driven by the tests themselves
+os.environ['ROLLUP_INTERVAL_SECONDS'] = '3600'
+# Unset means raise under app.testing, which is what these tests rely on
+os.environ.pop('QUERY_GUARD', None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    flask_app.testing = True
+    return flask_app
+
+@pytest.fixture(scope='session')
+def client(app):
+    return app.test_client()
+
+@pytest.fixture(scope='session')
+def register(client):
+    """Create a user through the API; returns (auth headers, user id)"""
+    def register(username):
+        response = client.post('/api/auth/register', json={
+            'username': username,
+            'email': f"{username}@vitstudent.ac.in",
+            'password': 'secret1'
+        })
+        assert response.status_code == 201, response.get_json()
+        data = response.get_json()
+        return {'Authorization': f"Bearer {data['access_token']}"}, data['user']['id']
+    return register
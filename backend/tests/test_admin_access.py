@@ -0,0 +1,60 @@
+from datetime import datetime
+from flask_jwt_extended import decode_token
+from database import SessionFactory, User, Project, HackathonPost, IST
+from token_state import RevocationRegistry
+
+def set_admin(user_id, is_admin):
+    session = SessionFactory()
+    try:
+        session.get(User, user_id).is_admin = is_admin
+        session.commit()
+    finally:
+        session.close()
+
+def test_admin_rights_follow_the_database_not_the_token(client, register):
+    headers, user_id = register('demoted_admin')
+    set_admin(user_id, True)
+    assert client.get('/api/admin/stats', headers=headers).status_code == 200
+
+    set_admin(user_id, False)
+    assert client.get('/api/admin/stats', headers=headers).status_code == 403
+
+def test_user_list_counts_owned_projects_and_posts(client, register):
+    headers, user_id = register('counted_admin')
+    set_admin(user_id, True)
+    _, owner_id = register('counted_owner')
+    session = SessionFactory()
+    try:
+        session.add_all([Project(name=f"Counted {n}", owner_id=owner_id) for n in range(3)])
+        session.add(Project(name='Counted gone', owner_id=owner_id, deleted_at=datetime.now(IST)))
+        session.add(HackathonPost(title='Counted hackathon', hackathon_name='Counted', owner_id=owner_id))
+        session.commit()
+    finally:
+        session.close()
+
+    users = {user['id']: user for user in client.get('/api/admin/users', headers=headers).get_json()}
+    assert users[owner_id]['project_count'] == 3
+    assert users[owner_id]['hackathon_count'] == 1
+    assert users[user_id]['project_count'] == 0
+
+def test_logout_revokes_the_token_across_restarts(app, client, register):
+    headers, _ = register('logged_out_user')
+    assert client.get('/api/auth/me', headers=headers).status_code == 200
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/auth/me', headers=headers).status_code == 401
+
+    # A fresh process rebuilds the revocation from the stored row
+    restarted = RevocationRegistry()
+    restarted.load()
+    token = headers['Authorization'].split()[1]
+    with app.app_context():
+        assert restarted.is_revoked(decode_token(token, allow_expired=True))
+
+def test_deactivated_user_is_locked_out_at_once(client, register):
+    admin_headers, admin_id = register('deactivating_admin')
+    set_admin(admin_id, True)
+    headers, user_id = register('deactivated_user')
+    assert client.get('/api/auth/me', headers=headers).status_code == 200
+
+    assert client.put(f"/api/admin/users/{user_id}/toggle-active", headers=admin_headers).status_code == 200
+    assert client.get('/api/auth/me', headers=headers).status_code == 401
@@ -0,0 +1,41 @@
+from bookmarks import BookmarkCache
+
+class RacingCache(BookmarkCache):
+    """Invalidates the user while the load is in flight, as a concurrent bookmark write would"""
+
+    def _load(self, user_id):
+        self.invalidate([user_id])
+        return frozenset({1})
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = RacingCache()
+    assert cache.ids(7) == frozenset({1})
+    assert 7 not in cache._sets
+
+def test_load_is_cached():
+    cache = BookmarkCache()
+    cache._load = lambda user_id: frozenset({1})
+    cache.ids(7)
+    cache.ids(7)
+    assert cache.stats == {'hits': 1, 'loads': 1}
+
+def test_bookmarks_are_idempotent_and_counted_once(client, register):
+    from database import SessionFactory, Project
+    from bookmarks import add_bookmarks, remove_bookmarks
+
+    headers, user_id = register('bookmark_counter')
+    project_id = client.post('/api/projects', headers=headers, json={'name': 'Counted'}).get_json()['project_id']
+
+    session = SessionFactory()
+    try:
+        assert add_bookmarks(session, user_id, [project_id, 999999]) == [project_id]
+        # A second add of the same row, as a racing request would issue, inserts nothing
+        assert add_bookmarks(session, user_id, [project_id]) == []
+        assert session.get(Project, project_id).bookmark_count == 1
+
+        assert remove_bookmarks(session, user_id, [project_id]) == [project_id]
+        assert remove_bookmarks(session, user_id, [project_id]) == []
+        session.expire_all()
+        assert session.get(Project, project_id).bookmark_count == 0
+    finally:
+        session.close()
@@ -0,0 +1,30 @@
+import bulk_import
+from database import SessionFactory, Project
+from bulk_import import import_records, parse_records
+
+def test_failed_batch_is_retried_row_by_row(register, monkeypatch):
+    _, owner_id = register('import_owner')
+    insert_batch = bulk_import._insert_batch
+
+    def failing_insert(session, importer, batch):
+        if any(row['name'] == 'Poison' for _, row, _, _ in batch):
+            raise RuntimeError('constraint failed')
+        return insert_batch(session, importer, batch)
+
+    monkeypatch.setattr(bulk_import, '_insert_batch', failing_insert)
+    raw = '\n'.join([
+        '{"name": "Imported one"}',
+        '{"name": "Poison"}',
+        'not json',
+        '{"name": "Imported two"}',
+    ])
+    result = import_records('projects', parse_records(raw, 'ndjson'), owner_id)
+
+    assert result['created'] == 2
+    assert [error['row'] for error in result['errors']] == [2, 3]
+    session = SessionFactory()
+    try:
+        names = {name for name, in session.query(Project.name).filter(Project.id.in_(result['created_ids']))}
+    finally:
+        session.close()
+    assert names == {'Imported one', 'Imported two'}
@@ -0,0 +1,27 @@
+import catalog
+from database import SessionFactory, Skill
+
+def test_skill_added_at_runtime_is_accepted_without_restart(monkeypatch):
+    monkeypatch.setattr(catalog, 'CATALOG_RELOAD_SECONDS', 0)
+    catalog.valid_skill_ids([1])
+
+    session = SessionFactory()
+    try:
+        skill = Skill(name='Runtime Skill', category='Other')
+        session.add(skill)
+        session.commit()
+        skill_id = skill.id
+    finally:
+        session.close()
+
+    assert catalog.valid_skill_ids([skill_id, 1, 'x', skill_id]) == [skill_id, 1]
+    assert catalog.resolve_skill_names(['runtime skill', 'Nope']) == ([skill_id], ['Nope'])
+
+def test_misses_reload_at_most_once_per_interval(monkeypatch):
+    catalog.valid_skill_ids([1])
+    loads = []
+    monkeypatch.setattr(catalog, '_load', lambda: loads.append(1) or catalog._snapshot)
+    monkeypatch.setattr(catalog, 'CATALOG_RELOAD_SECONDS', 3600)
+    catalog.valid_skill_ids([999999])
+    catalog.valid_skill_ids([999998])
+    assert loads == []
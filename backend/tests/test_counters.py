@@ -0,0 +1,22 @@
+from database import SessionFactory, Project, ProjectApplication
+from counters import reconcile_counters
+
+def test_reconcile_reports_and_repairs_drift(register):
+    _, owner_id = register('drift_owner')
+    _, applicant_id = register('drift_applicant')
+    session = SessionFactory()
+    try:
+        project = Project(name='Drifted', owner_id=owner_id, application_count=5, bookmark_count=2)
+        session.add(project)
+        session.flush()
+        session.add(ProjectApplication(project_id=project.id, user_id=applicant_id, status='accepted'))
+        session.commit()
+        project_id = project.id
+    finally:
+        session.close()
+
+    drift = {(row['column'], row['stored'], row['actual']) for row in reconcile_counters() if row['id'] == project_id and row['table'] == 'projects'}
+    assert drift == {('application_count', 5, 1), ('accepted_count', 0, 1), ('bookmark_count', 2, 0)}
+
+    reconcile_counters(repair=True)
+    assert not [row for row in reconcile_counters() if row['id'] == project_id and row['table'] == 'projects']
@@ -0,0 +1,24 @@
+from dashboard import dashboard_cache
+
+def test_editing_a_project_drops_its_applicants_dashboards(client, register):
+    owner, _ = register('dash_owner')
+    applicant, applicant_id = register('dash_applicant')
+    project_id = client.post('/api/projects', headers=owner, json={'name': 'Dash'}).get_json()['project_id']
+    assert client.post(f"/api/projects/{project_id}/applications", headers=applicant,
+                       json={'message': 'hi'}).status_code == 201
+
+    assert client.get('/api/dashboard/summary', headers=applicant).status_code == 200
+    assert applicant_id in dashboard_cache._entries
+
+    assert client.put(f"/api/projects/{project_id}", headers=owner, json={'name': 'Dash 2'}).status_code == 200
+    assert applicant_id not in dashboard_cache._entries
+
+def test_summary_timestamps_carry_the_ist_offset(client, register):
+    owner, _ = register('dash_tz')
+    project_id = client.post('/api/projects', headers=owner, json={'name': 'Tz'}).get_json()['project_id']
+    client.post(f"/api/projects/{project_id}/bookmarks", headers=owner)
+
+    body = client.get('/api/dashboard/summary', headers=owner).get_json()
+    stamps = [item['created_at'] for item in body['projects']['items']]
+    stamps += [item['bookmarked_at'] for item in body['bookmarks']['items']]
+    assert stamps and all(stamp.endswith('+05:30') for stamp in stamps)
@@ -0,0 +1,38 @@
+from database import SessionFactory, Conversation
+from group_chat import add_member
+
+def token(headers):
+    return headers['Authorization'].split(' ', 1)[1]
+
+def test_accepted_member_socket_joins_the_group_room(app, client, register):
+    from app import socketio
+    owner, _ = register('group_owner')
+    member, member_id = register('group_member')
+    project_id = client.post('/api/projects', headers=owner, json={'name': 'Group'}).get_json()['project_id']
+    assert client.post(f"/api/projects/{project_id}/applications", headers=member,
+                       json={'message': 'hi'}).status_code == 201
+    application_id = client.get(f"/api/projects/{project_id}/applications", headers=owner).get_json()[0]['id']
+
+    owner_socket = socketio.test_client(app, auth={'token': token(owner)})
+    member_socket = socketio.test_client(app, auth={'token': token(member)})
+    try:
+        assert client.put(f"/api/projects/applications/{application_id}/status", headers=owner,
+                          json={'status': 'accepted'}).status_code == 200
+
+        session = SessionFactory()
+        try:
+            conversation_id = session.query(Conversation.id).filter_by(project_id=project_id).scalar()
+            # Accepting the same user again, as a racing request would, adds nothing and does not fail
+            assert add_member(session, conversation_id, member_id) is False
+            session.commit()
+        finally:
+            session.close()
+
+        member_socket.get_received()
+        # No join_group from the client: the accept alone put its socket in the room
+        owner_socket.emit('send_group_message', {'conversation_id': conversation_id, 'content': 'welcome'})
+        received = member_socket.get_received()
+        assert [event['args'][0]['content'] for event in received if event['name'] == 'group_message'] == ['welcome']
+    finally:
+        owner_socket.disconnect()
+        member_socket.disconnect()
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+import pytest
+from database import SessionFactory, Message, MessageReadMark, IST
+from message_archive import archive_messages, load_history
+from read_state import unread_message_total
+
+@pytest.fixture(scope='module')
+def conversation(register):
+    """Ten old messages from a to b, the first six read by b, then one recent reply"""
+    a_headers, a = register('archive_a')
+    _, b = register('archive_b')
+    old = datetime.now(IST) - timedelta(days=200)
+    session = SessionFactory()
+    try:
+        ids = []
+        for i in range(10):
+            message = Message(sender_id=a, receiver_id=b, content=f"old {i}", created_at=old + timedelta(minutes=i))
+            session.add(message)
+            session.flush()
+            ids.append(message.id)
+        reply = Message(sender_id=b, receiver_id=a, content='new', created_at=datetime.now(IST))
+        session.add(reply)
+        session.add(MessageReadMark(reader_id=b, sender_id=a, last_read_message_id=ids[5]))
+        session.commit()
+        ids.append(reply.id)
+    finally:
+        session.close()
+
+    archived = archive_messages()
+    return {'a': a, 'b': b, 'a_headers': a_headers, 'ids': ids, 'archived': archived}
+
+def hot_ids(a, b):
+    session = SessionFactory()
+    try:
+        return sorted(message_id for (message_id,) in session.query(Message.id).filter(
+            Message.sender_id.in_([a, b]), Message.receiver_id.in_([a, b])))
+    finally:
+        session.close()
+
+def test_only_read_messages_are_archived(conversation):
+    ids = conversation['ids']
+    assert conversation['archived'] == 6
+    assert hot_ids(conversation['a'], conversation['b']) == ids[6:]
+
+    session = SessionFactory()
+    try:
+        assert unread_message_total(session, conversation['b']) == 4
+    finally:
+        session.close()
+
+@pytest.mark.parametrize('limit', [1, 3, 4, 11])
+def test_history_pages_across_tiers_in_order(conversation, limit):
+    session = SessionFactory()
+    try:
+        newest_first, before_id = [], None
+        while True:
+            rows = load_history(session, conversation['a'], conversation['b'], before_id=before_id, limit=limit)
+            newest_first.extend(row.id for row in rows[:limit])
+            if len(rows) <= limit:
+                break
+            before_id = rows[limit - 1].id
+        assert newest_first == conversation['ids'][::-1]
+
+        oldest_first = [row.id for row in load_history(
+            session, conversation['a'], conversation['b'], after_id=conversation['ids'][2], limit=20)]
+        assert oldest_first == conversation['ids'][3:]
+    finally:
+        session.close()
+
+def test_page_endpoint_reaches_the_archives(client, conversation):
+    seen, page = [], 1
+    while True:
+        body = client.get(f"/api/chat/messages/{conversation['b']}?per_page=4&page={page}",
+                          headers=conversation['a_headers']).get_json()
+        assert 'total' not in body['pagination']
+        seen = [message['id'] for message in body['messages']] + seen
+        if not body['pagination']['has_more']:
+            break
+        page += 1
+    assert seen == conversation['ids']
+
+    body = client.get(f"/api/chat/messages/{conversation['b']}?include_total=true",
+                      headers=conversation['a_headers']).get_json()
+    assert body['pagination']['total'] == len(conversation['ids'])
@@ -0,0 +1,71 @@
+import threading
+from database import SessionFactory, Message
+from message_pipeline import MessagePipeline, new_message_row, _journal_line
+
+def stored_keys(keys):
+    session = SessionFactory()
+    try:
+        return {key for key, in session.query(Message.write_key).filter(Message.write_key.in_(keys))}
+    finally:
+        session.close()
+
+def test_stats_count_every_message_submitted_from_many_threads(app, register, tmp_path):
+    _, sender_id = register('pipeline_sender')
+    _, receiver_id = register('pipeline_receiver')
+    pipeline = MessagePipeline(journal_dir=str(tmp_path), flush_interval_ms=1)
+    pipeline.start()
+
+    def submit_many():
+        for _ in range(50):
+            pipeline.submit(new_message_row(sender_id, receiver_id, 'hello'))
+
+    threads = [threading.Thread(target=submit_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pipeline.stop()
+
+    assert pipeline.stats['enqueued'] == 400
+    assert pipeline.stats['persisted'] == 400
+
+def write_journal(path, rows, torn=False):
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write(''.join(_journal_line(row) for row in rows))
+        if torn:
+            handle.write('{"write_key": "torn')
+
+def test_replay_stores_orphaned_journal_rows_once(app, register, tmp_path):
+    _, sender_id = register('replay_sender')
+    _, receiver_id = register('replay_receiver')
+    rows = [new_message_row(sender_id, receiver_id, f"unflushed {n}") for n in range(3)]
+    orphan = tmp_path / 'journal-1-dead.ndjson'
+    # The process died mid-write, leaving a torn final line
+    write_journal(orphan, rows, torn=True)
+
+    pipeline = MessagePipeline(journal_dir=str(tmp_path))
+    assert pipeline.replay_journals() == 3
+    assert not orphan.exists()
+    assert stored_keys([row['write_key'] for row in rows]) == {row['write_key'] for row in rows}
+
+    # A journal replayed again (say by a process racing this one) stores nothing twice
+    write_journal(orphan, rows)
+    assert pipeline.replay_journals() == 0
+
+def test_replay_sets_aside_rows_that_cannot_be_stored(app, register, tmp_path):
+    _, sender_id = register('dead_letter_sender')
+    _, receiver_id = register('dead_letter_receiver')
+    good = new_message_row(sender_id, receiver_id, 'fine')
+    bad = new_message_row(sender_id, receiver_id, None)
+    write_journal(tmp_path / 'journal-2-dead.ndjson', [good, bad])
+
+    pipeline = MessagePipeline(journal_dir=str(tmp_path))
+    assert pipeline.replay_journals() == 1
+    assert stored_keys([good['write_key'], bad['write_key']]) == {good['write_key']}
+    assert pipeline.stats['dead_lettered'] == 1
+    assert pipeline._dead_letter_keys() == {bad['write_key']}
+
+    # A dead-lettered row stays set aside when a later journal still holds it
+    write_journal(tmp_path / 'journal-3-dead.ndjson', [bad])
+    assert pipeline.replay_journals() == 0
+    assert pipeline.stats['dead_lettered'] == 1
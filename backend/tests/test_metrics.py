@@ -0,0 +1,26 @@
+from database import SessionFactory, User
+
+def test_metrics_need_an_admin_without_a_scrape_token(client, register):
+    headers, user_id = register('metrics_reader')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers=headers).status_code == 403
+
+    session = SessionFactory()
+    try:
+        session.get(User, user_id).is_admin = True
+        session.commit()
+    finally:
+        session.close()
+    assert client.get('/metrics', headers=headers).status_code == 200
+
+def test_socket_handlers_are_timed(app, client, register):
+    from app import socketio
+    headers, _ = register('metrics_socket')
+    socket = socketio.test_client(app, auth={'token': headers['Authorization'].split(' ', 1)[1]})
+    assert socket.is_connected()
+    socket.emit('heartbeat')
+    socket.disconnect()
+
+    from metrics import socket_events
+    assert socket_events._values.get(('heartbeat', 'ok'), 0) >= 1
+    assert socket_events._values.get(('connect', 'ok'), 0) >= 1
@@ -0,0 +1,106 @@
+"""Budgeted endpoints stay within their @query_budget with enough rows that an N+1 would show
+
+Under app.testing the query guard raises QueryBudgetExceeded from after_request, so an
+endpoint that goes over its budget fails the request that exercised it.
+"""
+import pytest
+import query_guard
+from dashboard import dashboard_cache
+from bookmarks import bookmark_cache
+
+ROWS = 12
+
+@pytest.fixture(scope='module')
+def data(client, register):
+    owner, owner_id = register('budget_owner')
+    skill_ids = [skill['id'] for skill in client.get('/api/auth/skills', headers=owner).get_json()][:4]
+    role_ids = [role['id'] for role in client.get('/api/auth/roles', headers=owner).get_json()][:2]
+
+    project_ids, hackathon_ids = [], []
+    for i in range(ROWS):
+        response = client.post('/api/projects', headers=owner, json={
+            'name': f"Budget project {i}", 'skill_ids': skill_ids, 'role_ids': role_ids})
+        project_ids.append(response.get_json()['project_id'])
+        response = client.post('/api/hackathons', headers=owner, json={
+            'title': f"Budget team {i}", 'hackathon_name': 'Budget hack', 'skill_ids': skill_ids, 'role_ids': role_ids})
+        hackathon_ids.append(response.get_json()['hackathon_id'])
+
+    applicants = []
+    for i in range(ROWS):
+        headers, user_id = register(f"budget_applicant_{i}")
+        client.put('/api/auth/me', headers=headers, json={'skill_ids': skill_ids[:i % 4], 'role_ids': role_ids})
+        assert client.post(f"/api/projects/{project_ids[0]}/applications", headers=headers,
+                           json={'message': 'hi'}).status_code == 201
+        assert client.post(f"/api/hackathons/{hackathon_ids[0]}/applications", headers=headers,
+                           json={'message': 'hi'}).status_code == 201
+        applicants.append((headers, user_id))
+
+    member = applicants[0][0]
+    for project_id in project_ids:
+        assert client.post(f"/api/projects/{project_id}/bookmarks", headers=member).status_code == 201
+    for project_id in project_ids[1:]:
+        client.post(f"/api/projects/{project_id}/applications", headers=member, json={'message': 'hi'})
+
+    return {
+        'owner': owner,
+        'owner_id': owner_id,
+        'member': member,
+        'member_id': applicants[0][1],
+        'project_id': project_ids[0],
+        'hackathon_id': hackathon_ids[0],
+    }
+
+@pytest.fixture(autouse=True)
+def cold_caches():
+    # A cached response issues no queries and would hide a regression
+    dashboard_cache._entries.clear()
+    bookmark_cache._sets.clear()
+
+def assert_ok(response):
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_guard_raises_in_tests(app):
+    assert query_guard.guard_mode(app) == 'raise'
+
+def test_project_list(client, data):
+    body = assert_ok(client.get(f"/api/projects?per_page={ROWS}", headers=data['member']))
+    assert len(body['projects']) == ROWS
+
+def test_hackathon_list(client, data):
+    body = assert_ok(client.get(f"/api/hackathons?per_page={ROWS}", headers=data['member']))
+    assert len(body['hackathons']) == ROWS
+
+def test_project_applications(client, data):
+    body = assert_ok(client.get(f"/api/projects/{data['project_id']}/applications?sort=skill_overlap",
+                                headers=data['owner']))
+    assert len(body) == ROWS
+    body = assert_ok(client.get(f"/api/projects/{data['project_id']}/applications?paginate=true&per_page=5",
+                                headers=data['owner']))
+    assert len(body['applications']) == 5
+    assert body['pagination']['total'] == ROWS
+
+def test_hackathon_applications(client, data):
+    body = assert_ok(client.get(f"/api/hackathons/{data['hackathon_id']}/applications", headers=data['owner']))
+    assert len(body) == ROWS
+    body = assert_ok(client.get(f"/api/hackathons/{data['hackathon_id']}/applications?paginate=true",
+                                headers=data['owner']))
+    assert body['status_counts']['pending'] == ROWS
+
+@pytest.mark.parametrize('viewer', ['owner', 'member'])
+def test_dashboard_summary(client, data, viewer):
+    assert_ok(client.get('/api/dashboard/summary?per_page=50', headers=data[viewer]))
+
+def test_bookmark_list(client, data):
+    body = assert_ok(client.get('/api/projects/bookmarks?limit=50', headers=data['member']))
+    assert len(body['projects']) == ROWS
+
+@pytest.mark.parametrize('viewer', ['owner', 'member'])
+def test_profile_overview(client, data, viewer):
+    body = assert_ok(client.get(f"/api/auth/users/{data['member_id']}/overview", headers=data[viewer]))
+    assert len(body['profile']['roles']) == 2
+
+def test_exceeding_a_budget_fails_the_request(client, data, monkeypatch):
+    monkeypatch.setitem(query_guard.QUERY_BUDGETS, 'projects.get_projects', 1)
+    with pytest.raises(query_guard.QueryBudgetExceeded):
+        client.get('/api/projects', headers=data['member'])
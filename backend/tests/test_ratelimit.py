@@ -0,0 +1,29 @@
+from ratelimit import RateLimiter, MemoryBackend
+
+class BrokenBackend:
+    def take(self, key, capacity, rate, cost=1.0):
+        raise ConnectionError('redis is down')
+
+def limiter(**kwargs):
+    return RateLimiter(backend=MemoryBackend(), limits={'send_message': (2, 1.0)}, enabled=True, **kwargs)
+
+def test_bucket_empties_after_its_burst():
+    rate_limiter = limiter()
+    assert rate_limiter.check('send_message', user_id=1)[0]
+    assert rate_limiter.check('send_message', user_id=1)[0]
+    allowed, retry_after = rate_limiter.check('send_message', user_id=1)
+    assert not allowed
+    assert 0 < retry_after <= 1.0
+    # Other users have their own bucket
+    assert rate_limiter.check('send_message', user_id=2)[0]
+    assert rate_limiter.snapshot()['send_message']['limited'] == 1
+
+def test_shared_address_gets_a_larger_bucket():
+    rate_limiter = limiter(ip_factor=3)
+    allowed = [rate_limiter.check('send_message', user_id=user_id, ip='10.0.0.1')[0] for user_id in range(10)]
+    assert allowed.count(True) == 6
+
+def test_unlimited_events_and_broken_backends_are_allowed():
+    rate_limiter = RateLimiter(backend=BrokenBackend(), limits={'send_message': (1, 1.0)}, enabled=True)
+    assert rate_limiter.check('send_message', user_id=1) == (True, 0.0)
+    assert rate_limiter.check('not_limited', user_id=1) == (True, 0.0)
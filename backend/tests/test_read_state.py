@@ -0,0 +1,44 @@
+from database import SessionFactory, Message, Notification
+from read_state import (migrate_read_flags, unread_message_counts, unread_notification_count,
+                        mark_messages_read, mark_notifications_read)
+
+def test_migration_turns_read_flags_into_watermarks(register):
+    _, reader_id = register('flagged_reader')
+    _, sender_id = register('flagged_sender')
+    session = SessionFactory()
+    try:
+        # Old rows: the newest read message sits above an older one that was never flagged
+        flags = [True, False, True, False, False]
+        session.add_all([Message(sender_id=sender_id, receiver_id=reader_id, content=f"old {n}", is_read=flag)
+                         for n, flag in enumerate(flags)])
+        session.add_all([Notification(user_id=reader_id, title='Old', content=f"old {n}", is_read=flag)
+                         for n, flag in enumerate(flags)])
+        session.commit()
+
+        migrate_read_flags()
+
+        # Everything up to the newest flagged row counts as read, including the unflagged one below it
+        assert unread_message_counts(session, reader_id) == {sender_id: 2}
+        assert unread_notification_count(session, reader_id) == 2
+    finally:
+        session.close()
+
+def test_watermarks_only_move_forward(register):
+    _, reader_id = register('forward_reader')
+    _, sender_id = register('forward_sender')
+    session = SessionFactory()
+    try:
+        session.add_all([Message(sender_id=sender_id, receiver_id=reader_id, content=f"new {n}") for n in range(3)])
+        session.add_all([Notification(user_id=reader_id, title='New', content=f"new {n}") for n in range(3)])
+        session.commit()
+
+        assert mark_messages_read(session, reader_id, sender_id) is not None
+        assert mark_messages_read(session, reader_id, sender_id) is None
+        newest = mark_notifications_read(session, reader_id)
+        assert mark_notifications_read(session, reader_id, up_to_id=newest - 1) is None
+        session.commit()
+
+        assert unread_message_counts(session, reader_id) == {}
+        assert unread_notification_count(session, reader_id) == 0
+    finally:
+        session.close()
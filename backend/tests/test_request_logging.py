@@ -0,0 +1,8 @@
+from request_logging import redact, REDACTED
+
+def test_redacts_secrets_at_any_depth():
+    body = {'username': 'al', 'password': 'hunter2', 'profile': [{'api_key': 'k', 'bio': 'hi'}]}
+    assert redact(body) == {'username': 'al', 'password': REDACTED, 'profile': [{'api_key': REDACTED, 'bio': 'hi'}]}
+
+def test_leaves_ordinary_code_fields_alone():
+    assert redact({'postal_code': '600001', 'oauth_code': 'abc'}) == {'postal_code': '600001', 'oauth_code': REDACTED}
@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy import event
+import pytest
+import analytics
+from analytics import refresh_rollups, query_series, ALL_USERS
+from database import SessionFactory, engine, ActivityLog, ActivityRollup, RollupWatermark
+
+@pytest.fixture(scope='module')
+def user_id(register):
+    return register('rollup_user')[1]
+
+def log_activity(user_id, count, action_type='rollup_test'):
+    session = SessionFactory()
+    try:
+        for i in range(count):
+            session.add(ActivityLog(user_id=user_id, action_type=action_type, action_description='test',
+                                    created_at=datetime(2026, 1, 1, 10, i)))
+        session.commit()
+    finally:
+        session.close()
+
+def totals(user_id=None):
+    session = SessionFactory()
+    try:
+        rows = query_series(session, 'day', datetime(2025, 12, 31), action_type='rollup_test', user_id=user_id)
+        return sum(row.count for row in rows), len(rows)
+    finally:
+        session.close()
+
+def test_refresh_counts_each_row_once(user_id):
+    refresh_rollups()
+    log_activity(user_id, 5)
+    refresh_rollups(batch_size=2)
+    assert refresh_rollups() == 0
+    log_activity(user_id, 3)
+    refresh_rollups()
+
+    assert totals() == (8, 1)
+    assert totals(user_id) == (8, 1)
+
+def test_all_users_total_uses_the_sentinel(user_id):
+    session = SessionFactory()
+    try:
+        assert session.query(ActivityRollup).filter(ActivityRollup.user_id.is_(None)).count() == 0
+        assert session.query(ActivityRollup).filter(ActivityRollup.user_id == ALL_USERS).count() > 0
+    finally:
+        session.close()
+
+def test_refresh_that_loses_the_watermark_race_counts_nothing(user_id):
+    refresh_rollups()
+    before = totals()[0]
+    log_activity(user_id, 4)
+    session = SessionFactory()
+    try:
+        claimed_id = session.query(ActivityLog.id).order_by(ActivityLog.id.desc()).limit(1).scalar()
+    finally:
+        session.close()
+
+    raced = []
+
+    def other_worker_claims_first(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE rollup_watermarks') and not raced:
+            raced.append(True)
+            with engine.begin() as other:
+                other.execute(RollupWatermark.__table__.update().where(
+                    RollupWatermark.name == analytics.WATERMARK_NAME).values(last_id=claimed_id))
+
+    event.listen(engine, 'before_cursor_execute', other_worker_claims_first)
+    try:
+        assert refresh_rollups() == 0
+    finally:
+        event.remove(engine, 'before_cursor_execute', other_worker_claims_first)
+
+    # The other worker owns those rows, so this one added nothing for them
+    assert totals()[0] == before
@@ -0,0 +1,125 @@
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import or_
+import threading
+import time
+import os
+import logging
+from database import SessionFactory, User, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Other processes deactivate users too; reload their state this often
+TOKEN_STATE_REFRESH_SECONDS = int(os.getenv('TOKEN_STATE_REFRESH_SECONDS', '30'))
+
+def token_claims(user):
+    """Claims that let a request authorize itself without loading the user"""
+    return {'uid': user.id, 'adm': bool(user.is_admin), 'ver': user.token_version or 0}
+
+def issue_tokens(user):
+    claims = token_claims(user)
+    return (
+        create_access_token(identity=user.username, additional_claims=claims),
+        create_refresh_token(identity=user.username, additional_claims=claims)
+    )
+
+class RevocationRegistry:
+    """Revoked token ids, deactivated users and per-user minimum token versions, all checked in O(1)"""
+
+    def __init__(self, refresh_seconds=TOKEN_STATE_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._revoked_jti = {}
+        self._min_version = {}
+        self._inactive = set()
+        self._loaded_at = None
+        # Bumped on every change, so callers can tell whether anything moved
+        self.version = 0
+
+    def load(self):
+        """Rebuild from the database: users ever revoked or deactivated, and unexpired revoked tokens"""
+        now = time.time()
+        session = SessionFactory()
+        try:
+            rows = session.query(User.id, User.token_version, User.is_active).filter(
+                or_(User.token_version > 0, User.is_active == False)
+            ).all()
+            revoked = session.query(RevokedToken.jti, RevokedToken.expires_at).filter(
+                RevokedToken.expires_at > now
+            ).all()
+        finally:
+            session.close()
+
+        with self._lock:
+            self._min_version = {user_id: version for user_id, version, _ in rows if version}
+            self._inactive = {user_id for user_id, _, is_active in rows if not is_active}
+            # Keep local revocations too, in case one was made after the query above
+            self._revoked_jti = {jti: exp for jti, exp in self._revoked_jti.items() if exp > now}
+            self._revoked_jti.update(revoked)
+            self._loaded_at = time.monotonic()
+            self.version += 1
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+            try:
+                self.load()
+            except Exception as e:
+                # Keep serving from the last snapshot
+                logger.error(f"Failed to refresh token state: {str(e)}")
+                self._loaded_at = time.monotonic()
+
+    def revoke_token(self, jti, expires_at, user_id=None):
+        """Reject this token from now on; stored so restarts and other processes (at their next load) see it too"""
+        session = SessionFactory()
+        try:
+            session.merge(RevokedToken(jti=jti, user_id=user_id, expires_at=int(expires_at)))
+            # Rows are only useful until their token would have expired anyway
+            session.query(RevokedToken).filter(RevokedToken.expires_at <= time.time()).delete(synchronize_session=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        with self._lock:
+            self._revoked_jti[jti] = expires_at
+            self.version += 1
+
+    def revoke_user(self, user_id, token_version):
+        """Every token of this user with a lower version is rejected from now on"""
+        with self._lock:
+            self._min_version[user_id] = max(self._min_version.get(user_id, 0), token_version)
+            self.version += 1
+
+    def set_active(self, user_id, is_active):
+        with self._lock:
+            if is_active:
+                self._inactive.discard(user_id)
+            else:
+                self._inactive.add(user_id)
+            self.version += 1
+
+    def _legacy_state(self, username):
+        # Tokens issued before claims carried the user id
+        session = SessionFactory()
+        try:
+            user = session.query(User.id, User.is_active).filter_by(username=username).first()
+        finally:
+            session.close()
+        return user
+
+    def is_revoked(self, payload):
+        self._ensure_fresh()
+        if payload.get('jti') in self._revoked_jti:
+            return True
+
+        user_id = payload.get('uid')
+        if user_id is None:
+            user = self._legacy_state(payload.get('sub'))
+            return user is None or not user.is_active
+
+        if user_id in self._inactive:
+            return True
+        return payload.get('ver', 0) < self._min_version.get(user_id, 0)
+
+revocations = RevocationRegistry()
@@ -0,0 +1,155 @@
+import threading
+import time
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Repeated "typing" events inside this window are absorbed; one refresh is re-emitted after it
+TYPING_WINDOW_SECONDS = float(os.getenv('TYPING_WINDOW_SECONDS', '2.5'))
+# A typer who goes quiet this long is announced as stopped
+TYPING_TIMEOUT_SECONDS = float(os.getenv('TYPING_TIMEOUT_SECONDS', '5'))
+TYPING_TICK_SECONDS = float(os.getenv('TYPING_TICK_SECONDS', '0.5'))
+
+class TimerWheel:
+    """Hashed timer wheel: scheduling, rescheduling and cancelling are O(1), one tick expires one slot"""
+
+    def __init__(self, tick=TYPING_TICK_SECONDS, slots=64):
+        self.tick = tick
+        self.slots = [dict() for _ in range(slots)]
+        self.position = 0
+        self._slot_of = {}
+
+    def schedule(self, key, delay):
+        self.cancel(key)
+        ticks = max(1, int(-(-delay // self.tick)))
+        # Timers longer than one revolution remember how many laps are left
+        rounds, offset = divmod(ticks - 1, len(self.slots))
+        index = (self.position + offset + 1) % len(self.slots)
+        self.slots[index][key] = rounds
+        self._slot_of[key] = index
+
+    def cancel(self, key):
+        index = self._slot_of.pop(key, None)
+        if index is not None:
+            self.slots[index].pop(key, None)
+
+    def advance(self):
+        """Move one tick forward and return the keys that expired"""
+        self.position = (self.position + 1) % len(self.slots)
+        slot = self.slots[self.position]
+        expired = []
+        for key, rounds in list(slot.items()):
+            if rounds:
+                slot[key] = rounds - 1
+            else:
+                del slot[key]
+                del self._slot_of[key]
+                expired.append(key)
+        return expired
+
+    def __len__(self):
+        return len(self._slot_of)
+
+class TypingState:
+    __slots__ = ('sid', 'last_emit')
+
+    def __init__(self, sid, last_emit):
+        self.sid = sid
+        self.last_emit = last_emit
+
+class TypingCoalescer:
+    """Per (room, user) typing state; decides which client events actually reach the room"""
+
+    def __init__(self, window=TYPING_WINDOW_SECONDS, timeout=TYPING_TIMEOUT_SECONDS, tick=TYPING_TICK_SECONDS):
+        self.window = window
+        self.timeout = timeout
+        self.tick = tick
+        self._lock = threading.Lock()
+        self._states = {}
+        self._wheel = TimerWheel(tick)
+        self.metrics = {'received': 0, 'emitted': 0, 'suppressed': 0, 'expired': 0}
+
+    def update(self, room, user_id, sid, is_typing):
+        """Record a client event; returns True when it should be broadcast"""
+        key = (room, user_id)
+        now = time.monotonic()
+        with self._lock:
+            self.metrics['received'] += 1
+            state = self._states.get(key)
+
+            if is_typing:
+                self._wheel.schedule(key, self.timeout)
+                if state is None:
+                    # Leading edge: the first keystroke is announced right away
+                    self._states[key] = TypingState(sid, now)
+                elif now - state.last_emit >= self.window:
+                    state.sid = sid
+                    state.last_emit = now
+                else:
+                    self.metrics['suppressed'] += 1
+                    return False
+            else:
+                if state is None:
+                    self.metrics['suppressed'] += 1
+                    return False
+                del self._states[key]
+                self._wheel.cancel(key)
+
+            self.metrics['emitted'] += 1
+            return True
+
+    def advance(self):
+        """Expire quiet typers; returns [(room, user_id, sid)] that need an is_typing=false"""
+        with self._lock:
+            expired = []
+            for key in self._wheel.advance():
+                state = self._states.pop(key, None)
+                if state is not None:
+                    expired.append(key + (state.sid,))
+            self.metrics['expired'] += len(expired)
+            self.metrics['emitted'] += len(expired)
+            return expired
+
+    def drop_sid(self, sid):
+        """Forget typing started from a closed socket; returns [(room, user_id)] to announce as stopped"""
+        with self._lock:
+            dropped = [key for key, state in self._states.items() if state.sid == sid]
+            for key in dropped:
+                del self._states[key]
+                self._wheel.cancel(key)
+            self.metrics['emitted'] += len(dropped)
+            return dropped
+
+    def snapshot(self):
+        with self._lock:
+            received = self.metrics['received']
+            return dict(
+                self.metrics,
+                active=len(self._states),
+                reduction=round(1 - self.metrics['emitted'] / received, 4) if received else 0.0
+            )
+
+typing_coalescer = TypingCoalescer()
+
+_ticker_lock = threading.Lock()
+_ticker_started = False
+
+def start_typing_expiry(socketio):
+    """Run the wheel on a background task that announces expired typers (started once per process)"""
+    global _ticker_started
+    with _ticker_lock:
+        if _ticker_started:
+            return
+        _ticker_started = True
+
+    def run():
+        while True:
+            socketio.sleep(typing_coalescer.tick)
+            try:
+                for room, user_id, sid in typing_coalescer.advance():
+                    socketio.emit('user_typing', {'user_id': user_id, 'is_typing': False}, room=room, skip_sid=sid)
+            except Exception as e:
+                logger.error(f"Typing expiry failed: {str(e)}")
+
+    socketio.start_background_task(run)
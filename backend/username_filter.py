@@ -0,0 +1,91 @@
+import hashlib
+import math
+import threading
+import time
+import os
+import logging
+from database import SessionFactory, User
+
+logger = logging.getLogger(__name__)
+
+BLOOM_FALSE_POSITIVE_RATE = float(os.getenv('USERNAME_BLOOM_FP_RATE', '0.01'))
+# Other processes register users too; rebuild periodically so their names show up
+BLOOM_REFRESH_SECONDS = int(os.getenv('USERNAME_BLOOM_REFRESH_SECONDS', '300'))
+
+class BloomFilter:
+    """Fixed-size bit array; membership answers are "definitely not" or "maybe" """
+
+    def __init__(self, capacity, false_positive_rate=BLOOM_FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1000)
+        self.size = int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class UsernameFilter:
+    """Answers "is this username available?" without the database for names that were never taken"""
+
+    def __init__(self, refresh_seconds=BLOOM_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._built_at = 0.0
+        self.stats = {'fast_path': 0, 'db_checks': 0}
+
+    def _rebuild(self):
+        session = SessionFactory()
+        try:
+            usernames = [username for (username,) in session.query(User.username).all()]
+        finally:
+            session.close()
+        # Headroom so new registrations do not push the false-positive rate up before the next rebuild
+        bloom = BloomFilter(len(usernames) * 2)
+        for username in usernames:
+            bloom.add(username)
+        self._bloom = bloom
+        self._built_at = time.monotonic()
+
+    def _current(self):
+        with self._lock:
+            if (self._bloom is None or time.monotonic() - self._built_at > self.refresh_seconds
+                    or self._bloom.count > self._bloom.capacity):
+                self._rebuild()
+            return self._bloom
+
+    def add(self, username):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(username)
+
+    def is_available(self, username):
+        bloom = self._current()
+        if username not in bloom:
+            with self._lock:
+                self.stats['fast_path'] += 1
+            return True
+        # "Maybe taken": only now does the unique index get probed
+        with self._lock:
+            self.stats['db_checks'] += 1
+        session = SessionFactory()
+        try:
+            return session.query(User.id).filter_by(username=username).first() is None
+        finally:
+            session.close()
+
+usernames = UsernameFilter()
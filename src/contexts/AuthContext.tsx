@@ -1,4 +1,5 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
+import axios from 'axios';
 import { api } from '../services/api';
 import toast from 'react-hot-toast';
 
@@ -116,6 +117,14 @@ export function AuthProvider({ children }: AuthProviderProps) {
   };
 
   const logout = () => {
+    // Revoke both tokens server-side; bypasses the api interceptors so a 401 here never triggers a refresh
+    [localStorage.getItem('token'), localStorage.getItem('refreshToken')].forEach((token) => {
+      if (token) {
+        axios.post(`${api.defaults.baseURL}/auth/logout`, {}, {
+          headers: { Authorization: `Bearer ${token}` },
+        }).catch(() => {});
+      }
+    });
     localStorage.removeItem('token');
     localStorage.removeItem('refreshToken');
     delete api.defaults.headers.common['Authorization'];
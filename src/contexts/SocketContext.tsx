@@ -0,0 +1,74 @@
+import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
+import { io, Socket } from 'socket.io-client';
+import toast from 'react-hot-toast';
+import { api } from '../services/api';
+import { useAuth } from './AuthContext';
+
+// Well under the server's PRESENCE_TTL_SECONDS (90s), so a missed beat does not drop presence
+const HEARTBEAT_INTERVAL_MS = 30000;
+
+const SocketContext = createContext<Socket | null>(null);
+
+export function useSocket() {
+  return useContext(SocketContext);
+}
+
+interface SocketProviderProps {
+  children: ReactNode;
+}
+
+// One socket per signed-in session, open on every page: it carries presence heartbeats and
+// the events the server fans out to the user's own room (inbox messages, notifications)
+export function SocketProvider({ children }: SocketProviderProps) {
+  const { user } = useAuth();
+  const [socket, setSocket] = useState<Socket | null>(null);
+
+  useEffect(() => {
+    if (!user) {
+      setSocket(null);
+      return;
+    }
+
+    // The callback form reads the token on every (re)connect, so a refreshed token is picked up
+    const newSocket = io('http://localhost:5000', {
+      auth: (cb) => cb({ token: localStorage.getItem('token') })
+    });
+    setSocket(newSocket);
+
+    // A rejected handshake is not retried by the client; refresh the token through the API
+    // (its interceptor handles the 401) and reconnect, once per successful connection
+    let tokenRetried = false;
+    newSocket.on('connect_error', (error: any) => {
+      if (error.message !== 'unauthorized' || tokenRetried) return;
+      tokenRetried = true;
+      api.get('/auth/me').then(() => newSocket.connect()).catch(() => {});
+    });
+    newSocket.on('connect', () => {
+      tokenRetried = false;
+    });
+
+    const heartbeat = setInterval(() => newSocket.emit('heartbeat'), HEARTBEAT_INTERVAL_MS);
+
+    // Sent to every socket of the receiver, whichever page is open; the navbar refetches its count
+    newSocket.on('inbox_message', () => {
+      window.dispatchEvent(new CustomEvent('messageRead'));
+    });
+
+    newSocket.on('notification', (notification: any) => {
+      window.dispatchEvent(new CustomEvent('notificationRead'));
+      window.dispatchEvent(new CustomEvent('notificationReceived', { detail: notification }));
+      toast(notification.title);
+    });
+
+    return () => {
+      clearInterval(heartbeat);
+      newSocket.disconnect();
+    };
+  }, [user?.id]);
+
+  return (
+    <SocketContext.Provider value={socket}>
+      {children}
+    </SocketContext.Provider>
+  );
+}
@@ -6,21 +6,32 @@ import LoadingSpinner from '../components/LoadingSpinner';
 import toast from 'react-hot-toast';
 
 export default function Bookmarks() {
-  const [bookmarkedProjects, setBookmarkedProjects] = useState([]);
+  const [bookmarkedProjects, setBookmarkedProjects] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchBookmarkedProjects();
   }, []);
 
-  const fetchBookmarkedProjects = async () => {
+  const fetchBookmarkedProjects = async (cursor?: string) => {
     try {
-      const response = await api.get('/projects/bookmarks');
-      setBookmarkedProjects(response.data);
+      const response = await api.get('/projects/bookmarks', { params: cursor ? { cursor } : {} });
+      setBookmarkedProjects(prev => cursor ? [...prev, ...response.data.projects] : response.data.projects);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Failed to fetch bookmarked projects:', error);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
+    }
+  };
+
+  const loadMore = () => {
+    if (nextCursor) {
+      setLoadingMore(true);
+      fetchBookmarkedProjects(nextCursor);
     }
   };
 
@@ -180,6 +191,18 @@ export default function Bookmarks() {
           </Link>
         </div>
       )}
+
+      {nextCursor && (
+        <div className="text-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 border border-gray-300 rounded-lg text-sm text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
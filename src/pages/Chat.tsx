@@ -1,9 +1,9 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import { Send, Search, User, MessageCircle, ArrowLeft } from 'lucide-react';
-import { io, Socket } from 'socket.io-client';
 import { api } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
+import { useSocket } from '../contexts/SocketContext';
 import LoadingSpinner from '../components/LoadingSpinner';
 
 export default function Chat() {
@@ -18,10 +18,20 @@ export default function Chat() {
   const [loading, setLoading] = useState(true);
   const [sending, setSending] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
-  const [socket, setSocket] = useState<Socket | null>(null);
+  const socket = useSocket();
   const [isTyping, setIsTyping] = useState(false);
   const [otherUserTyping, setOtherUserTyping] = useState(false);
   const typingTimeoutRef = useRef<NodeJS.Timeout | null>(null);
+  const selectedUserRef = useRef<any>(null);
+  const lastMessageIdRef = useRef<number | null>(null);
+
+  useEffect(() => {
+    selectedUserRef.current = selectedUser;
+  }, [selectedUser]);
+
+  useEffect(() => {
+    lastMessageIdRef.current = messages.length ? (messages[messages.length - 1] as any).id : null;
+  }, [messages]);
 
   useEffect(() => {
     fetchConversations();
@@ -31,21 +41,46 @@ export default function Chat() {
   }, [userId]);
 
   useEffect(() => {
-    // Initialize WebSocket connection
-    const newSocket = io('http://localhost:5000');
-    setSocket(newSocket);
+    // The app-level socket stays open across pages; attach the chat page's listeners to it
+    if (!socket) return;
+
+    // After a reconnect, rejoin the open conversation and fetch only what was missed
+    const handleReconnect = () => {
+      const other = selectedUserRef.current;
+      if (!other || lastMessageIdRef.current === null) return;
+
+      socket.emit('join_chat', { other_user_id: other.id });
+      socket.emit('sync_messages', { other_user_id: other.id, after_id: lastMessageIdRef.current }, (result: any) => {
+        if (!result || result.error) return;
+        if (result.has_more) {
+          fetchMessages(other.id);
+          return;
+        }
+        if (result.messages.length) {
+          setMessages((prev: any[]) => {
+            const known = new Set(prev.map((message: any) => message.id));
+            return [...prev, ...result.messages.filter((message: any) => !known.has(message.id))] as any;
+          });
+        }
+      });
+    };
 
     // Listen for new messages
-    newSocket.on('new_message', (messageData: any) => {
+    const handleNewMessage = (messageData: any) => {
       messageData.is_own = messageData.sender_id === parseInt(user?.id || '0');
       setMessages(prev => [...prev, messageData]);
 
       // Update navbar count
       window.dispatchEvent(new CustomEvent('messageRead'));
-    });
+    };
+
+    // Messages from conversations that are not open move them up the list
+    const handleInboxMessage = () => {
+      fetchConversations();
+    };
 
     // Listen for typing indicators
-    newSocket.on('user_typing', (data: any) => {
+    const handleTyping = (data: any) => {
       if (data.user_id !== parseInt(user?.id || '0')) {
         setOtherUserTyping(data.is_typing);
 
@@ -54,12 +89,20 @@ export default function Chat() {
           setTimeout(() => setOtherUserTyping(false), 3000);
         }
       }
-    });
+    };
+
+    socket.on('connect', handleReconnect);
+    socket.on('new_message', handleNewMessage);
+    socket.on('inbox_message', handleInboxMessage);
+    socket.on('user_typing', handleTyping);
 
     return () => {
-      newSocket.disconnect();
+      socket.off('connect', handleReconnect);
+      socket.off('new_message', handleNewMessage);
+      socket.off('inbox_message', handleInboxMessage);
+      socket.off('user_typing', handleTyping);
     };
-  }, [user]);
+  }, [socket, user]);
 
   useEffect(() => {
     if (socket && selectedUser && user) {
@@ -25,25 +25,24 @@ export default function Dashboard() {
 
   const fetchDashboardData = async () => {
     try {
-      const [projectsRes, applicationsRes, notificationsRes, messagesRes, bookmarksRes, suggestionsRes] = await Promise.all([
-        api.get('/projects/my'),
-        api.get('/projects/applications/my'),
+      const [summaryRes, notificationsRes, messagesRes, suggestionsRes] = await Promise.all([
+        api.get('/dashboard/summary?per_page=3'),
         api.get('/notifications/count'),
         api.get('/chat/unread-count'),
-        api.get('/projects/bookmarks'),
         api.get('/projects/suggestions?limit=3')
       ]);
+      const summary = summaryRes.data;
 
       setStats({
-        myProjects: projectsRes.data.length,
-        myApplications: applicationsRes.data.length,
+        myProjects: summary.counts.projects,
+        myApplications: summary.counts.project_applications,
         notifications: notificationsRes.data.unread,
         messages: messagesRes.data.unread_count
       });
 
-      setRecentProjects(projectsRes.data.slice(0, 3));
-      setRecentApplications(applicationsRes.data.slice(0, 3));
-      setBookmarkedProjects(bookmarksRes.data.slice(0, 3));
+      setRecentProjects(summary.projects.items);
+      setRecentApplications(summary.project_applications.items);
+      setBookmarkedProjects(summary.bookmarks.items);
       setSuggestedProjects(suggestionsRes.data.slice(0, 3));
     } catch (error) {
       console.error('Failed to fetch dashboard data:', error);
@@ -11,20 +11,26 @@ export default function HackathonApplications() {
   const [applications, setApplications] = useState([]);
   const [loading, setLoading] = useState(true);
   const [updating, setUpdating] = useState<number | null>(null);
+  const [statusCounts, setStatusCounts] = useState<Record<string, number>>({});
+  const [pagination, setPagination] = useState<any>(null);
+  const [filters, setFilters] = useState({ status: '', sort: 'newest' });
+  const [page, setPage] = useState(1);
 
   useEffect(() => {
     fetchHackathonAndApplications();
-  }, [id]);
+  }, [id, filters, page]);
 
   const fetchHackathonAndApplications = async () => {
     try {
       const [hackathonResponse, applicationsResponse] = await Promise.all([
         api.get(`/hackathons/${id}`),
-        api.get(`/hackathons/${id}/applications`)
+        api.get(`/hackathons/${id}/applications`, { params: { ...filters, page, paginate: true } })
       ]);
       
       setHackathon(hackathonResponse.data);
-      setApplications(applicationsResponse.data);
+      setApplications(applicationsResponse.data.applications);
+      setStatusCounts(applicationsResponse.data.status_counts);
+      setPagination(applicationsResponse.data.pagination);
     } catch (error) {
       console.error('Failed to fetch data:', error);
       toast.error('Failed to load applications');
@@ -135,24 +141,48 @@ export default function HackathonApplications() {
 
         <div className="grid grid-cols-1 md:grid-cols-3 gap-6 pt-6 border-t border-gray-200">
           <div className="text-center">
-            <div className="text-2xl font-bold text-gray-900">{applications.length}</div>
+            <div className="text-2xl font-bold text-gray-900">{Object.values(statusCounts).reduce((sum, count) => sum + count, 0)}</div>
             <div className="text-sm text-gray-600">Total Applications</div>
           </div>
           <div className="text-center">
             <div className="text-2xl font-bold text-green-600">
-              {applications.filter((app: any) => app.status === 'accepted').length}
+              {statusCounts.accepted || 0}
             </div>
             <div className="text-sm text-gray-600">Accepted</div>
           </div>
           <div className="text-center">
             <div className="text-2xl font-bold text-yellow-600">
-              {applications.filter((app: any) => app.status === 'pending').length}
+              {statusCounts.pending || 0}
             </div>
             <div className="text-sm text-gray-600">Pending</div>
           </div>
         </div>
       </div>
 
+      {/* Filters */}
+      <div className="flex flex-wrap items-center gap-4">
+        <select
+          value={filters.status}
+          onChange={(e) => { setPage(1); setFilters({ ...filters, status: e.target.value }); }}
+          className="px-3 py-2 border border-gray-300 rounded-lg text-sm"
+        >
+          <option value="">All statuses</option>
+          <option value="pending">Pending</option>
+          <option value="accepted">Accepted</option>
+          <option value="rejected">Rejected</option>
+        </select>
+        <select
+          value={filters.sort}
+          onChange={(e) => { setPage(1); setFilters({ ...filters, sort: e.target.value }); }}
+          className="px-3 py-2 border border-gray-300 rounded-lg text-sm"
+        >
+          <option value="newest">Newest first</option>
+          <option value="oldest">Oldest first</option>
+          <option value="skill_overlap">Best skill match</option>
+          <option value="status">Status</option>
+        </select>
+      </div>
+
       {/* Applications List */}
       <div className="space-y-6">
         {applications.length > 0 ? (
@@ -299,6 +329,26 @@ export default function HackathonApplications() {
           </div>
         )}
       </div>
+
+      {pagination && pagination.pages > 1 && (
+        <div className="flex items-center justify-center space-x-4">
+          <button
+            onClick={() => setPage(page - 1)}
+            disabled={page <= 1}
+            className="px-4 py-2 border border-gray-300 rounded-lg text-sm disabled:opacity-50"
+          >
+            Previous
+          </button>
+          <span className="text-sm text-gray-600">Page {pagination.page} of {pagination.pages}</span>
+          <button
+            onClick={() => setPage(page + 1)}
+            disabled={page >= pagination.pages}
+            className="px-4 py-2 border border-gray-300 rounded-lg text-sm disabled:opacity-50"
+          >
+            Next
+          </button>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
@@ -14,6 +14,19 @@ export default function Notifications() {
     fetchNotifications();
   }, [filter]);
 
+  useEffect(() => {
+    // Pushed over the app-level socket while this page is open
+    const handleReceived = (event: Event) => {
+      const notification = (event as CustomEvent).detail;
+      setNotifications((prev: any[]) =>
+        prev.some((notif: any) => notif.id === notification.id) ? prev : [notification, ...prev] as any
+      );
+    };
+
+    window.addEventListener('notificationReceived', handleReceived);
+    return () => window.removeEventListener('notificationReceived', handleReceived);
+  }, []);
+
   const fetchNotifications = async () => {
     try {
       const params = filter === 'unread' ? '?unread_only=true' : '';
@@ -30,10 +43,10 @@ export default function Notifications() {
     try {
       await api.put(`/notifications/${notificationId}/read`);
       
-      // Update local state
+      // Read state is a watermark: this notification and every older one are now read
       setNotifications(prev =>
         prev.map((notif: any) =>
-          notif.id === notificationId ? { ...notif, is_read: true } : notif
+          notif.id <= notificationId ? { ...notif, is_read: true } : notif
         )
       );
       
@@ -57,8 +57,7 @@ export default function Profile() {
       });
       fetchSkills();
       fetchRoles();
-      fetchPortfolio();
-      fetchActivity();
+      fetchOverview();
     }
   }, [user]);
 
@@ -80,23 +79,17 @@ export default function Profile() {
     }
   };
 
-  const fetchPortfolio = async () => {
+  const fetchOverview = async (fields = 'portfolio,activity') => {
     try {
-      const response = await api.get('/auth/portfolio');
-      setPortfolio(response.data);
+      const response = await api.get(`/auth/users/${user?.id}/overview`, { params: { fields } });
+      if (response.data.portfolio) setPortfolio(response.data.portfolio);
+      if (response.data.activity) setActivity(response.data.activity);
     } catch (error) {
-      console.error('Failed to fetch portfolio:', error);
+      console.error('Failed to fetch portfolio and activity:', error);
     }
   };
 
-  const fetchActivity = async () => {
-    try {
-      const response = await api.get('/auth/activity');
-      setActivity(response.data);
-    } catch (error) {
-      console.error('Failed to fetch activity:', error);
-    }
-  };
+  const fetchPortfolio = () => fetchOverview('portfolio');
 
   const handleChange = (e: React.ChangeEvent<HTMLInputElement | HTMLTextAreaElement | HTMLSelectElement>) => {
     const { name, value, type } = e.target;
@@ -26,15 +26,7 @@ export default function ProjectDetail() {
     try {
       const response = await api.get(`/projects/${id}`);
       setProject(response.data);
-
-      // Check if project is bookmarked
-      try {
-        const bookmarksResponse = await api.get('/projects/bookmarks');
-        const bookmarkedIds = bookmarksResponse.data.map((p: any) => p.id);
-        setIsBookmarked(bookmarkedIds.includes(parseInt(id!)));
-      } catch (error) {
-        console.error('Failed to check bookmark status:', error);
-      }
+      setIsBookmarked(response.data.is_bookmarked);
     } catch (error) {
       console.error('Failed to fetch project:', error);
       toast.error('Failed to load project');
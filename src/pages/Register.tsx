@@ -1,7 +1,8 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { Eye, EyeOff, Mail, User, Lock, UserPlus } from 'lucide-react';
 import { useAuth } from '../contexts/AuthContext';
+import { api } from '../services/api';
 import LoadingSpinner from '../components/LoadingSpinner';
 
 export default function Register() {
@@ -16,8 +17,26 @@ export default function Register() {
   const [showConfirmPassword, setShowConfirmPassword] = useState(false);
   const [loading, setLoading] = useState(false);
   const [errors, setErrors] = useState<{ [key: string]: string }>({});
+  const [usernameTaken, setUsernameTaken] = useState(false);
 
   const { register } = useAuth();
+
+  // Debounced availability hint while the username is typed
+  useEffect(() => {
+    const username = formData.username.trim();
+    setUsernameTaken(false);
+    if (username.length < 3) return;
+
+    const timer = setTimeout(async () => {
+      try {
+        const response = await api.get('/auth/username-available', { params: { username } });
+        setUsernameTaken(!response.data.available);
+      } catch (error) {
+        // Advisory only; registration still reports duplicates
+      }
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [formData.username]);
   const navigate = useNavigate();
 
   const handleChange = (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -125,6 +144,9 @@ export default function Register() {
               {errors.username && (
                 <p className="mt-1 text-sm text-red-600">{errors.username}</p>
               )}
+              {!errors.username && usernameTaken && (
+                <p className="mt-1 text-sm text-red-600">Username is already taken</p>
+              )}
             </div>
 
             <div>
@@ -42,16 +42,19 @@ export default function UserProfile() {
 
   useEffect(() => {
     if (id) {
-      fetchUserProfile();
-      fetchUserPortfolio();
+      fetchUserOverview();
     }
   }, [id]);
 
-  const fetchUserProfile = async () => {
+  const fetchUserOverview = async () => {
     try {
       setLoading(true);
-      const response = await api.get(`/auth/users/${id}`);
-      setUser(response.data);
+      const response = await api.get(`/auth/users/${id}/overview`, {
+        params: { fields: 'profile,counts,portfolio' }
+      });
+      const { profile, counts, portfolio } = response.data;
+      setUser({ ...profile, project_count: counts.projects, skills_count: counts.skills });
+      setPortfolio(portfolio);
     } catch (error: any) {
       setError(error.response?.data?.error || 'Failed to load user profile');
     } finally {
@@ -59,15 +62,6 @@ export default function UserProfile() {
     }
   };
 
-  const fetchUserPortfolio = async () => {
-    try {
-      const response = await api.get(`/auth/users/${id}/portfolio`);
-      setPortfolio(response.data);
-    } catch (error) {
-      console.error('Failed to fetch user portfolio:', error);
-    }
-  };
-
   if (loading) {
     return (
       <div className="flex justify-center items-center min-h-64">